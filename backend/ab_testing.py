@@ -0,0 +1,239 @@
+"""
+Sticky A/B assignment and exposure/conversion analytics.
+
+Visitors are assigned to a variant by hashing (page id, visitor id), so a
+visitor always sees the same variant and conversions can be attributed
+without storing assignments. Events go into an in-memory ring buffer and
+are flushed in batches to an append-only log; per-page, per-variant
+counters are kept in memory and snapshotted alongside the log.
+
+The log is the source of truth and may be shared by several processes:
+flushes append under an exclusive flock, after folding in the events
+other processes appended since the last flush. The snapshot records the
+log offset it covers, so loading only replays the log after it.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from atomic_io import ProcessLock, atomic_write_json
+
+VISITOR_COOKIE = "rcg_vid"
+
+EXPOSURE = "exposure"
+CONVERSION = "conversion"
+
+
+def parse_split(value: str) -> Dict[str, float]:
+    """Parse an "a,b" weight list such as "50,50" or "70,30" into variant weights"""
+    weights = [float(part) for part in value.split(",") if part.strip()]
+    if len(weights) != 2 or min(weights) < 0 or sum(weights) <= 0:
+        raise ValueError(f"Invalid A/B split: {value}")
+    return {"a": weights[0], "b": weights[1]}
+
+
+def assign_variant(page_id: str, visitor_id: str, weights: Dict[str, float]) -> str:
+    """Deterministically map a visitor to one of the weighted variants"""
+    variants = sorted(name for name, weight in weights.items() if weight > 0)
+    if not variants:
+        return "a"
+    digest = hashlib.sha256(f"{page_id}:{visitor_id}".encode("utf-8")).digest()
+    point = int.from_bytes(digest[:8], "big") / 2 ** 64 * sum(weights[name] for name in variants)
+    for name in variants:
+        point -= weights[name]
+        if point < 0:
+            return name
+    return variants[-1]
+
+
+class ABEventLog:
+    """Ring-buffered exposure/conversion events with batched, append-only persistence"""
+
+    def __init__(
+        self,
+        base_dir: str = "data/ab-events",
+        capacity: int = 100_000,
+        flush_interval: float = 5.0,
+        flush_threshold: int = 5_000
+    ):
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self._log_path = self.base_dir / "events.log"
+        self._aggregates_path = self.base_dir / "aggregates.json"
+        self._process_lock = ProcessLock(self.base_dir / "events.lock")
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        self._buffer: deque = deque(maxlen=capacity)
+        # page id -> variant -> [exposures, conversions]: the log up to _log_offset, and the buffered events
+        self._aggregates: Dict[str, Dict[str, List[int]]] = {}
+        self._pending: Dict[str, Dict[str, List[int]]] = {}
+        self._log_offset = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._load_aggregates()
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load_aggregates(self):
+        """Start from the snapshot and fold in the log written after it"""
+        if self._aggregates_path.exists():
+            try:
+                with open(self._aggregates_path, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                # Snapshots without an offset predate the shared log; the log is rebuilt from the start
+                if "offset" in snapshot:
+                    self._aggregates, self._log_offset = snapshot["pages"], snapshot["offset"]
+            except Exception as e:
+                print(f"Error reading {self._aggregates_path}: {e}")
+        self._catch_up()
+
+    def _catch_up(self):
+        """Fold in the complete events that any process appended to the log since _log_offset"""
+        try:
+            size = self._log_path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size < self._log_offset:
+            # The log was truncated or replaced: start over
+            with self._lock:
+                self._aggregates, self._log_offset = {}, 0
+        if size == self._log_offset:
+            return
+        with open(self._log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            data = f.read(size - self._log_offset)
+        # A line without its newline is still being written; leave it for the next pass
+        end = data.rfind(b"\n") + 1
+        deltas: Dict[str, Dict[str, List[int]]] = {}
+        for line in data[:end].splitlines():
+            try:
+                event = json.loads(line)
+                _count(deltas, event["page_id"], event["variant"], event["type"])
+            except Exception:
+                continue  # torn line from a crashed writer
+        with self._lock:
+            _merge(self._aggregates, deltas)
+            self._log_offset += end
+
+    def start(self):
+        """Start the background flush thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ab-events-flush", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the background thread and flush buffered events"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def record(self, page_id: str, variant: str, kind: str, visitor_id: Optional[str] = None):
+        """Record an exposure or conversion (in memory only)"""
+        event = (time.time(), page_id, variant, kind, visitor_id)
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+                _, old_page, old_variant, old_kind, _ = self._buffer[0]
+                _count(self._pending, old_page, old_variant, old_kind, -1)
+            self._buffer.append(event)
+            _count(self._pending, page_id, variant, kind)
+            if len(self._buffer) >= self.flush_threshold:
+                self._wake.set()
+
+    def stats(self, page_id: str) -> Dict:
+        """Per-variant exposures, conversions and conversion rate for a page.
+        Includes other processes' events up to their last flush and this process's buffered ones."""
+        with self._lock:
+            variants: Dict[str, List[int]] = {}
+            for source in (self._aggregates, self._pending):
+                for name, (exposures, conversions) in source.get(page_id, {}).items():
+                    counts = variants.setdefault(name, [0, 0])
+                    counts[0] += exposures
+                    counts[1] += conversions
+        return {
+            "page_id": page_id,
+            "variants": {
+                name: {
+                    "exposures": exposures,
+                    "conversions": conversions,
+                    "conversion_rate": conversions / exposures if exposures else 0.0
+                }
+                for name, (exposures, conversions) in sorted(variants.items())
+            }
+        }
+
+    def flush(self):
+        """Append buffered events to the log, fold in other processes' events and snapshot the aggregates"""
+        with self._flush_lock:
+            with self._lock:
+                events = list(self._buffer)
+                self._buffer.clear()
+            if not events:
+                try:
+                    self._catch_up()
+                except Exception as e:
+                    print(f"Error reading A/B events: {e}")
+                return
+
+            deltas: Dict[str, Dict[str, List[int]]] = {}
+            for _, page_id, variant, kind, _ in events:
+                _count(deltas, page_id, variant, kind)
+            lines = "".join(
+                json.dumps({"ts": ts, "page_id": page_id, "variant": variant, "type": kind, "visitor": visitor}) + "\n"
+                for ts, page_id, variant, kind, visitor in events
+            ).encode("utf-8")
+            try:
+                with self._process_lock.hold():
+                    self._catch_up()
+                    with open(self._log_path, 'ab') as f:
+                        if f.tell() > self._log_offset:
+                            # Terminate a torn line left by a crashed writer
+                            lines = b"\n" + lines
+                        f.write(lines)
+                        offset = f.tell()
+                    with self._lock:
+                        _merge(self._aggregates, deltas)
+                        _merge(self._pending, deltas, -1)
+                        self._log_offset = offset
+                        snapshot = {"offset": offset, "pages": _copy(self._aggregates)}
+                    atomic_write_json(self._aggregates_path, snapshot)
+            except Exception as e:
+                print(f"Error flushing A/B events: {e}")
+                with self._lock:
+                    _merge(self._pending, deltas, -1)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+def _count(aggregates: Dict, page_id: str, variant: str, kind: str, amount: int = 1):
+    counts = aggregates.setdefault(page_id, {}).setdefault(variant, [0, 0])
+    counts[0 if kind == EXPOSURE else 1] += amount
+
+
+def _merge(aggregates: Dict, deltas: Dict, sign: int = 1):
+    for page_id, variants in deltas.items():
+        for variant, (exposures, conversions) in variants.items():
+            counts = aggregates.setdefault(page_id, {}).setdefault(variant, [0, 0])
+            counts[0] += sign * exposures
+            counts[1] += sign * conversions
+
+
+def _copy(aggregates: Dict) -> Dict:
+    return {page: {v: list(c) for v, c in variants.items()} for page, variants in aggregates.items()}
@@ -5,50 +5,107 @@ Separate methods for each asset type
 
 import os
 import json
-from typing import Dict, Any
+from functools import cached_property
+from typing import Dict, Any, AsyncIterator, Optional
 from dotenv import load_dotenv
 import base64
-from google import genai
-from google.genai import types
 import mimetypes
 import asyncio
-from openai import OpenAI
+import upstream
+from metrics import instrument_call, instrument_stream
+
+# Provider SDKs (google.genai, openai) are imported on first use: together
+# they take over a second to import and would otherwise delay server startup.
 
 # Load environment variables
 load_dotenv()
 
 # Configure Gemini API
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable not set")
 
 # Configure OpenRouter API
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_KEY")
-if not OPENROUTER_API_KEY:
-    raise ValueError("OPENROUTER_API_KEY environment variable not set")
+
+# Upstream endpoints (overridable, e.g. to point benchmarks at a local fake provider)
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+GEMINI_DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/"
+
+# What each generated A/B variant concentrates on (variant i uses entry i)
+VARIANT_FOCUS = [
+    "the headline and value proposition messaging",
+    "the call-to-action text, styling and placement",
+    "social proof and trust signals",
+    "the order and emphasis of the page sections",
+    "urgency and offer framing",
+    "the hero copy and supporting subheadings",
+    "form and button friction",
+    "benefit-oriented feature descriptions",
+]
 
 class AIAssistant:
-    """Simple AI Assistant class"""
+    """Simple AI Assistant class.
+
+    All generators are asyncio-native: chunks are read from async provider
+    clients directly on the event loop, with no per-chunk thread hop.
+    Provider clients are created on first use and share the pooled
+    upstream transport (upstream.py).
+    """
 
     def __init__(self):
-        self.client = genai.Client(api_key=GEMINI_API_KEY)
         self.model = "gemini-2.5-flash"
         self.image_model = "gemini-2.5-flash-image"
-        self.openrouter_client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
+        self.openrouter_model = "openrouter/polaris-alpha"
+
+    @cached_property
+    def client(self):
+        """Gemini client"""
+        from google import genai
+        from google.genai import types
+        if not GEMINI_API_KEY:
+            raise ValueError("GEMINI_API_KEY environment variable not set")
+        http_options = types.HttpOptions(
+            base_url=GEMINI_BASE_URL,
+            httpx_async_client=upstream.async_client(),
+            httpx_client=upstream.sync_client()
+        )
+        return genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+
+    @cached_property
+    def openrouter_client(self):
+        """OpenRouter (OpenAI-compatible) client"""
+        from openai import AsyncOpenAI
+        if not OPENROUTER_API_KEY:
+            raise ValueError("OPENROUTER_API_KEY environment variable not set")
+        return AsyncOpenAI(
+            base_url=OPENROUTER_BASE_URL,
             api_key=OPENROUTER_API_KEY,
+            http_client=upstream.async_client()
         )
 
-    async def generate_landing_page(self, prompt: str, brand_name: str) -> str:
+    def prewarm(self):
+        """Import the provider SDKs and build the clients ahead of the first request"""
+        for name in ("client", "openrouter_client"):
+            try:
+                getattr(self, name)
+            except Exception as e:
+                print(f"Error creating {name}: {e}")
+
+    async def prewarm_connections(self):
+        """Open pooled connections to both providers ahead of the first request"""
+        await upstream.prewarm_connections([OPENROUTER_BASE_URL, GEMINI_BASE_URL or GEMINI_DEFAULT_BASE_URL])
+
+    @instrument_stream("landing_page")
+    async def generate_landing_page(self, prompt: str, brand_name: str) -> AsyncIterator[Dict[str, str]]:
         """Generate landing page HTML"""
         full_prompt = f"Create an advertising landing page for {brand_name}. Campaign: {prompt}. Return only the HTML code. RULES: 1/ The page should be highly optimized for conversion. this page would be used in ad campaigns, so shoudl be aesthetically pleasing, and focused for conversion. Design like a high end and very expensive agency would design the page. Make sure brand name and brand assets are used in the landing page."
 
-        completion = self.openrouter_client.chat.completions.create(
+        completion = await self.openrouter_client.chat.completions.create(
             extra_headers={
                 "HTTP-Referer": "http://localhost",
                 "X-Title": "RC Generator",
             },
-            model="openrouter/polaris-alpha",
+            model=self.openrouter_model,
             messages=[
                 {
                     "role": "user",
@@ -58,12 +115,14 @@ class AIAssistant:
             stream=True
         )
 
-        for chunk in completion:
-            if chunk.choices[0].delta.content:
+        async for chunk in completion:
+            if chunk.choices and chunk.choices[0].delta.content:
                 yield {"html": chunk.choices[0].delta.content}
 
-    async def generate_instagram_ad(self, prompt: str, brand_name: str):
-        """Generate Instagram image ad (base64 chunks)"""
+    @instrument_stream("instagram_ad_images")
+    async def generate_instagram_ad_images(self, prompt: str, brand_name: str) -> AsyncIterator[Dict[str, Any]]:
+        """Generate Instagram image ad as raw chunks: {"image_bytes", "mime_type"} or {"text"}"""
+        from google.genai import types
         full_prompt = f"Create a highly conversion optimized Instagram ad image for {brand_name}. Campaign is this: {prompt}. Make sure you use the brand name/theme and assets "
 
         contents = [types.Content(role="user", parts=[types.Part.from_text(text=full_prompt)])]
@@ -72,45 +131,101 @@ class AIAssistant:
             image_config=types.ImageConfig(image_size="1K")
         )
 
-        for chunk in self.client.models.generate_content_stream(model=self.image_model, contents=contents, config=config):
+        stream = await self.client.aio.models.generate_content_stream(model=self.image_model, contents=contents, config=config)
+        async for chunk in stream:
             if (chunk.candidates and chunk.candidates[0].content and chunk.candidates[0].content.parts):
                 part = chunk.candidates[0].content.parts[0]
                 if part.inline_data and part.inline_data.data:
-                    # Send base64 encoded chunk to UI
-                    base64_chunk = base64.b64encode(part.inline_data.data).decode('utf-8')
-                    yield {"image": base64_chunk}
+                    yield {"image_bytes": part.inline_data.data, "mime_type": part.inline_data.mime_type or "image/png"}
                 elif chunk.text:
-                    print(chunk.text)  # Print any text chunks
+                    yield {"text": chunk.text}
 
+    @instrument_stream("instagram_ad")
+    async def generate_instagram_ad(self, prompt: str, brand_name: str) -> AsyncIterator[Dict[str, str]]:
+        """Generate Instagram image ad (base64 chunks)"""
+        async for chunk in self.generate_instagram_ad_images(prompt, brand_name):
+            if "image_bytes" in chunk:
+                # Send base64 encoded chunk to UI
+                yield {"image": base64.b64encode(chunk["image_bytes"]).decode('utf-8')}
+            else:
+                print(chunk["text"])  # Print any text chunks
+
+    @instrument_call("copy_variants")
     async def generate_copy_variants(self, prompt: str, brand_name: str) -> str:
         """Generate copy variants"""
+        from google.genai import types
         full_prompt = f"Create 3 different ad copy variants for {brand_name}. Campaign: {prompt}. Return as plain text, one per line."
 
         contents = [types.Content(role="user", parts=[types.Part.from_text(text=full_prompt)])]
         config = types.GenerateContentConfig(response_modalities=["TEXT"])
 
-        full_text = ""
-        for chunk in self.client.models.generate_content_stream(model=self.model, contents=contents, config=config):
+        parts = []
+        stream = await self.client.aio.models.generate_content_stream(model=self.model, contents=contents, config=config)
+        async for chunk in stream:
             if chunk.text:
-                full_text += chunk.text
+                parts.append(chunk.text)
 
-        return full_text.strip()
+        return "".join(parts).strip()
 
-    async def generate_landing_page_ab_test(self, html_content: str, brand_name: str) -> str:
+    @instrument_stream("landing_page_ab_test")
+    async def generate_landing_page_ab_test(self, html_content: str, brand_name: str) -> AsyncIterator[Dict[str, str]]:
         """Generate A/B test variant of landing page HTML"""
+        from google.genai import types
         full_prompt = f"Take this existing landing page HTML for {brand_name} and create a minor A/B test variant. Make small, strategic changes that could improve conversion rates - like changing button text, adjusting headlines, modifying call-to-action placement, or tweaking the value proposition messaging. Keep the overall structure and design similar but make meaningful optimization changes. Return only the modified HTML code.\n\nOriginal HTML:\n{html_content}"
 
         contents = [types.Content(role="user", parts=[types.Part.from_text(text=full_prompt)])]
         config = types.GenerateContentConfig(response_modalities=["TEXT"])
 
-        full_text = ""
-        for chunk in self.client.models.generate_content_stream(model=self.model, contents=contents, config=config):
+        stream = await self.client.aio.models.generate_content_stream(model=self.model, contents=contents, config=config)
+        async for chunk in stream:
             if chunk.text:
-                full_text += chunk.text
                 yield {"html": chunk.text}
 
-        #return full_text.strip()
-
+    def _variant_instruction(self, brand_name: str) -> str:
+        return f"You create A/B test variants of an existing landing page for {brand_name}. Make small, strategic changes that could improve conversion rates. Keep the overall structure and design similar but make meaningful optimization changes. Return only the modified HTML code."
+
+    def _variant_page(self, html_content: str):
+        from google.genai import types
+        return types.Part.from_text(text=f"Original HTML:\n{html_content}")
+
+    def variant_request(self, index: int, count: int) -> str:
+        """The short per-variant prompt sent after the (cached) page"""
+        return f"Create variant {index + 1} of {count}. Focus on {VARIANT_FOCUS[index % len(VARIANT_FOCUS)]}."
+
+    async def create_variant_context(self, html_content: str, brand_name: str, ttl_seconds: int) -> str:
+        """Upload the base page and variant instructions as a Gemini context cache; returns its name"""
+        from google.genai import types
+        config = types.CreateCachedContentConfig(
+            display_name=f"rcg-variants-{brand_name}"[:128],
+            system_instruction=self._variant_instruction(brand_name),
+            contents=[types.Content(role="user", parts=[self._variant_page(html_content)])],
+            ttl=f"{int(ttl_seconds)}s"
+        )
+        cache = await self.client.aio.caches.create(model=self.model, config=config)
+        return cache.name
+
+    async def delete_variant_context(self, name: str):
+        await self.client.aio.caches.delete(name=name)
+
+    @instrument_stream("landing_page_variant")
+    async def generate_landing_page_variant(self, html_content: str, brand_name: str, request: str,
+                                            cached_content: Optional[str] = None) -> AsyncIterator[Dict[str, str]]:
+        """Generate one A/B variant; with `cached_content` only the short request is sent, otherwise the page goes inline"""
+        from google.genai import types
+        prompt = types.Part.from_text(text=request)
+        if cached_content:
+            contents = [types.Content(role="user", parts=[prompt])]
+            config = types.GenerateContentConfig(response_modalities=["TEXT"], cached_content=cached_content)
+        else:
+            contents = [types.Content(role="user", parts=[self._variant_page(html_content), prompt])]
+            config = types.GenerateContentConfig(
+                response_modalities=["TEXT"], system_instruction=self._variant_instruction(brand_name)
+            )
+
+        stream = await self.client.aio.models.generate_content_stream(model=self.model, contents=contents, config=config)
+        async for chunk in stream:
+            if chunk.text:
+                yield {"html": chunk.text}
 
 
 # Singleton instance
@@ -118,9 +233,9 @@ ai_assistant = AIAssistant()
 
 
 def talk_to_gemini(text):
-    client = genai.Client(
-        api_key=GEMINI_API_KEY,
-    )
+    from google.genai import types
+    # Reuse the shared client (and its pooled connections) instead of a new client per call
+    client = ai_assistant.client
     model = "gemini-2.5-flash"
     contents = [
         types.Content(
@@ -0,0 +1,91 @@
+"""
+Crash-safe file writes.
+Data is written to a unique temp file in the target directory, fsynced,
+and renamed over the target, so readers see either the old or the new
+content and never a partial file. The directory is fsynced after the
+rename so the new name survives a crash.
+
+ProcessLock serializes writers across processes sharing a directory.
+"""
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): ProcessLock only guards within one process
+    fcntl = None
+
+
+def fsync_dir(directory: Path):
+    """Persist a directory entry change (no-op where directories cannot be opened)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: Path, data: bytes, fsync: bool = True, sync_dir: bool = True):
+    """Atomically replace `path` with `data`.
+    Bulk writers may pass sync_dir=False and call fsync_dir once for the whole batch."""
+    path = Path(path)
+    # Dot-prefixed, .tmp-suffixed: never matched by the *.json page glob
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    if fsync and sync_dir:
+        fsync_dir(path.parent)
+
+
+def atomic_write_json(path: Path, data: Any, fsync: bool = True, indent: int = None, sync_dir: bool = True):
+    """Atomically replace `path` with `data` serialized as JSON"""
+    payload = json.dumps(data, indent=indent, ensure_ascii=False).encode('utf-8')
+    atomic_write_bytes(path, payload, fsync=fsync, sync_dir=sync_dir)
+
+
+class ProcessLock:
+    """flock on a file shared by every process using a directory.
+    Re-entrant within a thread; other threads of the process wait for the holder,
+    since they share one flock."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        # Only touched by the thread holding _thread_lock
+        self._depth = 0
+        self._thread_lock = threading.RLock()
+
+    @contextmanager
+    def hold(self, exclusive: bool = True):
+        with self._thread_lock:
+            if self._depth == 0 and fcntl is not None:
+                # A forked child must not share its parent's open file description
+                if self._fd is None or self._pid != os.getpid():
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                    self._pid = os.getpid()
+                fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0 and fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
@@ -0,0 +1,269 @@
+"""
+Batch generation jobs: run many prompt/brand items server-side.
+
+Each job processes its items with bounded parallelism, retries failed
+items with exponential backoff (honouring the scheduler's Retry-After when
+a provider queue is full), and saves finished pages in batches through
+LandingPageStorage.save_many so index updates and fsyncs are amortized.
+Progress is kept as an event log that status and streaming endpoints read;
+jobs live in memory and are not resumed after a restart.
+"""
+import asyncio
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from scheduler import QueueFull
+
+# Item and job states
+QUEUED, RUNNING, RETRYING, SAVING, SAVED, DONE, FAILED, CANCELLED = (
+    "queued", "running", "retrying", "saving", "saved", "done", "failed", "cancelled"
+)
+COMPLETED = "completed"
+
+
+class BatchItem:
+    """One prompt/brand pair of a job and its outcome"""
+
+    def __init__(self, index: int, spec: Dict):
+        self.index = index
+        self.spec = spec
+        self.status = QUEUED
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.result: Dict[str, Any] = {}
+
+    def summary(self) -> Dict:
+        return {
+            "index": self.index,
+            "brand_name": self.spec.get("brand_name"),
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            **self.result
+        }
+
+
+class BatchJob:
+    """A submitted batch with a followable event log"""
+
+    def __init__(self, items: List[Dict], options: Dict):
+        self.id = uuid.uuid4().hex
+        self.items = [BatchItem(i, spec) for i, spec in enumerate(items)]
+        self.options = options
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+        self.events: List[Dict] = []
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (COMPLETED, CANCELLED)
+
+    def counts(self) -> Dict[str, int]:
+        counts = {"total": len(self.items)}
+        for item in self.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        return counts
+
+    async def emit(self, event: Dict):
+        async with self._changed:
+            self.events.append({"ts": time.time(), **event})
+            self._changed.notify_all()
+
+    async def follow(self) -> AsyncIterator[Dict]:
+        """Replay the job's events so far, then follow it until it finishes"""
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.events) > index or self.finished)
+                pending = self.events[index:]
+                finished = self.finished
+            for event in pending:
+                yield event
+            index += len(pending)
+            if finished and index >= len(self.events):
+                return
+
+    def summary(self, include_items: bool = True) -> Dict:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        processed = sum(1 for item in self.items if item.status in (SAVED, DONE))
+        summary = {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed": round(elapsed, 3),
+            "items_per_second": round(processed / elapsed, 3) if elapsed else 0.0,
+            "counts": self.counts(),
+            "options": self.options
+        }
+        if include_items:
+            summary["items"] = [item.summary() for item in self.items]
+        return summary
+
+
+class BatchJobRunner:
+    """Runs batch jobs: bounded parallelism, retries with backoff and batched saves.
+
+    `process_item(spec)` generates one item and returns a dict that may hold
+    a "page" entry (save_landing_page arguments) plus any extra results;
+    `save_many(pages)` stores a list of pages and returns their metadata.
+    """
+
+    def __init__(
+        self,
+        process_item: Callable[[Dict], Awaitable[Dict]],
+        save_many: Callable[[List[Dict]], Awaitable[List[Dict]]],
+        parallelism: int = 4,
+        max_attempts: int = 3,
+        backoff: float = 1.0,
+        save_batch_size: int = 16,
+        save_interval: float = 1.0,
+        max_jobs: int = 100
+    ):
+        self.process_item = process_item
+        self.save_many = save_many
+        self.parallelism = parallelism
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.save_batch_size = save_batch_size
+        self.save_interval = save_interval
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+
+    def submit(self, items: List[Dict], options: Optional[Dict] = None) -> BatchJob:
+        job = BatchJob(items, options or {})
+        self._jobs[job.id] = job
+        self._evict()
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[BatchJob]:
+        return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.finished or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    def _evict(self):
+        # Forget the oldest finished jobs beyond the retention limit
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+
+    async def _run(self, job: BatchJob):
+        job.status = RUNNING
+        job.started_at = time.time()
+        await job.emit({"type": "job", "status": RUNNING, "counts": job.counts()})
+
+        parallelism = max(1, min(job.options.get("parallelism") or self.parallelism, self.parallelism * 4))
+        semaphore = asyncio.Semaphore(parallelism)
+        to_save: asyncio.Queue = asyncio.Queue()
+        saver = asyncio.create_task(self._save_loop(job, to_save))
+        workers = [asyncio.create_task(self._run_item(job, item, semaphore, to_save)) for item in job.items]
+        try:
+            await asyncio.gather(*workers)
+            await to_save.put(None)
+            await saver
+            job.status = COMPLETED
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            # Pages that were already generated are still saved
+            await to_save.put(None)
+            await asyncio.gather(saver, return_exceptions=True)
+            for item in job.items:
+                if item.status not in (SAVED, DONE, FAILED):
+                    item.status = CANCELLED
+        finally:
+            job.finished_at = time.time()
+            await job.emit({"type": "job", "status": job.status, "counts": job.counts()})
+
+    async def _run_item(self, job: BatchJob, item: BatchItem, semaphore: asyncio.Semaphore, to_save: asyncio.Queue):
+        while True:
+            async with semaphore:
+                item.attempts += 1
+                item.status = RUNNING
+                await job.emit({"type": "item", "index": item.index, "status": RUNNING, "attempt": item.attempts})
+                try:
+                    output = await self.process_item(item.spec)
+                    break
+                except Exception as e:
+                    item.error = str(e)
+                    if item.attempts >= self.max_attempts:
+                        item.status = FAILED
+                        await job.emit({"type": "item", "index": item.index, "status": FAILED, "error": item.error})
+                        return
+                    delay = self.backoff * 2 ** (item.attempts - 1) * random.uniform(0.5, 1.5)
+                    if isinstance(e, QueueFull):
+                        delay = max(delay, e.retry_after)
+                    item.status = RETRYING
+                    await job.emit({
+                        "type": "item", "index": item.index, "status": RETRYING,
+                        "attempt": item.attempts, "retry_in": round(delay, 2), "error": item.error
+                    })
+            # Back off outside the semaphore so other items can use the slot
+            await asyncio.sleep(delay)
+
+        item.error = None
+        page = output.pop("page", None)
+        item.result.update(output)
+        if page is None:
+            item.status = DONE
+            await job.emit({"type": "item", "index": item.index, "status": DONE, **output})
+            return
+        item.status = SAVING
+        await to_save.put((item, page))
+
+    async def _save_loop(self, job: BatchJob, to_save: asyncio.Queue):
+        """Save finished pages in batches of up to save_batch_size, at least every save_interval"""
+        done = False
+        while not done:
+            batch = []
+            item = await to_save.get()
+            if item is None:
+                break
+            batch.append(item)
+            deadline = time.monotonic() + self.save_interval
+            while len(batch) < self.save_batch_size:
+                try:
+                    item = await asyncio.wait_for(to_save.get(), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+            await self._save_batch(job, batch)
+
+    async def _save_batch(self, job: BatchJob, batch: List[tuple]):
+        try:
+            saved = await self.save_many([page for _, page in batch])
+        except Exception as e:
+            print(f"Error saving batch for job {job.id}: {e}")
+            for item, _ in batch:
+                item.status = FAILED
+                item.error = f"Save failed: {e}"
+                await job.emit({"type": "item", "index": item.index, "status": FAILED, "error": item.error})
+            return
+        for (item, _), meta in zip(batch, saved):
+            item.status = SAVED
+            item.result.update({"page_id": meta["id"], "slug": meta["slug"], "url": f"/p/{meta['slug']}"})
+            await job.emit({"type": "item", "index": item.index, "status": SAVED, **item.result})
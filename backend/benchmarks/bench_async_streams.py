@@ -0,0 +1,120 @@
+"""
+Load benchmark: concurrent AIAssistant streams against the local fake LLM.
+
+Usage:
+    python benchmarks/bench_async_streams.py [--concurrency 1 50 200 500] [--tokens 200]
+
+The fake provider runs in a separate process so the numbers reflect only
+the app side. For each concurrency level this reports wall time, time to
+first chunk (p50/p99) and process CPU time per stream.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_llm(port: int, tokens: int, token_rate: float, latency: float) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [
+            sys.executable, str(BACKEND_DIR / "benchmarks" / "fake_llm.py"),
+            "--port", str(port), "--tokens", str(tokens),
+            "--token-rate", str(token_rate), "--latency", str(latency)
+        ],
+        stdout=subprocess.PIPE, text=True
+    )
+    proc.stdout.readline()  # wait for "listening"
+    return proc
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def one_stream(generate, provider: str) -> tuple:
+    start = time.perf_counter()
+    first = None
+    chunks = 0
+    async for _ in generate(f"benchmark {provider}", "Bench Brand"):
+        if first is None:
+            first = time.perf_counter() - start
+        chunks += 1
+    return first, time.perf_counter() - start, chunks
+
+
+async def run_level(assistant, provider: str, concurrency: int) -> dict:
+    generate = assistant.generate_landing_page if provider == "openrouter" else (
+        lambda prompt, brand: assistant.generate_landing_page_ab_test(prompt, brand)
+    )
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    results = await asyncio.gather(*(one_stream(generate, provider) for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    ttfb = [first for first, _, _ in results]
+    return {
+        "provider": provider,
+        "concurrency": concurrency,
+        "wall_s": wall,
+        "ttfb_p50_ms": statistics.median(ttfb) * 1e3,
+        "ttfb_p99_ms": percentile(ttfb, 0.99) * 1e3,
+        "cpu_ms_per_stream": cpu / concurrency * 1e3,
+        "chunks": sum(chunks for _, _, chunks in results),
+    }
+
+
+async def run(args, port: int):
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ.setdefault("OPENROUTER_KEY", "fake")
+    os.environ.setdefault("GEMINI_API_KEY", "fake")
+    from ai_assist import AIAssistant
+
+    assistant = AIAssistant()
+    await run_level(assistant, "openrouter", 1)  # warm up connections and imports
+
+    print(f"{'provider':>10} {'streams':>8} {'wall (s)':>9} {'ttfb p50':>9} {'ttfb p99':>9} {'cpu/stream':>11}  (ms)")
+    for provider in args.providers:
+        for concurrency in args.concurrency:
+            r = await run_level(assistant, provider, concurrency)
+            print(
+                f"{r['provider']:>10} {r['concurrency']:>8} {r['wall_s']:>9.2f} {r['ttfb_p50_ms']:>9.1f} "
+                f"{r['ttfb_p99_ms']:>9.1f} {r['cpu_ms_per_stream']:>11.2f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 50, 200, 500])
+    parser.add_argument("--providers", nargs="+", default=["openrouter", "gemini"])
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--token-rate", type=float, default=200.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_fake_llm(port, args.tokens, args.token_rate, args.latency)
+    try:
+        asyncio.run(run(args, port))
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
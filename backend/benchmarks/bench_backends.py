@@ -0,0 +1,103 @@
+"""
+Benchmark: file vs SQLite storage backends at growing corpus sizes.
+
+Usage:
+    python benchmarks/bench_backends.py [--sizes 1000 10000 100000] [--ops 200]
+
+Reports per-operation latency for listing (limit=100), slug resolution
++ record read, slug updates and batched view count updates.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from file_backend import FileBackend  # noqa: E402
+from sqlite_backend import SQLiteBackend  # noqa: E402
+
+SAMPLE_HTML = "<html><body>" + "<section><h1>Headline</h1><p>Copy</p></section>" * 40 + "</body></html>"
+
+
+def make_records(size: int):
+    base = datetime(2025, 1, 1)
+    for i in range(size):
+        stamp = (base + timedelta(seconds=i)).isoformat()
+        yield {
+            "id": str(uuid.uuid4()),
+            "slug": f"brand-{i}-{uuid.uuid4().hex[:8]}",
+            "html_content": SAMPLE_HTML,
+            "ab_variant_html": SAMPLE_HTML if i % 3 == 0 else None,
+            "brand_kit": {"name": f"Brand {i}"},
+            "seo_metadata": {},
+            "created_at": stamp,
+            "updated_at": stamp,
+            "views_count": 0,
+            "is_public": True
+        }
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def bench(backend, records, ops: int) -> dict:
+    slugs = [(r["id"], r["slug"]) for r in records]
+    ids = [page_id for page_id, _ in slugs]
+
+    def resolve():
+        _, slug = random.choice(slugs)
+        backend.read(backend.resolve_slug(slug))
+
+    def change_slug():
+        page_id = random.choice(ids)
+        backend.change_slug(page_id, f"renamed-{uuid.uuid4().hex}", datetime.utcnow().isoformat())
+
+    def add_views():
+        backend.add_views({page_id: 1 for page_id in random.sample(ids, 100)})
+
+    return {
+        "list_ms": timed(lambda: backend.list_meta(100), max(1, ops // 20)),
+        "resolve_ms": timed(resolve, ops),
+        "change_slug_ms": timed(change_slug, ops),
+        "add_views_100_ms": timed(add_views, max(1, ops // 20)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--ops", type=int, default=200)
+    args = parser.parse_args()
+
+    header = f"{'backend':>8} {'pages':>8} {'list':>10} {'resolve':>10} {'slug upd':>10} {'views x100':>11}  (ms/op)"
+    print(header)
+    for size in args.sizes:
+        records = list(make_records(size))
+        with tempfile.TemporaryDirectory() as tmp:
+            file_backend = FileBackend(str(Path(tmp) / "pages"))
+            for record in records:
+                file_backend.insert(record)
+
+            sqlite_backend = SQLiteBackend(str(Path(tmp) / "pages.db"))
+            sqlite_backend.import_records(records)
+
+            for backend in (file_backend, sqlite_backend):
+                r = bench(backend, records, args.ops)
+                print(
+                    f"{backend.name:>8} {size:>8} {r['list_ms']:>10.2f} {r['resolve_ms']:>10.3f} "
+                    f"{r['change_slug_ms']:>10.3f} {r['add_views_100_ms']:>11.2f}"
+                )
+            sqlite_backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: bulk landing page generation through the batch job API.
+
+Usage:
+    python benchmarks/bench_batch_jobs.py [--items 200] [--parallelism 8] [--backend file]
+
+Two parts:
+  save      - storing N generated pages one save_landing_page call at a
+              time vs LandingPageStorage.save_many in batches (amortized
+              manifest appends and fsyncs)
+  end2end   - a batch job of N prompt/brand items against the local fake
+              provider (benchmarks/fake_llm.py): wall time, items/s and
+              the final item counts
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from fake_llm import FakeLLMServer  # noqa: E402
+
+PAGE = "<!DOCTYPE html><html><body>" + "<section><h2>Feature</h2><p>Copy for the page.</p></section>" * 200 + "</body></html>"
+
+
+def bench_save(items: int, batch_size: int, backend: str):
+    from storage import LandingPageStorage
+    from storage_backend import create_backend
+
+    print(f"{'mode':10} {'pages':>6} {'total s':>8} {'per page ms':>12}")
+    for mode in ("one-by-one", "save_many"):
+        base_dir = tempfile.mkdtemp(prefix=f"rcg-batch-{mode}-")
+        storage = LandingPageStorage(base_dir, backend=create_backend(base_dir, backend))
+        pages = [{"html_content": PAGE + str(i), "brand_kit": {"name": f"Brand {i}"}} for i in range(items)]
+        started = time.perf_counter()
+        if mode == "one-by-one":
+            for page in pages:
+                storage.save_landing_page(**page)
+        else:
+            for i in range(0, items, batch_size):
+                storage.save_many(pages[i:i + batch_size])
+        elapsed = time.perf_counter() - started
+        storage.close()
+        print(f"{mode:10} {items:6} {elapsed:8.3f} {elapsed / items * 1e3:12.3f}")
+
+
+async def bench_end_to_end(items: int, parallelism: int, backend: str, tokens: int, token_rate: float):
+    server = FakeLLMServer(tokens=tokens, token_rate=token_rate, latency=0.05)
+    port = await server.start()
+    os.environ.update({
+        "OPENROUTER_BASE_URL": f"http://127.0.0.1:{port}/v1",
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{port}",
+        "OPENROUTER_KEY": os.getenv("OPENROUTER_KEY", "bench"),
+        "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "bench"),
+        "STORAGE_BACKEND": backend,
+        "BATCH_PARALLELISM": str(parallelism),
+        "SCHEDULER_OPENROUTER_RPM": "0",
+        "SCHEDULER_GEMINI_RPM": "0",
+    })
+    os.chdir(tempfile.mkdtemp(prefix="rcg-batch-e2e-"))
+    import main
+
+    job = main.batch_jobs.submit(
+        [{"prompt": f"Campaign {i}", "brand_name": f"Brand {i}", "assets": ["landing_page"], "use_cache": False}
+         for i in range(items)],
+        {"parallelism": parallelism}
+    )
+    events = 0
+    async for _ in job.follow():
+        events += 1
+    summary = job.summary(include_items=False)
+    server.close()
+    await asyncio.to_thread(main.storage.close)
+    print(
+        f"end2end: {items} items, parallelism {parallelism}: {summary['elapsed']:.2f}s, "
+        f"{summary['items_per_second']:.1f} items/s, {events} events, counts {summary['counts']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--parallelism", type=int, default=8)
+    parser.add_argument("--backend", choices=["file", "sqlite"], default=os.getenv("STORAGE_BACKEND", "file"))
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--token-rate", type=float, default=2000.0)
+    args = parser.parse_args()
+
+    bench_save(args.items, args.batch_size, args.backend)
+    asyncio.run(bench_end_to_end(args.items, args.parallelism, args.backend, args.tokens, args.token_rate))
+
+
+if __name__ == "__main__":
+    main()
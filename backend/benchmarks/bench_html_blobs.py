@@ -0,0 +1,108 @@
+"""
+Benchmark: inline HTML records vs compressed, content-addressed HTML blobs.
+
+Usage:
+    python benchmarks/bench_html_blobs.py [--pages 2000] [--duplicate-rate 0.2] [--reads 500]
+
+Builds a synthetic but realistic corpus: pages assembled from a pool of
+section templates with per-brand copy, about half of them with a
+near-identical A/B variant (edited headline and CTA), and a share of
+pages whose HTML repeats an earlier generation exactly, as happens when
+the same prompt is regenerated. The same corpus is stored once with
+inline HTML (the legacy record layout) and once through HTMLBlobStore.
+Reports bytes on disk and read latency for both layouts.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from corpus import build_corpus  # noqa: E402
+from html_blobs import HTMLBlobStore  # noqa: E402
+from storage import LandingPageStorage  # noqa: E402
+from storage_backend import create_backend  # noqa: E402
+
+class InlineHTML(HTMLBlobStore):
+    """Legacy layout: HTML stays inline in the page record"""
+
+    def externalize(self, record):
+        return record
+
+
+def dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run(layout: str, corpus, reads: int, backend: str) -> dict:
+    base_dir = Path(tempfile.mkdtemp(prefix=f"rcg-html-{layout}-"))
+    html_store = (InlineHTML if layout == "inline" else HTMLBlobStore)(str(base_dir / ".blobs"))
+    storage = LandingPageStorage(str(base_dir), backend=create_backend(str(base_dir), backend), html_store=html_store)
+
+    started = time.perf_counter()
+    ids = [
+        storage.save_landing_page(html, {"name": brand}, variant, None, None)["id"]
+        for brand, html, variant in corpus
+    ]
+    save_ms = (time.perf_counter() - started) / len(ids) * 1e3
+
+    rng = random.Random(1)
+    sample = [rng.choice(ids) for _ in range(reads)]
+    full, meta_only = [], []
+    for page_id in sample:
+        t = time.perf_counter()
+        storage.get_by_id(page_id)
+        full.append((time.perf_counter() - t) * 1e3)
+        t = time.perf_counter()
+        storage.get_by_id(page_id, include_html=False)
+        meta_only.append((time.perf_counter() - t) * 1e3)
+    storage.close()
+
+    db_path = base_dir.with_suffix(".db")
+    size = dir_size(base_dir) + (db_path.stat().st_size if db_path.exists() else 0)
+    blob_count = sum(1 for _ in html_store.blobs.iter_blobs())
+    return {
+        "layout": layout,
+        "bytes": size,
+        "blobs": blob_count,
+        "save_ms": save_ms,
+        "read_p50": statistics.median(full),
+        "read_p99": percentile(full, 0.99),
+        "meta_p50": statistics.median(meta_only),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--backend", choices=["file", "sqlite"], default=os.getenv("STORAGE_BACKEND", "file"))
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.pages, args.duplicate_rate)
+    raw = sum(len(html) + len(variant or "") for _, html, variant in corpus)
+    print(f"corpus: {args.pages} pages, {raw / 1e6:.1f} MB of HTML, backend={args.backend}")
+    print(f"{'layout':8} {'disk MB':>9} {'blobs':>6} {'save ms':>8} {'read p50':>9} {'read p99':>9} {'no-html p50':>12}")
+    results = [run(layout, corpus, args.reads, args.backend) for layout in ("inline", "blobs")]
+    for r in results:
+        print(
+            f"{r['layout']:8} {r['bytes'] / 1e6:9.2f} {r['blobs']:6} {r['save_ms']:8.3f} "
+            f"{r['read_p50']:9.3f} {r['read_p99']:9.3f} {r['meta_p50']:12.3f}"
+        )
+    inline, blobs = results
+    print(f"disk savings: {(1 - blobs['bytes'] / inline['bytes']) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
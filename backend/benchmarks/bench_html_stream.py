@@ -0,0 +1,121 @@
+"""
+Benchmark: incremental HTML post-processing vs re-processing the whole document per delta.
+
+Usage:
+    python benchmarks/bench_html_stream.py [--kb 64 128 256] [--delta 16] [--rounds 3]
+
+The naive baseline is what a client does with raw deltas: append each one to the
+document so far, strip the markdown fences from the whole string and cut it at the
+last '>' before rendering, so every delta costs O(document). HTMLStreamProcessor
+only looks at the new delta. Both produce the same HTML; minify() runs once at the end.
+Fence-handling regressions (FENCE_CASES) are checked at every delta size first.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from html_stream import HTMLStreamProcessor, minify  # noqa: E402
+
+
+# Model answer -> expected HTML
+FENCE_CASES = {
+    # The info string ends where the HTML starts, even without a newline
+    "```html <html><body>hi</body></html>```": "<html><body>hi</body></html>",
+    # Only a fence on a line of its own closes the block
+    "```html\n<html><pre>```js\ncode\n```</pre></html>\n```": "<html><pre>```js\ncode\n```</pre></html>\n",
+    "```html\n<html><p>a</p></html>\n  ```  \nEnjoy!": "<html><p>a</p></html>\n",
+}
+
+
+def check_fences():
+    for answer, expected in FENCE_CASES.items():
+        for size in range(1, len(answer) + 1):
+            html = incremental(deltas(answer, size))
+            if html != expected:
+                raise SystemExit(f"Fence handling regressed for {answer!r} in {size}-character deltas: {html!r}")
+
+
+def make_answer(size: int, seed: int = 1) -> str:
+    rng = random.Random(seed)
+    sections = []
+    length = 0
+    while length < size:
+        words = " ".join(rng.choice(("fast", "bright", "organic", "premium", "fresh", "bold")) for _ in range(12))
+        section = (
+            f'    <section class="feature-{len(sections)}">\n'
+            f"      <h2>Feature {len(sections)}</h2>\n"
+            f"      <!-- copy block -->\n"
+            f"      <p>{words}</p>\n"
+            f"    </section>\n"
+        )
+        sections.append(section)
+        length += len(section)
+    body = "".join(sections)
+    return f"Here is your page:\n\n```html\n<!DOCTYPE html>\n<html>\n  <body>\n{body}  </body>\n</html>\n```\n\nEnjoy!"
+
+
+def deltas(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def naive(parts) -> str:
+    document = html = ""
+    for part in parts:
+        document += part
+        start = document.find("```html\n")
+        html = document[start + 8:] if start != -1 else document
+        end = html.find("```")
+        html = html[:end] if end != -1 else html
+        _ = html[:html.rfind(">") + 1]  # the part a client can render
+    return html
+
+
+def incremental(parts) -> str:
+    processor = HTMLStreamProcessor()
+    for part in parts:
+        processor.feed(part)
+    processor.finish()
+    return processor.html()
+
+
+def timed(fn, parts, rounds: int):
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = fn(parts)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb", type=int, nargs="+", default=[64, 128, 256], help="Document sizes in KiB")
+    parser.add_argument("--delta", type=int, default=16, help="Characters per model delta")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    check_fences()
+
+    print(f"{'size':>8} {'deltas':>8} {'naive ms':>10} {'incremental ms':>15} {'speedup':>8} {'minify ms':>10} {'minified':>9}")
+    for kb in args.kb:
+        parts = deltas(make_answer(kb * 1024), args.delta)
+        naive_time, expected = timed(naive, parts, args.rounds)
+        incremental_time, html = timed(incremental, parts, args.rounds)
+        if html != expected:
+            raise SystemExit("Incremental output differs from the naive output")
+        started = time.perf_counter()
+        minified = minify(html)
+        minify_time = time.perf_counter() - started
+        print(
+            f"{kb:>6}KB {len(parts):>8} {naive_time * 1000:>10.1f} {incremental_time * 1000:>15.1f} "
+            f"{naive_time / incremental_time:>7.1f}x {minify_time * 1000:>10.2f} {len(minified) / len(html):>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
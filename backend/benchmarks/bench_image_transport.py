@@ -0,0 +1,72 @@
+"""
+Benchmark: bytes on the wire and server CPU per image, base64-in-JSON vs binary frames.
+
+Usage:
+    python benchmarks/bench_image_transport.py [--sizes 500000 1500000] [--repeat 50]
+
+Images are random bytes (PNG payloads are already compressed, so they
+behave like incompressible data). "server" is the per-image encode cost
+on the API side; "client" is the cost of getting raw bytes back out.
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from framing import decode_frames, encode_frame  # noqa: E402
+
+
+def json_transport(image: bytes) -> bytes:
+    return (json.dumps({"image": base64.b64encode(image).decode("utf-8")}) + "\n").encode("utf-8")
+
+
+def json_decode(wire: bytes) -> bytes:
+    return base64.b64decode(json.loads(wire)["image"])
+
+
+def frame_transport(image: bytes) -> bytes:
+    header = {"type": "image", "mime_type": "image/png", "size": len(image), "url": "/assets/images/x.png"}
+    return encode_frame(header, image)
+
+
+def frame_decode(wire: bytes) -> bytes:
+    return next(decode_frames(wire))[1]
+
+
+def measure(encode, decode, image: bytes, repeat: int) -> dict:
+    start = time.process_time()
+    for _ in range(repeat):
+        wire = encode(image)
+    server = (time.process_time() - start) / repeat
+    start = time.process_time()
+    for _ in range(repeat):
+        assert decode(wire) == image
+    client = (time.process_time() - start) / repeat
+    return {"wire_bytes": len(wire), "server_ms": server * 1e3, "client_ms": client * 1e3}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500_000, 1_500_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'transport':>10} {'image':>10} {'wire bytes':>11} {'overhead':>9} {'server ms':>10} {'client ms':>10}")
+    for size in args.sizes:
+        image = os.urandom(size)
+        for name, encode, decode in (("json+b64", json_transport, json_decode), ("frames", frame_transport, frame_decode)):
+            r = measure(encode, decode, image, args.repeat)
+            overhead = (r["wire_bytes"] - size) / size * 100
+            print(
+                f"{name:>10} {size:>10} {r['wire_bytes']:>11} {overhead:>8.1f}% "
+                f"{r['server_ms']:>10.3f} {r['client_ms']:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: cost of the always-on instrumentation.
+
+Usage:
+    python benchmarks/bench_metrics_overhead.py [--iterations 200000] [--requests 20000]
+
+Reports the cost of a single histogram observation and counter increment,
+the per-request overhead of MetricsMiddleware around a minimal ASGI app,
+the overhead of the instrument_stream wrapper per generated chunk, and how
+long a /metrics render takes with the registry populated.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from metrics import MetricsMiddleware, Registry, instrument_stream  # noqa: E402
+
+
+class Route:
+    path = "/p/{slug}"
+
+
+async def app(scope, receive, send):
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def per_request(handler, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/p/slug"}
+    started = time.perf_counter()
+    for _ in range(requests):
+        await handler(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+async def per_chunk(generator, chunks: int) -> float:
+    started = time.perf_counter()
+    async for _ in generator(chunks):
+        pass
+    return (time.perf_counter() - started) / chunks
+
+
+async def chunks_raw(count: int):
+    for _ in range(count):
+        yield {"html": "<p>token</p>"}
+
+
+async def run(args):
+    registry = Registry()
+    histogram = registry.histogram("bench_seconds", "bench", ("route",))
+    counter = registry.counter("bench_total", "bench", ("route",))
+
+    started = time.perf_counter()
+    for i in range(args.iterations):
+        histogram.observe(0.003, "/p/{slug}")
+    observe_ns = (time.perf_counter() - started) / args.iterations * 1e9
+    started = time.perf_counter()
+    for i in range(args.iterations):
+        counter.inc(1.0, "/p/{slug}")
+    inc_ns = (time.perf_counter() - started) / args.iterations * 1e9
+
+    bare = await per_request(app, args.requests)
+    wrapped = await per_request(MetricsMiddleware(app, histogram=registry.histogram("bench_http", "bench", ("method", "route", "status"))), args.requests)
+
+    raw_chunk = await per_chunk(chunks_raw, args.iterations)
+    timed_chunk = await per_chunk(instrument_stream("bench")(chunks_raw), args.iterations)
+
+    for i in range(200):
+        histogram.observe(0.001 * i, f"/route/{i}")
+    started = time.perf_counter()
+    body = registry.render()
+    render_ms = (time.perf_counter() - started) * 1e3
+
+    print(f"histogram observe      {observe_ns:8.0f} ns")
+    print(f"counter inc            {inc_ns:8.0f} ns")
+    print(f"request, bare app      {bare * 1e6:8.2f} us")
+    print(f"request, middleware    {wrapped * 1e6:8.2f} us  (+{(wrapped - bare) * 1e6:.2f} us)")
+    print(f"chunk, bare generator  {raw_chunk * 1e9:8.0f} ns")
+    print(f"chunk, instrumented    {timed_chunk * 1e9:8.0f} ns  (+{(timed_chunk - raw_chunk) * 1e9:.0f} ns)")
+    print(f"render, 200 series     {render_ms:8.2f} ms  ({len(body) / 1024:.0f} KiB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: slug resolution latency as the number of stored pages grows.
+
+Usage:
+    python benchmarks/bench_slug_lookup.py [--sizes 100 1000 10000] [--lookups 500]
+
+With the slug index, get_by_slug is one dict lookup plus one file read,
+so the per-lookup latency should stay flat across corpus sizes.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from storage import LandingPageStorage  # noqa: E402
+
+SAMPLE_HTML = "<html><body>" + "<section><h1>Headline</h1><p>Copy</p></section>" * 200 + "</body></html>"
+
+
+def run(size: int, lookups: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = LandingPageStorage(base_dir=tmp)
+        try:
+            slugs = [
+                storage.save_landing_page(SAMPLE_HTML, brand_kit={"name": f"Brand {i}"})["slug"]
+                for i in range(size)
+            ]
+
+            # Startup lasts until the index is loaded, not just until the constructor returns
+            start = time.perf_counter()
+            reopened = LandingPageStorage(base_dir=tmp)
+            reopened.backend.wait_ready()
+            startup = time.perf_counter() - start
+            reopened.close()
+
+            sample = [random.choice(slugs) for _ in range(lookups)]
+            start = time.perf_counter()
+            for slug in sample:
+                assert storage.get_by_slug(slug) is not None
+            elapsed = time.perf_counter() - start
+        finally:
+            storage.close()
+
+    return {
+        "pages": size,
+        "lookup_us": elapsed / lookups * 1e6,
+        "startup_ms": startup * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--lookups", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'pages':>8} {'lookup (us)':>12} {'startup (ms)':>13}")
+    for size in args.sizes:
+        result = run(size, args.lookups)
+        print(f"{result['pages']:>8} {result['lookup_us']:>12.1f} {result['startup_ms']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: server startup time vs number of stored landing pages.
+
+Usage:
+    python benchmarks/bench_startup.py [--sizes 10000 100000]
+
+For each corpus size, starts a fresh interpreter that imports `main` from
+a data directory holding that many pages (file backend) and reports:
+  import   - until `main` is imported and the app can accept traffic
+  first    - until a request for one random slug has been answered
+  ready    - until the page index is fully warm
+  clients  - first-use cost of creating the AI provider clients
+in four modes: no index snapshot (pages are scanned) or a persisted
+snapshot, each with STORAGE_WARMUP=blocking or background.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from html_blobs import HTMLBlobStore  # noqa: E402
+
+CHILD = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import main
+imported = time.perf_counter()
+page = main.storage.get_by_slug(sys.argv[2])
+first = time.perf_counter()
+assert page is not None, "slug not found"
+main.storage.backend.wait_ready()
+ready = time.perf_counter()
+main.ai_assistant.prewarm()
+clients = time.perf_counter() - ready
+print(f"{imported - start} {first - start} {ready - start} {clients}")
+"""
+
+
+def make_corpus(root: Path, size: int) -> list:
+    pages_dir = root / "data" / "landing-pages"
+    pages_dir.mkdir(parents=True)
+    html_store = HTMLBlobStore(str(pages_dir / ".blobs"))
+    refs = {"html_content": html_store.put("<html><body>" + "<p>Landing page</p>" * 500 + "</body></html>")}
+    base = datetime(2025, 1, 1)
+    slugs = []
+    for i in range(size):
+        stamp = (base + timedelta(seconds=i)).isoformat()
+        record = {
+            "id": str(uuid.uuid4()),
+            "slug": f"brand-{i}-{uuid.uuid4().hex[:8]}",
+            "html_content": None,
+            "ab_variant_html": None,
+            "ab_weights": None,
+            "brand_kit": {"name": f"Brand {i}", "colors": ["#111111", "#eeeeee"]},
+            "seo_metadata": {"title": f"Brand {i}", "description": "Landing page"},
+            "created_at": stamp,
+            "updated_at": stamp,
+            "views_count": 0,
+            "is_public": True,
+            "blobs": refs
+        }
+        with open(pages_dir / f"{record['id']}.json", "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        slugs.append(record["slug"])
+    return slugs
+
+
+def start_once(root: Path, slug: str, warmup: str) -> list:
+    env = {k: v for k, v in os.environ.items() if k not in ("GEMINI_API_KEY", "OPENROUTER_KEY")}
+    env.update({"STORAGE_BACKEND": "file", "STORAGE_WARMUP": warmup, "GEMINI_API_KEY": "bench", "OPENROUTER_KEY": "bench"})
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, str(BACKEND_DIR), slug],
+        cwd=root, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return [float(x) for x in out.strip().splitlines()[-1].split()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'pages':>7} {'index':9} {'warmup':11} {'import s':>9} {'first s':>8} {'ready s':>8} {'clients s':>10}")
+    for size in args.sizes:
+        root = Path(tempfile.mkdtemp(prefix="rcg-startup-"))
+        slugs = make_corpus(root, size)
+        slug = random.Random(size).choice(slugs)
+        index_dir = root / "data" / "landing-pages" / ".index"
+        for index in ("none", "snapshot"):
+            for warmup in ("blocking", "background"):
+                if index == "none":
+                    shutil.rmtree(index_dir, ignore_errors=True)
+                imported, first, ready, clients = start_once(root, slug, warmup)
+                print(f"{size:7} {index:9} {warmup:11} {imported:9.3f} {first:8.3f} {ready:8.3f} {clients:10.3f}")
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
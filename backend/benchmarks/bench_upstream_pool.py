@@ -0,0 +1,145 @@
+"""
+Benchmark: pooled upstream transport vs a new provider client per request.
+
+Usage:
+    python benchmarks/bench_upstream_pool.py [--requests 200] [--concurrency 16] [--connect-delay 0.05]
+
+Runs landing page (OpenRouter protocol) and copy variant (Gemini protocol)
+generations against the local fake provider, which counts the TCP
+connections it accepts and charges `--connect-delay` seconds per new
+connection to stand in for TCP + TLS handshakes. Modes:
+  fresh    - a new SDK client (and connection pool) for every request,
+             as talk_to_gemini used to do
+  pooled   - the shared clients of AIAssistant on the upstream transport
+  prewarm  - pooled, with connections opened before the first request
+Reports connections opened, time to first chunk p50/p99 and throughput,
+plus the transport's own connect/TTFB/total timings for the pooled runs.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from fake_llm import FakeLLMServer  # noqa: E402
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run_mode(mode: str, args) -> dict:
+    server = FakeLLMServer(tokens=args.tokens, token_rate=args.token_rate, latency=args.latency, connect_delay=args.connect_delay)
+    port = await server.start()
+    os.environ.update({
+        "OPENROUTER_BASE_URL": f"http://127.0.0.1:{port}/v1",
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{port}",
+        "OPENROUTER_KEY": "bench",
+        "GEMINI_API_KEY": "bench",
+        "UPSTREAM_PREWARM_CONNECTIONS": str(args.concurrency),
+    })
+    # Fresh modules per run so every mode starts with empty pools and stats
+    for name in ("ai_assist", "upstream"):
+        sys.modules.pop(name, None)
+    import ai_assist
+    import upstream
+    from google import genai
+    from google.genai import types
+    from openai import AsyncOpenAI
+
+    assistant = ai_assist.AIAssistant()
+
+    async def landing_page(index: int):
+        if mode == "fresh":
+            client = AsyncOpenAI(base_url=ai_assist.OPENROUTER_BASE_URL, api_key="bench")
+            stream = await client.chat.completions.create(
+                model=assistant.openrouter_model, messages=[{"role": "user", "content": f"page {index}"}], stream=True
+            )
+            try:
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                await client.close()
+        else:
+            async for chunk in assistant.generate_landing_page(f"page {index}", "Bench"):
+                yield chunk
+
+    async def copy_variants(index: int):
+        if mode == "fresh":
+            client = genai.Client(api_key="bench", http_options=types.HttpOptions(base_url=ai_assist.GEMINI_BASE_URL))
+            stream = await client.aio.models.generate_content_stream(model=assistant.model, contents=f"copy {index}")
+            async for chunk in stream:
+                yield chunk
+        else:
+            stream = await assistant.client.aio.models.generate_content_stream(model=assistant.model, contents=f"copy {index}")
+            async for chunk in stream:
+                yield chunk
+
+    if mode == "prewarm":
+        assistant.prewarm()
+        await assistant.prewarm_connections()
+    connections_before = server.connections
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    first_chunk = []
+
+    async def one(index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            generator = landing_page(index) if index % 2 == 0 else copy_variants(index)
+            first = None
+            async for _ in generator:
+                if first is None:
+                    first = time.perf_counter() - started
+            first_chunk.append(first)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    transport = upstream.upstream_stats.snapshot() if mode != "fresh" else {}
+    await upstream.aclose()
+    server.close()
+    return {
+        "mode": mode,
+        "connections": server.connections - connections_before,
+        "prewarmed": connections_before,
+        "ttfc_p50": statistics.median(first_chunk),
+        "ttfc_p99": percentile(first_chunk, 0.99),
+        "rps": args.requests / elapsed,
+        "transport": transport,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--connect-delay", type=float, default=0.05)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-rate", type=float, default=1000.0)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    print(f"{'mode':8} {'conns':>6} {'prewarm':>8} {'ttfc p50 ms':>12} {'ttfc p99 ms':>12} {'req/s':>8}")
+    results = [asyncio.run(run_mode(mode, args)) for mode in ("fresh", "pooled", "prewarm")]
+    for r in results:
+        print(
+            f"{r['mode']:8} {r['connections']:6} {r['prewarmed']:8} {r['ttfc_p50'] * 1e3:12.1f} "
+            f"{r['ttfc_p99'] * 1e3:12.1f} {r['rps']:8.1f}"
+        )
+    for r in results:
+        for host, stats in r["transport"].items():
+            timings = " ".join(
+                f"{phase} p50={t['p50'] * 1e3:.1f}ms" for phase, t in stats["timings"].items() if t["count"]
+            )
+            print(f"{r['mode']} transport {host}: opened {stats['connections_opened']}, reused {stats['connections_reused']}, {timings}")
+
+
+if __name__ == "__main__":
+    main()
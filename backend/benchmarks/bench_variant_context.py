@@ -0,0 +1,100 @@
+"""
+Benchmark: A/B variants with the page in a context cache vs sent inline with every request.
+
+Usage:
+    python benchmarks/bench_variant_context.py [--kb 48] [--variants 4] [--rounds 3] [--prefill-rate 2000000]
+
+Generates `--variants` variants of one page `--rounds` times through VariantEngine
+against the local fake provider, once with the provider context cache and once
+emulated (page inline in every request). The fake provider charges `--prefill-rate`
+prompt bytes per second before the first chunk to stand in for prefill latency.
+Reports request bytes sent upstream (including the cache upload), time to first
+chunk p50 and wall time.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from fake_llm import FakeLLMServer  # noqa: E402
+
+
+def make_page(size: int) -> str:
+    section = '<section class="feature"><h2>Feature</h2><p>Fast, organic and premium products for you.</p></section>\n'
+    return "<!DOCTYPE html><html><body>\n" + section * (size // len(section) + 1) + "</body></html>"
+
+
+async def run_mode(emulate: bool, args) -> dict:
+    server = FakeLLMServer(tokens=args.tokens, token_rate=args.token_rate, latency=args.latency, prefill_rate=args.prefill_rate)
+    port = await server.start()
+    os.environ.update({"GEMINI_BASE_URL": f"http://127.0.0.1:{port}", "GEMINI_API_KEY": "fake"})
+    import ai_assist
+    import upstream
+    from variant_engine import VariantEngine
+    ai_assist.GEMINI_BASE_URL = os.environ["GEMINI_BASE_URL"]
+    assistant = ai_assist.AIAssistant()
+    engine = VariantEngine(assistant, emulate=emulate, min_cache_chars=0)
+    page = make_page(args.kb * 1024)
+
+    first_chunks = []
+
+    async def variant(index: int):
+        started = time.perf_counter()
+        first = None
+        async for _ in engine.stream_variant(page, "Bench", index, args.variants):
+            if first is None:
+                first = time.perf_counter() - started
+        first_chunks.append(first)
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        await asyncio.gather(*(variant(i) for i in range(args.variants)))
+    elapsed = time.perf_counter() - started
+
+    uploaded = sum(server.cached_contents.values())
+    await engine.aclose()
+    await upstream.aclose()
+    server.close()
+    return {
+        "bytes": server.prompt_bytes + uploaded,
+        "first_chunk_p50": statistics.median(first_chunks),
+        "elapsed": elapsed,
+        "stats": engine.stats()
+    }
+
+
+async def main_async(args):
+    # Import the SDK up front so neither mode pays for it
+    from google import genai  # noqa: F401
+    print(f"page {args.kb}KB, {args.variants} variants x {args.rounds} rounds")
+    print(f"{'mode':>8} {'upstream KB':>12} {'first chunk p50 ms':>19} {'wall s':>8} {'contexts':>9}")
+    for emulate in (True, False):
+        result = await run_mode(emulate, args)
+        stats = result["stats"]
+        contexts = stats["emulated_contexts"] if emulate else stats["provider_contexts"]
+        print(
+            f"{'inline' if emulate else 'cached':>8} {result['bytes'] / 1024:>12.1f} "
+            f"{result['first_chunk_p50'] * 1000:>19.1f} {result['elapsed']:>8.2f} {contexts:>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb", type=int, default=48, help="Base page size in KiB")
+    parser.add_argument("--variants", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--token-rate", type=float, default=1000.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--prefill-rate", type=float, default=2_000_000.0, help="Prompt bytes per second (0 = instant)")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
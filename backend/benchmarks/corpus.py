@@ -0,0 +1,131 @@
+"""
+Synthetic landing page corpus for benchmarks.
+
+Usage:
+    python benchmarks/corpus.py --pages 10000 [--data-dir data/landing-pages] [--backend file]
+
+Pages are assembled from a pool of section templates with per-brand copy
+(Tailwind classes, inline styles, hero/features/pricing/FAQ sections), so
+their size and compressibility resemble generated pages. About half get a
+near-identical A/B variant, and a share repeat an earlier generation
+exactly, as happens when the same prompt is regenerated. The CLI fills a
+store through LandingPageStorage.save_many, like batch jobs do.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+WORDS = (
+    "fast secure simple modern trusted premium smart elegant powerful reliable "
+    "organic fresh bold clean seamless effortless scalable friendly global local"
+).split()
+
+SECTIONS = [
+    '<section class="hero bg-gradient-to-r from-{c}-500 to-{c}-700 py-24"><div class="container mx-auto px-6">'
+    '<h1 class="text-5xl font-bold text-white">{headline}</h1><p class="mt-4 text-xl text-white/80">{copy}</p>'
+    '<a href="#signup" class="mt-8 inline-block rounded-full bg-white px-8 py-3 font-semibold text-{c}-700">{cta}</a></div></section>',
+    '<section class="features py-20"><div class="grid grid-cols-3 gap-8">' + "".join(
+        '<div class="rounded-xl p-6 shadow-lg"><h3 class="text-xl font-semibold">{w%d}</h3><p class="text-gray-600">{copy}</p></div>' % i
+        for i in range(6)
+    ) + '</div></section>',
+    '<section class="testimonials bg-gray-50 py-20"><blockquote class="text-2xl italic">"{copy}"</blockquote>'
+    '<cite class="mt-4 block text-gray-500">- Happy {brand} customer</cite></section>',
+    '<section class="pricing py-20"><div class="grid grid-cols-3 gap-6">' + "".join(
+        '<div class="rounded-2xl border p-8"><h4>{w%d} plan</h4><p class="text-4xl font-bold">${p%d}</p>'
+        '<ul class="mt-6 space-y-2"><li>{copy}</li><li>{copy}</li></ul><a class="btn btn-{c}">{cta}</a></div>' % (i, i)
+        for i in range(3)
+    ) + '</div></section>',
+    '<section class="faq py-20">' + "".join(
+        '<details class="border-b py-4"><summary class="font-medium">{w%d}?</summary><p>{copy}</p></details>' % i
+        for i in range(5)
+    ) + '</section>',
+]
+
+STYLE = "<style>" + "".join(f".c{i}{{margin:{i}px;padding:{i % 7}px;color:#{i:06x}}}" for i in range(400)) + "</style>"
+
+
+def make_page(rng: random.Random, brand: str) -> str:
+    def sentence(n: int = 14) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+    fields = {
+        "brand": brand,
+        "c": rng.choice(["blue", "green", "purple", "rose", "amber"]),
+        "headline": f"{brand}: {sentence(6)}",
+        "cta": rng.choice(["Get started", "Start free trial", "Join now", "Book a demo"]),
+        **{f"w{i}": rng.choice(WORDS).title() for i in range(6)},
+        **{f"p{i}": rng.randint(9, 99) for i in range(3)},
+    }
+    body = []
+    for template in rng.sample(SECTIONS, k=len(SECTIONS)):
+        # Every {copy} gets its own sentence
+        parts = template.split("{copy}")
+        body.append("".join(part.format(**fields) + (sentence() if i < len(parts) - 1 else "") for i, part in enumerate(parts)))
+    return (
+        f"<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\"><title>{brand}</title>"
+        f"<script src=\"https://cdn.tailwindcss.com\"></script>{STYLE}</head><body>{''.join(body)}</body></html>"
+    )
+
+
+def make_variant(html: str) -> str:
+    return html.replace("Get started", "Try it free").replace("<h1 class=\"text-5xl", "<h1 class=\"text-6xl", 1)
+
+
+def build_corpus(pages: int, duplicate_rate: float, seed: int = 7):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(pages):
+        if corpus and rng.random() < duplicate_rate:
+            html, variant = rng.choice(corpus)[1:]
+        else:
+            html = make_page(rng, f"Brand {i}")
+            variant = make_variant(html) if rng.random() < 0.5 else None
+        corpus.append((f"Brand {i}", html, variant))
+    return corpus
+
+
+def fill_storage(storage, pages: int, duplicate_rate: float = 0.2, seed: int = 7, batch_size: int = 256) -> List[Tuple[str, str]]:
+    """Save a generated corpus into a LandingPageStorage. Returns (id, slug) per page."""
+    saved = []
+    corpus = build_corpus(pages, duplicate_rate, seed)
+    for start in range(0, len(corpus), batch_size):
+        batch = [
+            {
+                "html_content": html,
+                "brand_kit": {"name": brand, "colors": ["#0f172a", "#22c55e"]},
+                "ab_variant_html": variant,
+                "seo_metadata": {"title": f"{brand} - Official site", "description": f"Landing page for {brand}"}
+            }
+            for brand, html, variant in corpus[start:start + batch_size]
+        ]
+        saved.extend((meta["id"], meta["slug"]) for meta in storage.save_many(batch))
+    return saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=10000)
+    parser.add_argument("--data-dir", default="data/landing-pages")
+    parser.add_argument("--backend", choices=["file", "sqlite"], default=os.getenv("STORAGE_BACKEND", "file"))
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from storage import LandingPageStorage
+    from storage_backend import create_backend
+
+    storage = LandingPageStorage(args.data_dir, backend=create_backend(args.data_dir, args.backend))
+    started = time.perf_counter()
+    saved = fill_storage(storage, args.pages, args.duplicate_rate, args.seed)
+    storage.close()
+    print(f"Saved {len(saved)} pages to {args.data_dir} ({args.backend}) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Local fake LLM provider for benchmarks.
+
+Speaks just enough of two streaming protocols to drive AIAssistant:
+  - OpenAI / OpenRouter:  POST /v1/chat/completions  (stream=true, SSE)
+  - Gemini:               POST /v1beta/models/{model}:streamGenerateContent?alt=sse
+                          (image models, "...-image", answer with inline image data)
+                          POST/DELETE /v1beta/cachedContents  (context caching)
+
+Usage:
+    python benchmarks/fake_llm.py --port 8911 --tokens 200 --token-rate 500 --latency 0.05
+
+Point the app at it with:
+    OPENROUTER_BASE_URL=http://127.0.0.1:8911/v1 GEMINI_BASE_URL=http://127.0.0.1:8911
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+from typing import Dict
+
+
+class FakeLLMServer:
+    """Minimal asyncio HTTP/1.1 server with keep-alive and chunked SSE responses"""
+
+    def __init__(self, tokens: int = 200, token_rate: float = 500.0, latency: float = 0.05, connect_delay: float = 0.0,
+                 image_bytes: int = 256 * 1024, prefill_rate: float = 0.0):
+        self.tokens = tokens
+        self.token_rate = token_rate
+        self.latency = latency
+        self.image_bytes = image_bytes
+        self._image = None
+        # Simulated handshake cost (TCP + TLS) paid once per new connection
+        self.connect_delay = connect_delay
+        # Simulated prompt processing: request body bytes per second before the first chunk (0 = off)
+        self.prefill_rate = prefill_rate
+
+        self.connections = 0
+        self.requests = 0
+        # Request body bytes of generation calls (what context caching saves) and live cached contents
+        self.prompt_bytes = 0
+        self.cached_contents: Dict[str, int] = {}
+        self._server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=4096)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            if self.connect_delay:
+                await asyncio.sleep(self.connect_delay)
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = request_line.split(" ", 2)
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+                await self._respond(method, target, body, writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, target: str, body: bytes, writer: asyncio.StreamWriter):
+        path = target.split("?", 1)[0]
+        if method == "POST" and path.endswith("/chat/completions"):
+            self.prompt_bytes += len(body)
+            frames = self._openai_frames(json.loads(body or b"{}").get("model", "fake"))
+        elif method == "POST" and path.endswith(":streamGenerateContent"):
+            self.prompt_bytes += len(body)
+            model = path.rsplit("/", 1)[-1].split(":", 1)[0]
+            frames = self._gemini_image_frames() if model.endswith("-image") else self._gemini_frames()
+        elif method == "POST" and path.endswith("/cachedContents"):
+            request = json.loads(body or b"{}")
+            name = f"cachedContents/fake-{len(self.cached_contents) + 1}"
+            self.cached_contents[name] = len(body)
+            if self.prefill_rate > 0:
+                await asyncio.sleep(len(body) / self.prefill_rate)
+            await self._json(writer, 200, {"name": name, "model": request.get("model", "fake"), "usageMetadata": {"totalTokenCount": len(body) // 4}})
+            return
+        elif method == "DELETE" and "/cachedContents/" in path:
+            found = self.cached_contents.pop(path.split("/v1beta/", 1)[-1], None) is not None
+            await self._json(writer, 200 if found else 404, {} if found else {"error": "not found"})
+            return
+        else:
+            await self._json(writer, 404, {"error": "not found"}, head_only=method == "HEAD")
+            return
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nTransfer-Encoding: chunked\r\n\r\n"
+        )
+        await asyncio.sleep(self.latency + (len(body) / self.prefill_rate if self.prefill_rate > 0 else 0.0))
+        interval = 1.0 / self.token_rate if self.token_rate > 0 else 0.0
+        start = time.perf_counter()
+        frames = list(frames)
+        for i, frame in enumerate(frames):
+            data = frame.encode("utf-8")
+            last = i == len(frames) - 1
+            # The terminating chunk goes out with the last frame, as real providers send it;
+            # clients that stop reading at the last event can then keep the connection
+            writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n" + (b"0\r\n\r\n" if last else b""))
+            await writer.drain()
+            # Pace tokens against the wall clock so slow scheduling does not accumulate
+            delay = start + (i + 1) * interval - time.perf_counter()
+            if delay > 0 and not last:
+                await asyncio.sleep(delay)
+
+    async def _json(self, writer: asyncio.StreamWriter, status: int, body: Dict, head_only: bool = False):
+        payload = json.dumps(body).encode("utf-8")
+        reason = "OK" if status == 200 else "Not Found"
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n".encode()
+            + f"Content-Length: {len(payload)}\r\n\r\n".encode() + (b"" if head_only else payload)
+        )
+        await writer.drain()
+
+    def _token(self, i: int) -> str:
+        return f"<p>token {i}</p>\n"
+
+    def _openai_frames(self, model: str):
+        created = int(time.time())
+        for i in range(self.tokens):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"role": "assistant", "content": self._token(i)}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    def _gemini_frames(self):
+        for i in range(self.tokens):
+            chunk = {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": self._token(i)}]}, "index": 0}],
+                "modelVersion": "fake"
+            }
+            yield f"data: {json.dumps(chunk)}\r\n\r\n"
+
+    def _gemini_image_frames(self):
+        # Incompressible bytes, like a real PNG; built once and reused for every response
+        if self._image is None:
+            self._image = base64.b64encode(b"\x89PNG\r\n\x1a\n" + os.urandom(self.image_bytes)).decode("ascii")
+        text = {"candidates": [{"content": {"role": "model", "parts": [{"text": "Here is your ad."}]}, "index": 0}]}
+        image = {
+            "candidates": [{"content": {"role": "model", "parts": [{"inlineData": {"mimeType": "image/png", "data": self._image}}]}, "index": 0}],
+            "modelVersion": "fake"
+        }
+        yield f"data: {json.dumps(text)}\r\n\r\n"
+        yield f"data: {json.dumps(image)}\r\n\r\n"
+
+
+async def _main(args):
+    server = FakeLLMServer(
+        tokens=args.tokens, token_rate=args.token_rate, latency=args.latency,
+        connect_delay=args.connect_delay, image_bytes=args.image_bytes, prefill_rate=args.prefill_rate
+    )
+    port = await server.start(args.host, args.port)
+    print(f"Fake LLM listening on http://{args.host}:{port}", flush=True)
+    await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake LLM provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8911)
+    parser.add_argument("--tokens", type=int, default=200, help="Chunks per response")
+    parser.add_argument("--token-rate", type=float, default=500.0, help="Chunks per second (0 = unthrottled)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first chunk")
+    parser.add_argument("--connect-delay", type=float, default=0.0, help="Seconds of simulated handshake per new connection")
+    parser.add_argument("--prefill-rate", type=float, default=0.0, help="Prompt bytes processed per second (0 = instant)")
+    parser.add_argument("--image-bytes", type=int, default=256 * 1024, help="Size of generated images")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+"""
+Reproducible benchmark suite: storage, page serving and streaming generation.
+
+Usage:
+    python benchmarks/run_suite.py [--pages 5000] [--backend file] [--scenarios storage_get_by_slug serve_page_hot]
+    python benchmarks/run_suite.py --compare benchmarks/results/A.json benchmarks/results/B.json
+
+A corpus of --pages realistic landing pages (benchmarks/corpus.py) is
+written to a temporary data directory once. Every scenario then runs in a
+fresh interpreter with that directory as its working directory, so module
+state, caches and memory numbers do not leak between scenarios.
+Generation scenarios talk to the local fake provider (benchmarks/fake_llm.py),
+started in its own process with the given token rate and latency.
+
+Each scenario reports operations, throughput, p50/p99/max latency and
+memory (RSS after setup, growth during the scenario, and peak). Results
+are written as JSON (default benchmarks/results/<timestamp>-<commit>.json)
+together with the parameters, commit and platform of the run. --compare
+prints the change per scenario and metric between two result files and
+exits with status 1 when a latency or throughput regression exceeds
+--threshold percent.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+SCENARIOS = {
+    "storage_save": "save_landing_page, one page per call",
+    "storage_get_by_slug": "get_by_slug for random stored slugs (HTML included)",
+    "storage_list_all": "list_all pages of 100, walking the cursor from random starting points",
+    "serve_page_hot": "GET /p/{slug} over a small hot set (page cache hits)",
+    "serve_page_uniform": "GET /p/{slug} over all slugs (mostly cache misses)",
+    "stream_landing_page": "concurrent /generate-landing-page streams against the fake provider",
+    "stream_instagram_ad": "concurrent binary /generate-instagram-ad/binary image streams",
+}
+
+
+# --- measurement helpers ---
+
+def rss_mb() -> float:
+    """Current resident set size (falls back to the peak where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def summarize(latencies, elapsed: float, rss_before: float, **extra) -> dict:
+    return {
+        "operations": len(latencies),
+        "elapsed_s": round(elapsed, 4),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.5) * 1e3, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1e3, 4),
+        "max_ms": round(max(latencies) * 1e3, 4),
+        "rss_mb": round(rss_before, 1),
+        "rss_growth_mb": round(rss_mb() - rss_before, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        **extra
+    }
+
+
+def timed_loop(fn, args_list) -> tuple:
+    latencies = []
+    started = time.perf_counter()
+    for args in args_list:
+        t = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - t)
+    return latencies, time.perf_counter() - started
+
+
+async def timed_gather(coros, concurrency: int) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(coro):
+        async with semaphore:
+            t = time.perf_counter()
+            result = await coro
+            latencies.append(time.perf_counter() - t)
+            return result
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(c) for c in coros))
+    return latencies, time.perf_counter() - started, results
+
+
+# --- scenarios (run inside the child process, cwd = data root) ---
+
+def load_slugs() -> list:
+    return json.loads(Path("slugs.json").read_text())
+
+
+def open_storage(args):
+    from storage import LandingPageStorage
+    from storage_backend import create_backend
+    storage = LandingPageStorage("data/landing-pages", backend=create_backend("data/landing-pages", args.backend))
+    storage.backend.wait_ready()
+    return storage
+
+
+def scenario_storage_save(args) -> dict:
+    from corpus import build_corpus
+    storage = open_storage(args)
+    pages = build_corpus(args.operations, 0.2, seed=11)
+    rss_before = rss_mb()
+    latencies, elapsed = timed_loop(
+        lambda brand, html, variant: storage.save_landing_page(html, {"name": brand}, variant),
+        pages
+    )
+    result = summarize(latencies, elapsed, rss_before)
+    storage.close()
+    return result
+
+
+def scenario_storage_get_by_slug(args) -> dict:
+    storage = open_storage(args)
+    rng = random.Random(1)
+    slugs = load_slugs()
+    sample = [(rng.choice(slugs),) for _ in range(args.operations)]
+    rss_before = rss_mb()
+    latencies, elapsed = timed_loop(storage.get_by_slug, sample)
+    result = summarize(latencies, elapsed, rss_before)
+    storage.close()
+    return result
+
+
+def scenario_storage_list_all(args) -> dict:
+    from storage_backend import encode_cursor
+    storage = open_storage(args)
+    rng = random.Random(2)
+    first = storage.list_all(limit=1000)
+    cursors = [None] + [encode_cursor(page) for page in first]
+    rss_before = rss_mb()
+    latencies, elapsed = timed_loop(
+        lambda after: storage.list_all(limit=100, after=after),
+        [(rng.choice(cursors),) for _ in range(args.operations)]
+    )
+    result = summarize(latencies, elapsed, rss_before)
+    storage.close()
+    return result
+
+
+async def _serve_pages(args, hot: bool) -> dict:
+    import httpx
+    import main
+    main.storage.backend.wait_ready()
+    slugs = load_slugs()
+    rng = random.Random(3)
+    pool = slugs[:50] if hot else slugs
+    sample = [rng.choice(pool) for _ in range(args.operations)]
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers={"accept-encoding": "br, gzip"}) as client:
+        for slug in pool[:50]:
+            await client.get(f"/p/{slug}")
+        rss_before = rss_mb()
+
+        async def get(slug):
+            response = await client.get(f"/p/{slug}")
+            assert response.status_code == 200, response.status_code
+
+        latencies, elapsed, _ = await timed_gather([get(slug) for slug in sample], args.concurrency)
+    stats = main.page_cache.stats()
+    result = summarize(latencies, elapsed, rss_before, cache_hits=stats["hits"], cache_misses=stats["misses"])
+    main.storage.close()
+    return result
+
+
+def scenario_serve_page_hot(args) -> dict:
+    return asyncio.run(_serve_pages(args, hot=True))
+
+
+def scenario_serve_page_uniform(args) -> dict:
+    return asyncio.run(_serve_pages(args, hot=False))
+
+
+async def _stream(args, path: str) -> dict:
+    import httpx
+    import main
+    transport = httpx.ASGITransport(app=main.app)
+    first_chunk = []
+    received = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        rss_before = rss_mb()
+
+        async def generate(i: int):
+            started = time.perf_counter()
+            size = 0
+            body = {"prompt": f"benchmark campaign {i}", "brand_name": f"Brand {i}", "use_cache": False}
+            async with client.stream("POST", path, json=body) as response:
+                assert response.status_code == 200, response.status_code
+                async for chunk in response.aiter_raw():
+                    if size == 0:
+                        first_chunk.append(time.perf_counter() - started)
+                    size += len(chunk)
+            received.append(size)
+
+        latencies, elapsed, _ = await timed_gather([generate(i) for i in range(args.operations)], args.concurrency)
+    return summarize(
+        latencies, elapsed, rss_before,
+        first_chunk_p50_ms=round(percentile(first_chunk, 0.5) * 1e3, 3),
+        first_chunk_p99_ms=round(percentile(first_chunk, 0.99) * 1e3, 3),
+        bytes_per_stream=int(sum(received) / len(received)),
+        concurrency=args.concurrency
+    )
+
+
+def scenario_stream_landing_page(args) -> dict:
+    return asyncio.run(_stream(args, "/generate-landing-page"))
+
+
+def scenario_stream_instagram_ad(args) -> dict:
+    return asyncio.run(_stream(args, "/generate-instagram-ad/binary"))
+
+
+# --- parent: corpus, fake provider, child processes, results ---
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_llm(args) -> tuple:
+    port = free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable, str(BENCH_DIR / "fake_llm.py"), "--port", str(port), "--tokens", str(args.tokens),
+            "--token-rate", str(args.token_rate), "--latency", str(args.latency), "--image-bytes", str(args.image_bytes)
+        ],
+        stdout=subprocess.PIPE, text=True
+    )
+    proc.stdout.readline()  # wait for "listening"
+    return proc, port
+
+
+def build_data_root(args) -> Path:
+    from corpus import fill_storage
+    from storage import LandingPageStorage
+    from storage_backend import create_backend
+
+    root = Path(tempfile.mkdtemp(prefix="rcg-suite-"))
+    data_dir = root / "data" / "landing-pages"
+    storage = LandingPageStorage(str(data_dir), backend=create_backend(str(data_dir), args.backend))
+    saved = fill_storage(storage, args.pages, seed=args.seed)
+    storage.close()
+    rng = random.Random(args.seed)
+    slugs = [slug for _, slug in saved]
+    rng.shuffle(slugs)
+    (root / "slugs.json").write_text(json.dumps(slugs))
+    return root
+
+
+def run_child(name: str, args, root: Path, port: int) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "STORAGE_BACKEND": args.backend,
+        "STORAGE_WARMUP": "blocking",
+        "SQLITE_PATH": str(root / "data" / "landing-pages.db"),
+        "GEMINI_API_KEY": "bench",
+        "OPENROUTER_KEY": "bench",
+        "OPENROUTER_BASE_URL": f"http://127.0.0.1:{port}/v1",
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{port}",
+        "SCHEDULER_OPENROUTER_RPM": "0",
+        "SCHEDULER_GEMINI_RPM": "0",
+        "SCHEDULER_OPENROUTER_CONCURRENCY": str(args.concurrency),
+        "SCHEDULER_GEMINI_CONCURRENCY": str(args.concurrency),
+        "UPSTREAM_PREWARM": "0",
+        "PAGE_CACHE_MAX_ENTRIES": "512",
+    })
+    command = [
+        sys.executable, __file__, "--child", name, "--backend", args.backend,
+        "--operations", str(operations_for(name, args)), "--concurrency", str(args.concurrency)
+    ]
+    out = subprocess.run(command, cwd=root, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"Scenario {name} failed:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def operations_for(name: str, args) -> int:
+    if name.startswith("stream_"):
+        return args.streams
+    return args.operations
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run_suite(args):
+    scenarios = args.scenarios or list(SCENARIOS)
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    print(f"Building a corpus of {args.pages} pages ({args.backend})...", flush=True)
+    root = build_data_root(args)
+    fake, port = start_fake_llm(args)
+    results = {}
+    try:
+        for name in scenarios:
+            print(f"  {name}: {SCENARIOS[name]}", flush=True)
+            # Writes go to a copy so the read scenarios always see the same corpus
+            scenario_root = root
+            if name == "storage_save":
+                scenario_root = Path(tempfile.mkdtemp(prefix="rcg-suite-save-")) / "root"
+                shutil.copytree(root, scenario_root)
+            results[name] = run_child(name, args, scenario_root, port)
+            if scenario_root is not root:
+                shutil.rmtree(scenario_root.parent, ignore_errors=True)
+    finally:
+        fake.terminate()
+        shutil.rmtree(root, ignore_errors=True)
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "params": {
+            key: getattr(args, key) for key in (
+                "pages", "backend", "operations", "streams", "concurrency", "tokens", "token_rate", "latency", "image_bytes", "seed"
+            )
+        },
+        "scenarios": results
+    }
+    print_table(results)
+    output = Path(args.output) if args.output else (
+        BENCH_DIR / "results" / f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{commit}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+
+def print_table(results: dict):
+    print(f"{'scenario':22} {'ops':>6} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'rss MB':>7} {'+MB':>6} {'peak MB':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:22} {r['operations']:6} {r['throughput_per_s']:10.1f} {r['p50_ms']:9.3f} {r['p99_ms']:9.3f} "
+            f"{r['rss_mb']:7.1f} {r['rss_growth_mb']:6.1f} {r['peak_rss_mb']:8.1f}"
+        )
+
+
+# Lower is better for latencies and memory; higher is better for throughput
+COMPARED = {
+    "throughput_per_s": +1, "p50_ms": -1, "p99_ms": -1, "first_chunk_p50_ms": -1, "first_chunk_p99_ms": -1,
+    "rss_growth_mb": -1, "peak_rss_mb": -1
+}
+GATED = ("throughput_per_s", "p50_ms", "p99_ms", "first_chunk_p50_ms")
+
+
+def compare(baseline_path: str, current_path: str, threshold: float) -> int:
+    baseline = json.loads(Path(baseline_path).read_text())
+    current = json.loads(Path(current_path).read_text())
+    if baseline["params"] != current["params"]:
+        print("Warning: the runs used different parameters; differences may not be regressions")
+    print(f"baseline {baseline['meta']['commit']} ({baseline['meta']['timestamp']}) -> "
+          f"current {current['meta']['commit']} ({current['meta']['timestamp']})")
+    print(f"{'scenario':22} {'metric':20} {'baseline':>11} {'current':>11} {'change':>8}")
+    regressions = []
+    for name, now in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        for metric, direction in COMPARED.items():
+            if metric not in now or metric not in before or not before[metric]:
+                continue
+            change = (now[metric] - before[metric]) / abs(before[metric]) * 100
+            worse = change * direction < 0
+            flag = ""
+            if worse and abs(change) > threshold and metric in GATED:
+                flag = "  REGRESSION"
+                regressions.append((name, metric, change))
+            print(f"{name:22} {metric:20} {before[metric]:11.3f} {now[metric]:11.3f} {change:+7.1f}%{flag}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {threshold:.0f}%")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", help=f"Subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--pages", type=int, default=5000, help="Corpus size")
+    parser.add_argument("--backend", choices=["file", "sqlite"], default=os.getenv("STORAGE_BACKEND", "file"))
+    parser.add_argument("--operations", type=int, default=2000, help="Operations per storage/serving scenario")
+    parser.add_argument("--streams", type=int, default=200, help="Generations per streaming scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--tokens", type=int, default=200, help="Chunks per fake text response")
+    parser.add_argument("--token-rate", type=float, default=500.0, help="Fake provider chunks per second")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake provider seconds to first chunk")
+    parser.add_argument("--image-bytes", type=int, default=512 * 1024, help="Fake provider image size")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Result file (default benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two result files")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent for --compare")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, str(BENCH_DIR))
+        result = globals()[f"scenario_{args.child}"](args)
+        print(json.dumps(result))
+    elif args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+    else:
+        run_suite(args)
+
+
+if __name__ == "__main__":
+    main()
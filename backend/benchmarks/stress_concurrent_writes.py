@@ -0,0 +1,217 @@
+"""
+Concurrency stress test for LandingPageStorage.
+
+Usage:
+    python benchmarks/stress_concurrent_writes.py [--backend file|sqlite] [--threads 16] [--ops 300]
+
+Worker threads mix saves, slug updates (including updates racing on a
+shared set of hot pages), deletes, reads by id and slug, and listings.
+Every page's HTML carries a unique marker, so a torn or clobbered file shows up as
+a corrupted read. After the run the storage is reopened from disk and
+checked for corrupted, lost or resurrected records, slug/manifest
+disagreement, leftover temp files and lost view counts. Exits non-zero if
+anything is wrong.
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from storage import LandingPageStorage  # noqa: E402
+from storage_backend import create_backend, encode_cursor  # noqa: E402
+
+FILLER = "<section><h2>Feature</h2><p>" + "Lorem ipsum dolor sit amet. " * 20 + "</p></section>"
+
+
+def page_html(marker: str) -> str:
+    return f"<html><body data-page=\"{marker}\">{FILLER * 10}</body></html>"
+
+
+class Counters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def add(self, name: str, amount: int = 1):
+        with self.lock:
+            self.values[name] = self.values.get(name, 0) + amount
+
+
+def open_storage(backend: str, base_dir: str) -> LandingPageStorage:
+    return LandingPageStorage(base_dir, backend=create_backend(base_dir, backend), view_flush_interval=0.05)
+
+
+def run(args) -> int:
+    base_dir = tempfile.mkdtemp(prefix="rcg-stress-")
+    storage = open_storage(args.backend, base_dir)
+    counters = Counters()
+
+    # Hot pages: every worker races slug updates on these
+    hot = {}
+    for i in range(args.hot_pages):
+        marker = f"hot-{i}"
+        hot[storage.save_landing_page(page_html(marker), {"name": "Hot"}, None, None, None)["id"]] = marker
+
+    published_lock = threading.Lock()
+    published = dict(hot)  # page id -> marker; never deleted, safe to read from any thread
+    expected_slugs = {}    # owned page id -> final slug
+    markers = dict(hot)    # every page id -> marker
+    views = {}             # page id -> successful get_by_slug calls
+    deleted = set()
+    state_lock = threading.Lock()
+
+    def check_read(page_id: str, marker: str):
+        page = storage.get_by_id(page_id)
+        if page is None:
+            counters.add("lost_reads")
+        elif f'data-page="{marker}"' not in (page.get("html_content") or ""):
+            counters.add("corrupted_reads")
+        else:
+            counters.add("reads")
+
+    def worker(n: int):
+        rng = random.Random(n)
+        owned = {}      # page id -> (marker, slug)
+        ephemeral = []  # owned pages that may be deleted; never published to readers
+        for op_index in range(args.ops):
+            roll = rng.random()
+            try:
+                if roll < 0.25 or not owned:
+                    marker = f"w{n}-{op_index}"
+                    result = storage.save_landing_page(page_html(marker), {"name": f"Brand {n}"}, None, None, None)
+                    owned[result["id"]] = (marker, result["slug"])
+                    if op_index % 4 == 0:
+                        ephemeral.append(result["id"])
+                    else:
+                        with published_lock:
+                            published[result["id"]] = marker
+                    with state_lock:
+                        markers[result["id"]] = marker
+                    counters.add("saves")
+                elif roll < 0.40:
+                    page_id = rng.choice(list(owned))
+                    new_slug = f"w{n}-{uuid.uuid4().hex[:10]}"
+                    if storage.update_slug(page_id, new_slug):
+                        owned[page_id] = (owned[page_id][0], new_slug)
+                        counters.add("slug_updates")
+                    else:
+                        counters.add("failed_slug_updates")
+                elif roll < 0.50:
+                    page_id = rng.choice(list(hot))
+                    storage.update_slug(page_id, f"hot-{uuid.uuid4().hex[:10]}")
+                    counters.add("hot_slug_updates")
+                elif roll < 0.55 and ephemeral:
+                    page_id = ephemeral.pop(rng.randrange(len(ephemeral)))
+                    if storage.delete(page_id):
+                        owned.pop(page_id)
+                        with state_lock:
+                            deleted.add(page_id)
+                        counters.add("deletes")
+                elif roll < 0.85:
+                    with published_lock:
+                        page_id, marker = rng.choice(list(published.items()))
+                    check_read(page_id, marker)
+                elif roll < 0.95:
+                    _, slug = rng.choice(list(owned.values()))
+                    page = storage.get_by_slug(slug)
+                    if page is not None:
+                        with state_lock:
+                            views[page["id"]] = views.get(page["id"], 0) + 1
+                        counters.add("views")
+                    else:
+                        counters.add("lost_reads")
+                else:
+                    storage.list_all(limit=50)
+                    counters.add("listings")
+            except Exception as e:
+                print(f"worker {n}: {type(e).__name__}: {e}")
+                counters.add("errors")
+        with state_lock:
+            for page_id, (_, slug) in owned.items():
+                expected_slugs[page_id] = slug
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    storage.close()
+
+    # Reopen from disk and verify the persisted state
+    storage = open_storage(args.backend, base_dir)
+    problems = Counters()
+    live = {**{page_id: None for page_id in hot}, **expected_slugs}
+    for page_id, slug in live.items():
+        page = storage.get_by_id(page_id)
+        marker = markers[page_id]
+        if page is None:
+            problems.add("lost_records")
+            continue
+        if f'data-page="{marker}"' not in (page.get("html_content") or ""):
+            problems.add("corrupted_records")
+        if slug is not None and page["slug"] != slug:
+            problems.add("wrong_slug")
+        if storage.resolve_slug(page["slug"]) != page_id:
+            problems.add("slug_index_mismatch")
+        if page.get("views_count", 0) != views.get(page_id, 0):
+            problems.add("lost_views", abs(views.get(page_id, 0) - page.get("views_count", 0)))
+    for page_id in deleted:
+        if storage.backend.read(page_id) is not None:
+            problems.add("resurrected_records")
+
+    listed, cursor = set(), None
+    while True:
+        batch = storage.list_all(limit=200, after=cursor)
+        listed.update(page["id"] for page in batch)
+        if len(batch) < 200:
+            break
+        cursor = encode_cursor(batch[-1])
+    if listed != set(live):
+        problems.add("listing_mismatch", len(listed ^ set(live)))
+
+    if args.backend == "file":
+        for path in Path(base_dir).glob("*.json"):
+            try:
+                json.loads(path.read_text(encoding="utf-8"))
+            except ValueError:
+                problems.add("corrupted_files")
+        problems.add("leftover_temp_files", len(list(Path(base_dir).glob(".*.tmp"))))
+    storage.close()
+
+    ops = sum(v for k, v in counters.values.items() if k not in ("errors",))
+    print(f"backend={args.backend} threads={args.threads} ops={ops} elapsed={elapsed:.2f}s ({ops / elapsed:,.0f} ops/s)")
+    for name, value in sorted(counters.values.items()):
+        print(f"  {name:24} {value}")
+    print(f"  {'live pages':24} {len(live)}")
+    checks = [
+        "lost_reads", "corrupted_reads", "errors", "lost_records", "corrupted_records",
+        "resurrected_records", "wrong_slug", "slug_index_mismatch", "listing_mismatch",
+        "lost_views", "corrupted_files", "leftover_temp_files"
+    ]
+    failures = {name: counters.values.get(name, 0) + problems.values.get(name, 0) for name in checks}
+    print("checks:")
+    for name in checks:
+        print(f"  {name:24} {failures[name]}")
+    return 1 if any(failures.values()) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["file", "sqlite"], default="file")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=300, help="operations per thread")
+    parser.add_argument("--hot-pages", type=int, default=4)
+    sys.exit(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
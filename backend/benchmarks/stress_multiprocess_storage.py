@@ -0,0 +1,263 @@
+"""
+Multi-process stress test for LandingPageStorage on shared storage.
+
+Usage:
+    python benchmarks/stress_multiprocess_storage.py [--backend file|sqlite] [--workers 4] [--pages 200]
+
+Starts several worker processes on one data directory, as uvicorn workers
+or replicas on shared storage would run, and checks that:
+  - slug claims are atomic across processes: every worker inserts a page
+    under each of the same contested slugs, and exactly one insert per slug
+    may succeed (the same for slug changes onto contested slugs)
+  - pages saved by one worker resolve by slug and id in every other worker
+  - slug changes and deletes made by one worker reach the other workers'
+    change listeners (cache invalidation) and their slug lookups
+  - view counts recorded in every worker add up, with none lost
+  - A/B exposures and conversions recorded in every worker show up in
+    every worker's stats, and all of them survive a restart
+The file backend compacts its manifest every `--compact-every` journal
+entries, so workers also have to follow each other across compactions.
+After the run the storage is reopened and checked for duplicate slugs and
+lost pages. Exits non-zero if anything is wrong.
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+AB_PAGE = "ab-page"
+
+
+def open_storage(backend: str, base_dir: str, compact_every: int):
+    from page_manifest import PageManifest
+    from storage import LandingPageStorage
+    from storage_backend import create_backend
+
+    PageManifest.MIN_COMPACT_ENTRIES = compact_every
+    storage = LandingPageStorage(
+        base_dir, backend=create_backend(base_dir, backend), view_flush_interval=0.05, sync_interval=0.05
+    )
+    storage.backend.wait_ready()
+    return storage
+
+
+def open_ab_events(base_dir: str):
+    from ab_testing import ABEventLog
+
+    return ABEventLog(str(Path(base_dir, "ab-events")), flush_interval=0.05, flush_threshold=100)
+
+
+def ab_totals(ab_events) -> Counter:
+    totals = Counter()
+    for variant in ab_events.stats(AB_PAGE)["variants"].values():
+        totals["exposures"] += variant["exposures"]
+        totals["conversions"] += variant["conversions"]
+    return totals
+
+
+def worker(n: int, args, base_dir: str, shared: dict, barrier, results):
+    from ab_testing import CONVERSION, EXPOSURE
+
+    storage = open_storage(args.backend, base_dir, args.compact_every)
+    ab_events = open_ab_events(base_dir)
+    ab_events.start()
+    changed = set()
+    changed_lock = threading.Lock()
+
+    def on_change(page_id: str):
+        with changed_lock:
+            changed.add(page_id)
+
+    storage.add_change_listener(on_change)
+    out = Counter()
+    html = f"<html><body>worker {n}</body></html>"
+
+    # Contested slugs: every worker inserts under the same slugs at the same time
+    barrier.wait()
+    claimed = []
+    for k in range(args.contested):
+        record = storage._new_record(html, {"name": f"Worker {n}"})
+        record["slug"] = f"contested-{k}"
+        if storage.backend.insert(record):
+            claimed.append(k)
+    out["claimed"] = len(claimed)
+
+    # Slug changes racing onto the same new slugs
+    moved = []
+    for k in range(args.contested):
+        page = storage.save_landing_page(html, {"name": f"Worker {n}"})
+        if storage.update_slug(page["id"], f"moved-{k}"):
+            moved.append(k)
+
+    # Own pages, published to the other workers through a file
+    own = {}
+    for i in range(args.pages):
+        page = storage.save_landing_page(f"<html><body>w{n}-{i}</body></html>", {"name": f"Worker {n}"})
+        own[page["id"]] = page["slug"]
+    Path(base_dir, f"worker-{n}.json").write_text(json.dumps(own))
+
+    # Views on the shared pages
+    for i in range(args.views):
+        slug = shared["hot"][i % len(shared["hot"])]
+        if storage.get_by_slug(slug) is not None:
+            out["views"] += 1
+        else:
+            out["lost_hot_reads"] += 1
+
+    # A/B events on one shared page, flushed concurrently by every worker
+    for i in range(args.ab_events):
+        variant = "ab"[i % 2]
+        ab_events.record(AB_PAGE, variant, EXPOSURE, f"w{n}-{i}")
+        if i % 5 == 0:
+            ab_events.record(AB_PAGE, variant, CONVERSION, f"w{n}-{i}")
+
+    barrier.wait()
+    # Every other worker's pages resolve here
+    for other in range(args.workers):
+        if other == n:
+            continue
+        pages = json.loads(Path(base_dir, f"worker-{other}.json").read_text())
+        for page_id, slug in pages.items():
+            page = storage.get_by_slug(slug)
+            if page is None or page["id"] != page_id:
+                out["lost_remote_reads"] += 1
+            else:
+                out["remote_reads"] += 1
+        listed = {page["id"] for page in storage.list_all(limit=100000)}
+        out["unlisted_remote_pages"] += len(set(pages) - listed)
+
+    # Worker 0 renames and deletes the watched pages; the others must notice
+    barrier.wait()
+    watched = shared["watched"]
+    if n == 0:
+        for i, (page_id, _) in enumerate(watched[:len(watched) // 2]):
+            storage.update_slug(page_id, f"renamed-{i}")
+        for page_id, _ in watched[len(watched) // 2:]:
+            storage.delete(page_id)
+    barrier.wait()
+    if n != 0:
+        deadline = time.monotonic() + 5
+        expected = {page_id for page_id, _ in watched}
+        while time.monotonic() < deadline:
+            with changed_lock:
+                if expected <= changed:
+                    break
+            time.sleep(0.05)
+        with changed_lock:
+            out["missed_invalidations"] = len(expected - changed)
+        for i, (page_id, old_slug) in enumerate(watched):
+            if storage.get_by_slug(old_slug) is not None:
+                out["stale_slugs"] += 1
+            if i < len(watched) // 2 and storage.resolve_slug(f"renamed-{i}") != page_id:
+                out["stale_slugs"] += 1
+
+    # Every worker's A/B stats include the other workers' flushed events
+    expected = expected_ab_totals(args)
+    deadline = time.monotonic() + 5
+    while ab_totals(ab_events) != expected and time.monotonic() < deadline:
+        time.sleep(0.05)
+    out["stale_ab_stats"] = sum((expected - ab_totals(ab_events)).values())
+
+    ab_events.close()
+    storage.close()
+    results.put({"worker": n, "counters": dict(out), "claimed": claimed, "moved": moved, "own": len(own)})
+
+
+def expected_ab_totals(args) -> Counter:
+    return Counter(
+        exposures=args.workers * args.ab_events,
+        conversions=args.workers * len(range(0, args.ab_events, 5))
+    )
+
+
+def run(args) -> int:
+    base_dir = tempfile.mkdtemp(prefix="rcg-multiprocess-")
+    storage = open_storage(args.backend, base_dir, args.compact_every)
+    hot = [storage.save_landing_page("<html><body>hot</body></html>", {"name": "Hot"})["slug"] for _ in range(4)]
+    watched = []
+    for _ in range(args.watched):
+        page = storage.save_landing_page("<html><body>watched</body></html>", {"name": "Watched"})
+        watched.append((page["id"], page["slug"]))
+    storage.close()
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(args.workers)
+    results = context.Queue()
+    shared = {"hot": hot, "watched": watched}
+    started = time.perf_counter()
+    processes = [
+        context.Process(target=worker, args=(n, args, base_dir, shared, barrier, results))
+        for n in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get(timeout=600) for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    totals = Counter()
+    claims, moves = Counter(), Counter()
+    for report in reports:
+        totals.update(report["counters"])
+        claims.update(report["claimed"])
+        moves.update(report["moved"])
+    problems = Counter()
+    problems["double_claims"] = sum(count - 1 for count in claims.values() if count > 1)
+    problems["unclaimed_slugs"] = args.contested - len(claims)
+    problems["double_moves"] = sum(count - 1 for count in moves.values() if count > 1)
+    problems["crashed_workers"] = sum(1 for process in processes if process.exitcode != 0)
+
+    # Reopen and verify the persisted state
+    storage = open_storage(args.backend, base_dir, args.compact_every)
+    pages = storage.list_all(limit=1000000)
+    slugs = Counter(page["slug"] for page in pages)
+    problems["duplicate_slugs"] = sum(count - 1 for count in slugs.values() if count > 1)
+    # Hot and surviving watched pages, each worker's moved and own pages, one page per contested slug
+    expected_pages = len(hot) + args.watched // 2 + args.workers * (args.contested + args.pages) + len(claims)
+    problems["page_count_mismatch"] = abs(len(pages) - expected_pages)
+    hot_views = sum(storage.get_by_id(storage.backend.resolve_slug(slug), include_html=False)["views_count"] for slug in hot)
+    problems["lost_views"] = abs(hot_views - totals["views"])
+    storage.close()
+    ab_events = open_ab_events(base_dir)
+    problems["lost_ab_events"] = sum((expected_ab_totals(args) - ab_totals(ab_events)).values())
+    problems["extra_ab_events"] = sum((ab_totals(ab_events) - expected_ab_totals(args)).values())
+
+    print(f"backend={args.backend} workers={args.workers} elapsed={elapsed:.2f}s pages={len(pages)}")
+    for name in ("views", "remote_reads"):
+        print(f"  {name:24} {totals[name]}")
+    checks = [
+        "double_claims", "unclaimed_slugs", "double_moves", "lost_hot_reads", "lost_remote_reads",
+        "unlisted_remote_pages", "missed_invalidations", "stale_slugs", "lost_views", "duplicate_slugs",
+        "page_count_mismatch", "stale_ab_stats", "lost_ab_events", "extra_ab_events", "crashed_workers"
+    ]
+    failures = {name: totals.get(name, 0) + problems.get(name, 0) for name in checks}
+    print("checks:")
+    for name in checks:
+        print(f"  {name:24} {failures[name]}")
+    return 1 if any(failures.values()) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["file", "sqlite"], default="file")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=200, help="pages saved per worker")
+    parser.add_argument("--contested", type=int, default=50, help="slugs every worker races to claim")
+    parser.add_argument("--views", type=int, default=500, help="hot page views per worker")
+    parser.add_argument("--watched", type=int, default=10, help="pages renamed or deleted by worker 0")
+    parser.add_argument("--ab-events", type=int, default=2000, help="A/B exposures per worker (every fifth converts)")
+    parser.add_argument("--compact-every", type=int, default=64, help="manifest journal entries between compactions")
+    sys.exit(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
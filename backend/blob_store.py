@@ -0,0 +1,92 @@
+"""
+Content-addressed blob store.
+Blobs are written once under <root>/<first two hex digits>/<sha256>.<ext>;
+identical content is stored a single time and never rewritten, so served
+blobs can be cached forever.
+"""
+import hashlib
+import os
+import re
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from atomic_io import atomic_write_bytes
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+EXT_RE = re.compile(r"^[a-z0-9]{1,8}$")
+
+
+class BlobStore:
+    """Write-once blob storage addressed by SHA-256"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, digest: str, ext: str = "bin") -> Optional[Path]:
+        """Filesystem path of a blob, or None if the address is malformed"""
+        if not DIGEST_RE.match(digest) or not EXT_RE.match(ext):
+            return None
+        return self.root / digest[:2] / f"{digest}.{ext}"
+
+    def put(self, data: bytes, ext: str = "bin", digest: Optional[str] = None) -> str:
+        """Store bytes (no-op if already present) and return their digest.
+        `digest` overrides the address, e.g. the hash of the uncompressed content."""
+        digest = digest or hashlib.sha256(data).hexdigest()
+        path = self.path(digest, ext)
+        if path is None:
+            raise ValueError(f"Invalid blob address: {digest}.{ext}")
+        if self.touch(digest, ext):
+            return digest
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(path, data)
+        return digest
+
+    def get(self, digest: str, ext: str = "bin") -> Optional[bytes]:
+        path = self.path(digest, ext)
+        if path is None or not path.exists():
+            return None
+        return path.read_bytes()
+
+    def exists(self, digest: str, ext: str = "bin") -> bool:
+        path = self.path(digest, ext)
+        return path is not None and path.exists()
+
+    def touch(self, digest: str, ext: str = "bin") -> bool:
+        """Mark a blob as recently used so a concurrent sweep keeps it. Returns False if missing."""
+        path = self.path(digest, ext)
+        if path is None:
+            return False
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def delete(self, digest: str, ext: str = "bin") -> bool:
+        path = self.path(digest, ext)
+        if path is None or not path.exists():
+            return False
+        path.unlink(missing_ok=True)
+        return True
+
+    def iter_blobs(self) -> Iterator[Tuple[str, str, float]]:
+        """Yield (digest, ext, mtime) for every stored blob"""
+        for path in self.root.glob("*/*.*"):
+            digest, _, ext = path.name.partition(".")
+            if DIGEST_RE.match(digest) and EXT_RE.match(ext):
+                try:
+                    yield digest, ext, path.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+
+    def sweep(self, keep: set, grace_seconds: float = 3600.0) -> int:
+        """Delete blobs whose (digest, ext) is not in `keep` and that are older than the grace period.
+        Returns the number deleted."""
+        cutoff = time.time() - grace_seconds
+        deleted = 0
+        for digest, ext, mtime in list(self.iter_blobs()):
+            if (digest, ext) not in keep and mtime < cutoff and self.delete(digest, ext):
+                deleted += 1
+        return deleted
@@ -0,0 +1,108 @@
+"""
+Campaign orchestrator: runs every asset generator for one request
+concurrently and multiplexes their output into a single event stream.
+
+Every event is tagged with the asset it belongs to, e.g.
+    {"asset": "landing_page", "html": "..."}
+    {"asset": "copy_variants", "copy": "..."}
+    {"asset": "instagram_ad", "status": "done"}
+and the stream ends with {"status": "complete", "assets": {...}, "elapsed": ...}.
+Total wall time is that of the slowest asset, not the sum. The same
+multiplexing serves A/B variant streams with `tag="variant"`.
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+# Statuses that end an asset; anything else (e.g. "queued") is progress
+FINAL_STATUSES = {"done", "error", "timeout"}
+
+DEFAULT_TIMEOUTS = {
+    "landing_page": 180.0,
+    "instagram_ad": 120.0,
+    "copy_variants": 60.0,
+    "ab_variant": 180.0,
+}
+
+
+class CampaignAsset:
+    """One asset generator in a campaign.
+
+    `factory` returns an async iterator of chunk dicts (streaming assets) or
+    an awaitable whose result is sent as {result_key: result} (one-shot
+    assets). `then` receives the concatenated `html` chunks of a finished
+    streaming asset and may return a follow-up asset to chain.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        timeout: float,
+        streaming: bool = True,
+        result_key: str = "result",
+        then: Optional[Callable[[str], Optional["CampaignAsset"]]] = None
+    ):
+        self.name = name
+        self.factory = factory
+        self.timeout = timeout
+        self.streaming = streaming
+        self.result_key = result_key
+        self.then = then
+
+
+async def _run_asset(asset: CampaignAsset, queue: asyncio.Queue, spawn: Callable[[CampaignAsset], None], tag: str):
+    """Generate one asset, pushing tagged events onto the shared queue"""
+    html_parts: List[str] = []
+    try:
+        async with asyncio.timeout(asset.timeout):
+            if asset.streaming:
+                async for chunk in asset.factory():
+                    if asset.then is not None and "html" in chunk:
+                        html_parts.append(chunk["html"])
+                    await queue.put({tag: asset.name, **chunk})
+            else:
+                result = await asset.factory()
+                await queue.put({tag: asset.name, asset.result_key: result})
+    except TimeoutError:
+        await queue.put({tag: asset.name, "status": "timeout", "error": f"Timed out after {asset.timeout:g}s"})
+        return
+    except Exception as e:
+        await queue.put({tag: asset.name, "status": "error", "error": str(e)})
+        return
+
+    # Spawn the chained asset before reporting "done" so the stream never looks finished in between
+    if asset.then is not None:
+        follow_up = asset.then("".join(html_parts))
+        if follow_up is not None:
+            spawn(follow_up)
+    await queue.put({tag: asset.name, "status": "done"})
+
+
+async def stream_campaign(assets: List[CampaignAsset], tag: str = "asset") -> AsyncIterator[Dict]:
+    """Run assets concurrently and yield their events, tagged {tag: name}, as they arrive"""
+    queue: asyncio.Queue = asyncio.Queue()
+    tasks: List[asyncio.Task] = []
+    statuses: Dict[str, str] = {}
+    started = time.perf_counter()
+
+    def spawn(asset: CampaignAsset):
+        statuses[asset.name] = "running"
+        tasks.append(asyncio.create_task(_run_asset(asset, queue, spawn, tag)))
+
+    for asset in assets:
+        spawn(asset)
+
+    try:
+        while any(status == "running" for status in statuses.values()):
+            event = await queue.get()
+            if event.get("status") in FINAL_STATUSES:
+                statuses[event[tag]] = event["status"]
+            yield event
+    finally:
+        # Client went away or the stream finished: stop anything still running
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    yield {"status": "complete", f"{tag}s": statuses, "elapsed": round(time.perf_counter() - started, 3)}
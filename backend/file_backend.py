@@ -0,0 +1,206 @@
+"""
+File storage backend: one JSON file per landing page in data/landing-pages/,
+with a persistent metadata manifest for slug resolution and listing.
+Page files are replaced atomically (temp file + fsync + rename) under
+striped per-page locks, so readers never see a partial file and writes
+to different pages never wait on each other.
+
+With background warmup the manifest is loaded (or rebuilt by scanning the
+page files) on a separate thread, so the backend is usable immediately and
+a request only waits until its own slug is indexed.
+
+Several processes can share the directory; the manifest coordinates them
+(see page_manifest.py). Page files are written before their manifest entry,
+and the manifest's slug and view count win over the file's.
+"""
+import json
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from atomic_io import atomic_write_json, fsync_dir
+from page_manifest import PageManifest
+from storage_backend import StorageBackend, has_ab_variant, page_meta
+
+
+class FileBackend(StorageBackend):
+    """One JSON file per page"""
+
+    name = "file"
+
+    # Number of lock stripes; pages hash onto one of them
+    LOCK_STRIPES = 64
+
+    def __init__(self, base_dir: str = "data/landing-pages", background_warmup: bool = False):
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self._page_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+        # Compact metadata manifest; page files are only opened when HTML is needed
+        self._manifest = PageManifest(self.base_dir / ".index")
+        if background_warmup:
+            threading.Thread(target=self._warm_up, name="manifest-warmup", daemon=True).start()
+        else:
+            self._warm_up()
+
+    def _warm_up(self):
+        try:
+            if not self._manifest.load():
+                # Workers starting together: the first one rebuilds, the others load its snapshot
+                with self._manifest.exclusive():
+                    if not self._manifest.load():
+                        self.rebuild_index()
+        except Exception as e:
+            print(f"Error loading page manifest: {e}")
+        finally:
+            self._manifest.mark_loaded()
+
+    @property
+    def ready(self) -> bool:
+        return self._manifest.loaded
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._manifest.wait_loaded(timeout)
+
+    def rebuild_index(self):
+        """Rebuild the manifest by scanning every stored page"""
+        self._manifest.rebuild(
+            page_meta(data) for data in self._iter_files()
+            if data.get('slug') and data.get('id')
+        )
+
+    def _path(self, page_id: str) -> Path:
+        return self.base_dir / f"{page_id}.json"
+
+    def _page_lock(self, page_id: str) -> threading.Lock:
+        return self._page_locks[zlib.crc32(page_id.encode('utf-8')) % self.LOCK_STRIPES]
+
+    def _write(self, record: Dict, sync_dir: bool = True):
+        atomic_write_json(self._path(record["id"]), record, indent=2, sync_dir=sync_dir)
+
+    def _read_file(self, page_id: str) -> Optional[Dict]:
+        file_path = self._path(page_id)
+        if file_path.exists():
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error reading {file_path}: {e}")
+        return None
+
+    def read(self, page_id: str) -> Optional[Dict]:
+        meta = self._manifest.get(page_id)
+        if meta is None:
+            return None
+        data = self._read_file(page_id)
+        if data:
+            # View counts live in the manifest; the page file is not rewritten per flush.
+            # Its slug wins too: concurrent slug changes from two processes may rewrite the file out of order.
+            data['views_count'] = meta.get('views_count', 0)
+            data['slug'] = meta['slug']
+        return data
+
+    def insert(self, record: Dict) -> bool:
+        if record["slug"] in self._manifest:
+            return False
+        with self._page_lock(record["id"]):
+            # Write the page before publishing it in the manifest
+            self._write(record)
+            if not self._manifest.insert(page_meta(record)):
+                self._path(record["id"]).unlink(missing_ok=True)
+                return False
+        return True
+
+    def insert_many(self, records: List[Dict]) -> List[bool]:
+        # One directory fsync and one manifest journal append for the whole batch
+        results = [False] * len(records)
+        candidates = [i for i, record in enumerate(records) if record["slug"] not in self._manifest]
+        for i in candidates:
+            with self._page_lock(records[i]["id"]):
+                self._write(records[i], sync_dir=False)
+        fsync_dir(self.base_dir)
+        inserted = self._manifest.insert_many([page_meta(records[i]) for i in candidates])
+        for i, ok in zip(candidates, inserted):
+            results[i] = ok
+            if not ok:
+                self._path(records[i]["id"]).unlink(missing_ok=True)
+        return results
+
+    def update(self, record: Dict) -> bool:
+        with self._page_lock(record["id"]):
+            meta = self._manifest.get(record["id"])
+            if meta is None:
+                return False
+            # Keep the manifest's slug; change_slug holds the same page lock
+            record = dict(record, slug=meta["slug"])
+            self._write(record)
+            return self._manifest.update(record["id"], has_ab_variant=has_ab_variant(record))
+
+    def delete(self, page_id: str) -> bool:
+        with self._page_lock(page_id):
+            if self._manifest.remove(page_id) is None:
+                return False
+            try:
+                self._path(page_id).unlink(missing_ok=True)
+            except Exception as e:
+                print(f"Error deleting {self._path(page_id)}: {e}")
+        return True
+
+    def refresh(self) -> List[str]:
+        return self._manifest.refresh()
+
+    def resolve_slug(self, slug: str) -> Optional[str]:
+        return self._manifest.resolve(slug)
+
+    def slug_exists(self, slug: str) -> bool:
+        return slug in self._manifest
+
+    def change_slug(self, page_id: str, new_slug: str, updated_at: str) -> bool:
+        # Hold the page lock across manifest + file so concurrent updates apply in one order
+        with self._page_lock(page_id):
+            meta = self._manifest.get(page_id)
+            if meta is None:
+                return False
+            old_slug = meta['slug']
+            if new_slug == old_slug:
+                return True
+
+            # Claim the new slug first; this also releases the old one
+            if not self._manifest.change_slug(page_id, new_slug):
+                return False
+
+            data = self._read_file(page_id)
+            try:
+                if data is None:
+                    raise ValueError("page file missing or unreadable")
+                data['slug'] = new_slug
+                data['updated_at'] = updated_at
+                self._write(data)
+                return True
+            except Exception as e:
+                print(f"Error updating {self._path(page_id)}: {e}")
+                # Roll the manifest back to the old slug
+                self._manifest.change_slug(page_id, old_slug)
+                return False
+
+    def add_views(self, counts: Dict[str, int]):
+        self._manifest.add_views(counts)
+
+    def list_meta(self, limit: int = 100, after: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        return self._manifest.page(limit, after)
+
+    def _iter_files(self) -> Iterator[Dict]:
+        for file_path in self.base_dir.glob("*.json"):
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    yield json.load(f)
+            except Exception as e:
+                print(f"Error reading {file_path}: {e}")
+
+    def iter_records(self) -> Iterator[Dict]:
+        for data in self._iter_files():
+            meta = self._manifest.get(data.get('id'))
+            if meta:
+                data['views_count'] = meta.get('views_count', 0)
+            yield data
@@ -0,0 +1,38 @@
+"""
+Length-prefixed binary framing for streaming assets with metadata.
+
+Each frame is:
+    4-byte big-endian header length | UTF-8 JSON header | 4-byte big-endian payload length | payload
+
+Images travel as raw bytes in the payload instead of base64 inside JSON,
+so nothing is re-encoded on the server or decoded in the browser.
+"""
+import json
+import struct
+from typing import Dict, Iterator, Tuple
+
+MEDIA_TYPE = "application/x-rcg-frames"
+
+_LENGTH = struct.Struct(">I")
+
+
+def encode_frame(header: Dict, payload: bytes = b"") -> bytes:
+    """Encode one frame"""
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return b"".join((_LENGTH.pack(len(header_bytes)), header_bytes, _LENGTH.pack(len(payload)), payload))
+
+
+def decode_frames(data: bytes) -> Iterator[Tuple[Dict, bytes]]:
+    """Decode a complete buffer of frames (used by clients and benchmarks)"""
+    view = memoryview(data)
+    offset = 0
+    while offset < len(view):
+        (header_len,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        header = json.loads(bytes(view[offset:offset + header_len]))
+        offset += header_len
+        (payload_len,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        payload = bytes(view[offset:offset + payload_len])
+        offset += payload_len
+        yield header, payload
@@ -0,0 +1,210 @@
+"""
+Content-addressed cache and request coalescing for generation endpoints.
+
+Identical requests (same endpoint, model, normalized prompt and brand)
+within the TTL are answered from the cache. Identical requests that
+arrive while a generation is still running join it (single-flight): one
+upstream stream is consumed and its chunks are fanned out to every
+subscriber, including ones that join midway (they replay from the start).
+"""
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt"""
+    return re.sub(r"\s+", " ", prompt).strip().casefold()
+
+
+def _size_of(value: Any) -> int:
+    """Approximate payload size of a chunk or result, in characters/bytes"""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_size_of(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_size_of(v) for v in value)
+    return 16
+
+
+class _Flight:
+    """One in-flight upstream generation shared by identical requests"""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+
+    async def follow(self) -> AsyncIterator[Any]:
+        """Replay chunks produced so far, then follow the stream to its end"""
+        index = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: len(self.chunks) > index or self.done)
+                pending = self.chunks[index:]
+                done, error = self.done, self.error
+            for chunk in pending:
+                yield chunk
+            index += len(pending)
+            if done and index >= len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class GenerationCache:
+    """TTL + LRU cache of generation results with single-flight coalescing"""
+
+    def __init__(
+        self,
+        ttl: float = 600.0,
+        max_entries: int = 256,
+        max_bytes: int = 64 * 1024 * 1024,
+        transient: Callable[[Any], bool] = lambda chunk: False
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Chunks for which this is true (e.g. queue progress) reach live subscribers but are not cached
+        self.transient = transient
+
+        # key -> (expires_at, size, value); value is a chunk list for streams
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._flights: Dict[str, _Flight] = {}
+        self._calls: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def key(endpoint: str, model: str, prompt: str, brand_name: str) -> str:
+        """Content address of a generation request"""
+        raw = "\x1f".join([endpoint, model, normalize_prompt(prompt), brand_name.strip()])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self._bytes -= size
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key: str, value: Any, size: int):
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def has(self, key: str) -> bool:
+        """True if a request for `key` would be served without a new upstream call"""
+        if key in self._flights or key in self._calls:
+            return True
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def stream(self, key: str, factory: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Serve a streaming generation from cache, an in-flight twin, or a new upstream stream"""
+        cached = self._lookup(key)
+        if cached is not None:
+            self.hits += 1
+            return self._replay(cached)
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            flight = _Flight()
+            self._flights[key] = flight
+            # The upstream stream runs as its own task so one subscriber
+            # disconnecting does not cancel it for the others
+            asyncio.get_running_loop().create_task(self._drive(key, flight, factory))
+        return flight.follow()
+
+    @staticmethod
+    async def _replay(chunks: List[Any]) -> AsyncIterator[Any]:
+        for chunk in chunks:
+            yield chunk
+
+    async def _drive(self, key: str, flight: _Flight, factory: Callable[[], AsyncIterator[Any]]):
+        completed = False
+        try:
+            async for chunk in factory():
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+            completed = True
+        except Exception as e:
+            flight.error = e
+        finally:
+            self._flights.pop(key, None)
+            if completed:
+                chunks = [chunk for chunk in flight.chunks if not self.transient(chunk)]
+                self._store(key, chunks, sum(map(_size_of, chunks)))
+            elif flight.error is None:
+                flight.error = RuntimeError("Generation was cancelled")
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    async def call(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Serve a one-shot generation from cache, an in-flight twin, or a new upstream call"""
+        cached = self._lookup(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # Run upstream as its own task so a cancelled caller does not cancel it for the others
+            task = asyncio.get_running_loop().create_task(self._run_call(key, factory))
+            self._calls[key] = task
+        return await asyncio.shield(task)
+
+    async def _run_call(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            result = await factory()
+            self._store(key, result, _size_of(result))
+            return result
+        finally:
+            self._calls.pop(key, None)
+
+    def stats(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "in_flight": len(self._flights) + len(self._calls),
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl
+        }
@@ -0,0 +1,104 @@
+"""
+Compressed, content-addressed storage for landing page HTML.
+Each HTML body is compressed (zstd if the `zstandard` package is installed,
+gzip otherwise) and stored once in a BlobStore under the SHA-256 of the
+uncompressed HTML, so identical bodies across pages and regenerations
+share one blob. Page records hold only references of the form
+"<codec>:<sha256>" and bodies are decompressed when they are read.
+"""
+import gzip
+import hashlib
+from typing import Dict, Optional, Tuple
+
+from blob_store import BlobStore
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+GZIP_LEVEL = 9
+ZSTD_LEVEL = 10
+
+# Record fields stored as blobs
+HTML_FIELDS = ("html_content", "ab_variant_html")
+
+
+class HTMLBlobStore:
+    """Compress, deduplicate and resolve HTML bodies by content hash"""
+
+    def __init__(self, root: str, codec: Optional[str] = None):
+        self.blobs = BlobStore(root)
+        self.codec = codec or ("zst" if zstandard else "gz")
+        if self.codec == "zst" and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        if self.codec not in ("zst", "gz"):
+            raise ValueError(f"Unknown HTML codec: {self.codec}")
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zst":
+            return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+    @staticmethod
+    def _decompress(codec: str, data: bytes) -> bytes:
+        if codec == "zst":
+            if zstandard is None:
+                raise ValueError("zstd blob found but the zstandard package is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    @staticmethod
+    def parse_ref(ref: str) -> Optional[Tuple[str, str]]:
+        """Split a "<codec>:<sha256>" reference into (digest, codec)"""
+        codec, _, digest = ref.partition(":")
+        return (digest, codec) if digest else None
+
+    def put(self, html: str) -> str:
+        """Store an HTML body (deduplicated) and return its reference"""
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        for codec in ("zst", "gz"):
+            # Reuse an existing blob of the same content whatever codec wrote it
+            if self.blobs.touch(digest, codec):
+                return f"{codec}:{digest}"
+        self.blobs.put(self._compress(data), self.codec, digest=digest)
+        return f"{self.codec}:{digest}"
+
+    def get(self, ref: str) -> Optional[str]:
+        """Resolve a reference to its HTML, or None if the blob is missing or unreadable"""
+        parsed = self.parse_ref(ref)
+        if parsed is None:
+            return None
+        digest, codec = parsed
+        data = self.blobs.get(digest, codec)
+        if data is None:
+            print(f"Error reading HTML blob {ref}: not found")
+            return None
+        try:
+            return self._decompress(codec, data).decode("utf-8")
+        except Exception as e:
+            print(f"Error reading HTML blob {ref}: {e}")
+            return None
+
+    def externalize(self, record: Dict) -> Dict:
+        """Move a record's HTML fields into blobs, leaving references under record["blobs"]"""
+        refs = dict(record.get("blobs") or {})
+        for field in HTML_FIELDS:
+            if record.get(field):
+                refs[field] = self.put(record[field])
+                record[field] = None
+        if refs:
+            record["blobs"] = refs
+        return record
+
+    def load(self, record: Dict) -> Dict:
+        """Fill a record's HTML fields from its blob references (inline legacy records pass through)"""
+        for field, ref in (record.pop("blobs", None) or {}).items():
+            record[field] = self.get(ref)
+        return record
+
+    def sweep(self, referenced: set, grace_seconds: float = 3600.0) -> int:
+        """Delete blobs not in the referenced set of refs. Returns the number deleted."""
+        keep = {parsed for parsed in map(self.parse_ref, referenced) if parsed}
+        return self.blobs.sweep(keep, grace_seconds)
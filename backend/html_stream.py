@@ -0,0 +1,218 @@
+"""
+Incremental post-processing of streamed landing page HTML.
+
+Model deltas arrive in arbitrary pieces: a markdown fence ("```html") may
+open the answer, a closing fence and some commentary may follow the
+document, and a delta can end in the middle of a tag. HTMLStreamProcessor
+turns those deltas into HTML segments that never end inside a tag:
+
+    processor = HTMLStreamProcessor()
+    for delta in deltas:
+        send(processor.feed(delta))
+    send(processor.finish())
+    document = minify(processor.html())
+
+feed() only scans the new delta plus a few held-back characters, and the
+emitted segments are joined once at the end, so a document of n bytes
+costs O(n) in total instead of O(n) per delta.
+"""
+import re
+from typing import List
+
+FENCE = "```"
+
+# Never hold more than this many characters while looking for the start of the HTML
+HEAD_LIMIT = 4096
+
+# An opening fence's info string ends at whitespace or where the HTML starts
+_OPENING_FENCE = re.compile(r"```[^\s<`]*([ \t\r]*\n?)")
+# A closing fence is a line of its own, indented by at most three spaces
+_CLOSING_FENCE = re.compile(r"^[ \t]{0,3}`{3,}[ \t\r]*(?:\n|\Z)", re.MULTILINE)
+# A trailing partial line that may still grow into a closing fence
+_CLOSING_PREFIX = re.compile(r"[ \t]{0,3}`{0,2}")
+_PRESERVED = re.compile(r"<(pre|textarea|script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+_LINE_BREAK = re.compile(r"\s*\n\s*")
+_SPACES = re.compile(r"[ \t\r\f\v]{2,}")
+
+
+class FenceStripper:
+    """Drops a leading markdown fence (and any prose before the HTML) and everything from the closing fence on"""
+
+    def __init__(self):
+        self._head: List[str] = []
+        self._head_len = 0
+        self._in_body = False
+        self._fenced = False
+        self._inline = False
+        self._line_start = True
+        self._closed = False
+        self._carry = ""
+
+    def feed(self, text: str) -> str:
+        if self._closed:
+            return ""
+        if not self._in_body:
+            self._head.append(text)
+            self._head_len += len(text)
+            return self._start(final=False)
+        return self._body(text)
+
+    def finish(self) -> str:
+        if self._closed:
+            return ""
+        if not self._in_body:
+            return self._start(final=True) + self._flush_carry()
+        return self._flush_carry()
+
+    def _flush_carry(self) -> str:
+        carry, self._carry = self._carry, ""
+        if self._fenced and not self._inline and _CLOSING_FENCE.match(carry):
+            self._closed = True
+            return ""
+        return carry
+
+    def _start(self, final: bool) -> str:
+        # The head is at most HEAD_LIMIT plus one delta, so re-joining it stays O(chunk)
+        head = "".join(self._head)
+        fence, tag = head.find(FENCE), head.find("<")
+        if fence != -1 and (tag == -1 or fence < tag):
+            opening = _OPENING_FENCE.match(head, fence)
+            ended = opening.group(1).endswith("\n") or opening.end() < len(head)
+            if not ended and not final and self._head_len < HEAD_LIMIT:
+                return ""
+            # "```html <html>...</html>```" on one line closes at the next fence, wherever it is
+            self._fenced, self._inline = True, not opening.group(1).endswith("\n")
+            self._line_start = not self._inline
+            rest = head[opening.end():]
+        elif tag != -1:
+            rest = head[tag:]
+        elif final or self._head_len >= HEAD_LIMIT:
+            rest = head
+        else:
+            return ""
+        self._head, self._in_body = [], True
+        return self._body(rest)
+
+    def _body(self, text: str) -> str:
+        if not self._fenced:
+            return text
+        text = self._carry + text
+        if self._inline:
+            return self._inline_body(text)
+        end = _CLOSING_FENCE.search(text)
+        if end is not None and end.start() == 0 and not self._line_start:
+            end = _CLOSING_FENCE.search(text, 1)
+        if end is not None and end.group().endswith("\n"):
+            self._carry, self._closed = "", True
+            return text[:end.start()]
+        if end is not None:
+            # A fence on the last, unfinished line may still be followed by an info string
+            held = len(text) - end.start()
+        else:
+            # Hold back the start of the last line while it may become the closing fence
+            line = text.rfind("\n") + 1
+            held = 0
+            if (line or self._line_start) and _CLOSING_PREFIX.fullmatch(text, line):
+                held = len(text) - line
+        self._carry = text[len(text) - held:]
+        if text:
+            self._line_start = bool(held) or text.endswith("\n")
+        return text[:len(text) - held]
+
+    def _inline_body(self, text: str) -> str:
+        end = text.find(FENCE)
+        if end != -1:
+            self._carry, self._closed = "", True
+            return text[:end]
+        # Hold back trailing backticks that may be the start of the closing fence
+        held = min(len(text) - len(text.rstrip("`")), len(FENCE) - 1)
+        self._carry = text[len(text) - held:] if held else ""
+        return text[:len(text) - held]
+
+
+class TagBoundaryBuffer:
+    """Re-cuts text so every segment ends right after a '>'.
+    Plain text outside a tag is flushed anyway once `max_pending` characters are held."""
+
+    def __init__(self, max_pending: int = 16 * 1024):
+        self.max_pending = max_pending
+        self._pending: List[str] = []
+        self._pending_len = 0
+        self._in_tag = False
+
+    def feed(self, text: str) -> str:
+        if not text:
+            return ""
+        end = text.rfind(">")
+        if end == -1:
+            self._pending.append(text)
+            self._pending_len += len(text)
+            self._in_tag = self._in_tag or "<" in text
+            if not self._in_tag and self._pending_len >= self.max_pending:
+                return self.finish()
+            return ""
+        self._pending.append(text[:end + 1])
+        segment = "".join(self._pending)
+        rest = text[end + 1:]
+        self._pending = [rest] if rest else []
+        self._pending_len = len(rest)
+        self._in_tag = "<" in rest
+        return segment
+
+    def finish(self) -> str:
+        segment = "".join(self._pending)
+        self._pending, self._pending_len, self._in_tag = [], 0, False
+        return segment
+
+
+class HTMLStreamProcessor:
+    """Fence stripping and tag-boundary flushing for one generation; keeps the emitted segments"""
+
+    def __init__(self, max_pending: int = 16 * 1024):
+        self._fences = FenceStripper()
+        self._boundaries = TagBoundaryBuffer(max_pending)
+        self._segments: List[str] = []
+        self.received = 0
+        self.emitted = 0
+
+    def feed(self, delta: str) -> str:
+        """Process one model delta; returns the HTML that is ready to send (possibly empty)"""
+        self.received += len(delta)
+        return self._emit(self._boundaries.feed(self._fences.feed(delta)))
+
+    def finish(self) -> str:
+        """End of the stream; returns whatever was still held back"""
+        tail = self._boundaries.feed(self._fences.finish()) + self._boundaries.finish()
+        return self._emit(tail)
+
+    def _emit(self, segment: str) -> str:
+        if segment:
+            self._segments.append(segment)
+            self.emitted += len(segment)
+        return segment
+
+    def html(self) -> str:
+        """The processed document (everything emitted so far)"""
+        if len(self._segments) > 1:
+            self._segments = ["".join(self._segments)]
+        return self._segments[0] if self._segments else ""
+
+
+def _minify_markup(markup: str) -> str:
+    markup = _COMMENT.sub("", markup)
+    markup = _LINE_BREAK.sub("\n", markup)
+    return _SPACES.sub(" ", markup)
+
+
+def minify(html: str) -> str:
+    """Drop comments and indentation and collapse whitespace runs, leaving
+    <pre>, <textarea>, <script> and <style> contents untouched. One pass over the document."""
+    parts = []
+    position = 0
+    for match in _PRESERVED.finditer(html):
+        parts.append(_minify_markup(html[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_minify_markup(html[position:]))
+    return "".join(parts).strip()
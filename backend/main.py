@@ -3,23 +3,77 @@ Simple FastAPI Backend for Rapid Campaign Generator
 Separate endpoints for each asset type
 """
 
-from typing import Union,Annotated, List, Optional, Dict
+from typing import Union,Annotated, List, Optional, Dict, Awaitable, Callable
 from pydantic import BaseModel, Field
 from fastapi import FastAPI,HTTPException, Security, status, File, UploadFile, Body, Query, Form, Request
 from fastapi.security import APIKeyHeader
-from fastapi.responses import JSONResponse, StreamingResponse, RedirectResponse, HTMLResponse
+from fastapi.responses import JSONResponse, StreamingResponse, RedirectResponse, HTMLResponse, Response, FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from ai_assist import ai_assistant
 from storage import LandingPageStorage
+from storage_backend import encode_cursor, has_ab_variant
+from page_cache import PageCache, CachedPage
+from generation_cache import GenerationCache
+from campaign import CampaignAsset, DEFAULT_TIMEOUTS, stream_campaign
+from blob_store import BlobStore
+from framing import MEDIA_TYPE as FRAMES_MEDIA_TYPE, encode_frame
+from ab_testing import ABEventLog, VISITOR_COOKIE, EXPOSURE, CONVERSION, assign_variant, parse_split
+from batch_jobs import BatchJobRunner
+from html_stream import HTMLStreamProcessor, minify
+from variant_engine import VariantEngine
+from scheduler import BACKGROUND, INTERACTIVE, GenerationScheduler, ProviderLimits, QueueFull, is_queue_event
+import upstream
+from metrics import MetricsMiddleware, executor_collector, executor_in_flight, registry, stats_collector
+from profiler import SamplingProfiler
+import uuid
+import os
 import json
+import hashlib
+import hmac
 import asyncio
+import threading
+from contextlib import asynccontextmanager
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 # --- Pydantic Models ---
 
 class GenerateRequest(BaseModel):
     prompt: str
     brand_name: str = "Default Brand"
+    # Set to False to force a fresh generation instead of a cached/coalesced one
+    use_cache: bool = True
+
+class GenerateLandingPageRequest(GenerateRequest):
+    # Save the finished (minified) page and report it in the final line of the stream
+    autosave: bool = False
+    custom_slug: Optional[str] = None
+    seo_metadata: Optional[Dict] = None
+
+class GenerateCampaignRequest(GenerateRequest):
+    assets: List[str] = ["landing_page", "instagram_ad", "copy_variants"]
+    # Chain an A/B variant of the landing page once it has finished
+    include_ab_variant: bool = False
+    # Per-asset timeout overrides in seconds (landing_page, instagram_ad, copy_variants, ab_variant)
+    timeouts: Dict[str, float] = Field(default_factory=dict)
+
+class BatchItemRequest(BaseModel):
+    prompt: str
+    brand_name: str = "Default Brand"
+
+class BatchJobRequest(BaseModel):
+    items: List[BatchItemRequest] = Field(..., min_length=1, max_length=1000)
+    # landing_page is generated and saved; copy_variants is kept in the job's item results
+    assets: List[str] = ["landing_page"]
+    # Concurrent items for this job (capped by the runner); defaults to BATCH_PARALLELISM
+    parallelism: Optional[int] = Field(None, ge=1)
+    use_cache: bool = True
+
+class GenerateVariantsRequest(BaseModel):
+    count: int = Field(3, ge=1, le=8)
+    # Defaults to the stored page's brand
+    brand_name: Optional[str] = None
+    use_cache: bool = True
 
 class SaveLandingPageRequest(BaseModel):
     html_content: str
@@ -27,13 +81,125 @@ class SaveLandingPageRequest(BaseModel):
     ab_variant_html: Optional[str] = None
     seo_metadata: Optional[Dict] = None
     custom_slug: Optional[str] = None
+    # A/B traffic split, e.g. {"a": 70, "b": 30}; defaults to AB_SPLIT
+    ab_weights: Optional[Dict[str, float]] = None
 
 # --- FastAPI App ---
 
-app = FastAPI(title="Rapid Campaign Generator API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the AI clients off the request path; the server accepts traffic meanwhile
+    threading.Thread(target=ai_assistant.prewarm, name="ai-prewarm", daemon=True).start()
+    # Open upstream connections before the first generation needs them
+    prewarm = asyncio.create_task(ai_assistant.prewarm_connections()) if os.getenv("UPSTREAM_PREWARM", "1") != "0" else None
+    yield
+    if prewarm is not None:
+        prewarm.cancel()
+    # Persist buffered view counts and A/B events before the worker exits
+    await run_storage(storage.close)
+    await run_storage(ab_events.close)
+    storage_executor.shutdown(wait=True)
+    profiler.stop()
+    await variant_engine.aclose()
+    await upstream.aclose()
+
+app = FastAPI(title="Rapid Campaign Generator API", lifespan=lifespan)
+
+# Initialize storage; changes made by other workers are polled every STORAGE_SYNC_INTERVAL seconds
+# and HTML blobs no page references are deleted every BLOB_GC_INTERVAL seconds
+storage = LandingPageStorage(
+    sync_interval=float(os.getenv("STORAGE_SYNC_INTERVAL", 1.0)),
+    gc_interval=float(os.getenv("BLOB_GC_INTERVAL", 3600)),
+    gc_grace=float(os.getenv("BLOB_GC_GRACE", 3600))
+)
+
+# Storage I/O gets its own threads so nothing else in the process can starve it
+storage_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("STORAGE_THREADS", 16)), thread_name_prefix="storage"
+)
+
+async def run_storage(fn, *args, **kwargs):
+    """Run a blocking storage call on the storage executor"""
+    executor_in_flight.inc(1.0, "storage")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(storage_executor, partial(fn, *args, **kwargs))
+    finally:
+        executor_in_flight.dec(1.0, "storage")
+
+# Hot-page cache for /p/{slug}; storage changes invalidate entries
+page_cache = PageCache(
+    max_bytes=int(os.getenv("PAGE_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    max_entries=int(os.getenv("PAGE_CACHE_MAX_ENTRIES", 512))
+)
+storage.add_change_listener(page_cache.invalidate_page)
+
+# Sticky A/B assignment + batched exposure/conversion analytics
+AB_DEFAULT_WEIGHTS = parse_split(os.getenv("AB_SPLIT", "50,50"))
+ab_events = ABEventLog(os.getenv("AB_EVENTS_DIR", "data/ab-events"))
+ab_events.start()
+
+# Generated images are persisted once, addressed by content hash, and served by URL
+image_store = BlobStore(os.getenv("IMAGE_STORE_DIR", "data/images"))
+IMAGE_EXTENSIONS = {"image/png": "png", "image/jpeg": "jpg", "image/webp": "webp", "image/gif": "gif"}
+IMAGE_MEDIA_TYPES = {ext: mime for mime, ext in IMAGE_EXTENSIONS.items()}
+
+# Content-addressed cache + single-flight coalescing for generation endpoints
+generation_cache = GenerationCache(
+    ttl=float(os.getenv("GENERATION_CACHE_TTL", 600)),
+    max_entries=int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", 256)),
+    max_bytes=int(os.getenv("GENERATION_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    transient=is_queue_event
+)
+
+# A/B variants of one page share a provider context cache of the page (VARIANT_CONTEXT_CACHE=local emulates it)
+variant_engine = VariantEngine(
+    ai_assistant,
+    ttl=float(os.getenv("VARIANT_CONTEXT_TTL", 900)),
+    min_cache_chars=int(os.getenv("VARIANT_CACHE_MIN_CHARS", 8192)),
+    emulate=os.getenv("VARIANT_CONTEXT_CACHE", "provider") == "local"
+)
+
+# Admission control in front of the providers: concurrency caps, rate limits, bounded queues
+OPENROUTER, GEMINI = "openrouter", "gemini"
 
-# Initialize storage
-storage = LandingPageStorage()
+def provider_limits(name: str) -> ProviderLimits:
+    prefix = f"SCHEDULER_{name.upper()}_"
+    return ProviderLimits(
+        max_concurrency=int(os.getenv(prefix + "CONCURRENCY", 8)),
+        requests_per_minute=float(os.getenv(prefix + "RPM", 120)),
+        burst=int(os.getenv(prefix + "BURST", 10)),
+        max_queue=int(os.getenv(prefix + "MAX_QUEUE", 64))
+    )
+
+scheduler = GenerationScheduler({OPENROUTER: provider_limits(OPENROUTER), GEMINI: provider_limits(GEMINI)})
+
+@app.exception_handler(QueueFull)
+async def queue_full_handler(request: Request, exc: QueueFull):
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
+# Prometheus metrics: request latency per route, plus scrape-time views of existing stats
+app.add_middleware(MetricsMiddleware)
+registry.add_collector(executor_collector("storage", storage_executor))
+CACHE_COUNTERS = ("hits", "misses", "coalesced", "evictions", "expirations", "invalidations")
+registry.add_collector(stats_collector(
+    "rcg_scheduler", scheduler.stats, "Generation scheduler", label="provider", counters=("admitted", "rejected")
+))
+registry.add_collector(stats_collector("rcg_generation_cache", generation_cache.stats, "Generation cache", counters=CACHE_COUNTERS))
+registry.add_collector(stats_collector("rcg_page_cache", page_cache.stats, "Hot-page cache", counters=CACHE_COUNTERS))
+registry.add_collector(stats_collector(
+    "rcg_variant_engine", variant_engine.stats, "A/B variant contexts",
+    counters=("provider_contexts", "emulated_contexts", "hits", "misses", "coalesced", "failures", "variants",
+              "prefix_chars_saved")
+))
+registry.add_collector(stats_collector(
+    "rcg_upstream", upstream.upstream_stats.counts, "Upstream requests", label="host",
+    counters=("requests", "errors", "connections_opened", "connections_reused")
+))
+
+# Sampling profiler, toggled at runtime through /debug/profiler (ENABLE_PROFILER_ENDPOINTS=1)
+profiler = SamplingProfiler(interval=float(os.getenv("PROFILER_INTERVAL", 0.01)))
+if os.getenv("PROFILER_ENABLED", "0") == "1":
+    profiler.start()
 
 # CORS configuration
 app.add_middleware(
@@ -44,24 +210,199 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def needs_admission(endpoint: str, model: str, prompt: str, brand_name: str, use_cache: bool = True) -> bool:
+    """True if a generation goes upstream through the scheduler, False if the cache or an in-flight twin serves it"""
+    return not (use_cache and generation_cache.has(GenerationCache.key(endpoint, model, prompt, brand_name)))
+
+def cached_stream(endpoint: str, model: str, prompt: str, brand_name: str, factory, use_cache: bool = True,
+                  provider: str = GEMINI, priority: int = INTERACTIVE):
+    """Serve a generation stream from the cache, an identical in-flight request, or upstream.
+    Upstream streams are admitted by the scheduler right away (raises QueueFull when its queue is full)."""
+    key = GenerationCache.key(endpoint, model, prompt, brand_name)
+    if not needs_admission(endpoint, model, prompt, brand_name, use_cache):
+        return generation_cache.stream(key, factory)
+    admitted = scheduler.stream(provider, factory, priority)
+    if not use_cache:
+        return admitted
+    return generation_cache.stream(key, lambda: admitted)
+
+def landing_page_stream(prompt: str, brand_name: str, use_cache: bool = True, priority: int = INTERACTIVE):
+    return cached_stream(
+        "landing-page", ai_assistant.openrouter_model, prompt, brand_name,
+        lambda: ai_assistant.generate_landing_page(prompt, brand_name),
+        use_cache=use_cache, provider=OPENROUTER, priority=priority
+    )
+
+def instagram_ad_stream(prompt: str, brand_name: str, use_cache: bool = True):
+    return cached_stream(
+        "instagram-ad", ai_assistant.image_model, prompt, brand_name,
+        lambda: ai_assistant.generate_instagram_ad(prompt, brand_name),
+        use_cache=use_cache
+    )
+
+async def _persisted_instagram_ad(prompt: str, brand_name: str):
+    """Raw Instagram ad chunks with every image written once to the image store"""
+    async for chunk in ai_assistant.generate_instagram_ad_images(prompt, brand_name):
+        if "image_bytes" not in chunk:
+            yield {"type": "text", "text": chunk["text"]}
+            continue
+        data, mime_type = chunk["image_bytes"], chunk["mime_type"]
+        ext = IMAGE_EXTENSIONS.get(mime_type, "bin")
+        digest = await run_storage(image_store.put, data, ext)
+        yield {
+            "type": "image",
+            "mime_type": mime_type,
+            "sha256": digest,
+            "size": len(data),
+            "url": f"/assets/images/{digest}.{ext}",
+            "data": data
+        }
+
+def instagram_ad_image_stream(prompt: str, brand_name: str, use_cache: bool = True):
+    return cached_stream(
+        "instagram-ad-binary", ai_assistant.image_model, prompt, brand_name,
+        lambda: _persisted_instagram_ad(prompt, brand_name),
+        use_cache=use_cache
+    )
+
+def ab_test_stream(html_content: str, brand_name: str, use_cache: bool = True, priority: int = INTERACTIVE):
+    return cached_stream(
+        # Keyed on the exact HTML; prompt normalization would fold case inside markup
+        "landing-page-ab-test", ai_assistant.model, hashlib.sha256(html_content.encode("utf-8")).hexdigest(), brand_name,
+        lambda: ai_assistant.generate_landing_page_ab_test(html_content, brand_name),
+        use_cache=use_cache, priority=priority
+    )
+
+VARIANT_NAMES = "bcdefghi"
+
+def variant_key_prompt(html_content: str, index: int, count: int) -> str:
+    return f"{hashlib.sha256(html_content.encode('utf-8')).hexdigest()}:{index}/{count}"
+
+def variant_stream(html_content: str, brand_name: str, index: int, count: int, use_cache: bool = True):
+    return cached_stream(
+        "landing-page-variant", ai_assistant.model, variant_key_prompt(html_content, index, count), brand_name,
+        lambda: variant_engine.stream_variant(html_content, brand_name, index, count),
+        use_cache=use_cache
+    )
+
+def copy_variants_result(prompt: str, brand_name: str, use_cache: bool = True,
+                         priority: int = INTERACTIVE) -> Awaitable[str]:
+    """Admit a copy variants generation (raises QueueFull) and return an awaitable for its text"""
+    factory = lambda: ai_assistant.generate_copy_variants(prompt, brand_name)
+    key = GenerationCache.key("copy-variants", ai_assistant.model, prompt, brand_name)
+    if not needs_admission("copy-variants", ai_assistant.model, prompt, brand_name, use_cache):
+        return generation_cache.call(key, factory)
+    admitted = scheduler.call(GEMINI, factory, priority)
+    if not use_cache:
+        return admitted
+    return generation_cache.call(key, lambda: admitted)
+
+def asset_lanes(assets: List[str], prompt: str, brand_name: str, use_cache: bool = True) -> List[str]:
+    """Scheduler lanes that generating `assets` for one prompt will be admitted to"""
+    generations = {
+        "landing_page": ("landing-page", ai_assistant.openrouter_model, OPENROUTER),
+        "instagram_ad": ("instagram-ad", ai_assistant.image_model, GEMINI),
+        "copy_variants": ("copy-variants", ai_assistant.model, GEMINI),
+    }
+    return [
+        provider for endpoint, model, provider in (generations[name] for name in assets if name in generations)
+        if needs_admission(endpoint, model, prompt, brand_name, use_cache)
+    ]
+
+async def processed_html_stream(stream, save: Optional[Callable[[str], Optional[Dict]]] = None):
+    """Fence-stripped html chunks cut at tag boundaries, then a final
+    {"done": true, "bytes", "minified_bytes"} line. With `save` (called on the storage
+    executor with the minified page, returning the stored page's metadata) the page is
+    saved and returned as "page"."""
+    processor = HTMLStreamProcessor()
+    async for chunk in stream:
+        if "html" not in chunk:
+            yield chunk
+            continue
+        segment = processor.feed(chunk["html"])
+        if segment:
+            yield {"html": segment}
+    segment = processor.finish()
+    if segment:
+        yield {"html": segment}
+
+    document = minify(processor.html())
+    result = {"done": True, "bytes": processor.emitted, "minified_bytes": len(document)}
+    if save is not None and document:
+        try:
+            saved = await run_storage(save, document)
+            if saved is None:
+                raise LookupError("landing page not found")
+            result["page"] = {"id": saved["id"], "slug": saved["slug"], "url": f"/p/{saved['slug']}"}
+        except Exception as e:
+            print(f"Error autosaving landing page: {e}")
+            result["error"] = f"Failed to save landing page: {str(e)}"
+    yield result
+
+def _started(value):
+    """Factory for an already admitted stream or awaitable"""
+    return lambda: value
+
+async def run_batch_item(spec: Dict) -> Dict:
+    """Generate one batch item at background priority; returns the page to save plus copy variants"""
+    prompt, brand_name, use_cache = spec["prompt"], spec["brand_name"], spec["use_cache"]
+    # Check every lane first: if a later admission failed, the earlier generations would run with no reader
+    scheduler.ensure_capacity(asset_lanes(spec["assets"], prompt, brand_name, use_cache), BACKGROUND)
+    # Both generations are admitted before either is awaited, so a QueueFull surfaces here and is retried
+    stream = landing_page_stream(prompt, brand_name, use_cache, BACKGROUND) if "landing_page" in spec["assets"] else None
+    copy = copy_variants_result(prompt, brand_name, use_cache, BACKGROUND) if "copy_variants" in spec["assets"] else None
+    output = {}
+    if stream is not None:
+        processor = HTMLStreamProcessor()
+        async for chunk in stream:
+            if "html" in chunk:
+                processor.feed(chunk["html"])
+        processor.finish()
+        html = minify(processor.html())
+        if not html:
+            raise RuntimeError("Landing page generation returned no HTML")
+        output["page"] = {"html_content": html, "brand_kit": {"name": brand_name}}
+    if copy is not None:
+        output["copy"] = await copy
+    return output
+
+async def save_batch_pages(pages: List[Dict]) -> List[Dict]:
+    return await run_storage(storage.save_many, pages)
+
+# Bulk generation jobs: bounded parallelism, retries with backoff, batched saves
+batch_jobs = BatchJobRunner(
+    run_batch_item, save_batch_pages,
+    parallelism=int(os.getenv("BATCH_PARALLELISM", 4)),
+    max_attempts=int(os.getenv("BATCH_MAX_ATTEMPTS", 3)),
+    save_batch_size=int(os.getenv("BATCH_SAVE_SIZE", 16))
+)
+
+def ab_variant_for(page_id: str, visitor_id: str, weights: Optional[Dict[str, float]], has_variant: bool) -> str:
+    """Sticky variant for a visitor; pages without an A/B variant always get variant a"""
+    if not has_variant:
+        return "a"
+    weights = {name: weight for name, weight in (weights or AB_DEFAULT_WEIGHTS).items() if name in ("a", "b")}
+    return assign_variant(page_id, visitor_id, weights)
+
 # --- API Endpoints ---
 
 @app.get("/")
 def read_root():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "Rapid Campaign Generator API"}
+    return {"status": "healthy", "service": "Rapid Campaign Generator API", "storage_ready": storage.backend.ready}
 
 @app.post("/generate-landing-page")
-async def generate_landing_page(request: GenerateRequest):
-    """Generate landing page HTML - runs in thread pool for true parallelism"""
+async def generate_landing_page(request: GenerateLandingPageRequest):
+    """Generate landing page HTML - streamed from the async provider client (cached + coalesced).
+    Chunks are fence-stripped and end on tag boundaries; with autosave the page is saved on completion."""
+    save = None
+    if request.autosave:
+        save = partial(storage.save_landing_page, brand_kit={"name": request.brand_name},
+                       seo_metadata=request.seo_metadata, custom_slug=request.custom_slug)
+    stream = processed_html_stream(landing_page_stream(request.prompt, request.brand_name, request.use_cache), save)
     try:
         async def generate_stream():
-            full_text = ""
-            # Run the generator in a thread pool to prevent blocking the event loop
-            async for chunk_data in asyncio_aiter(
-                ai_assistant.generate_landing_page(request.prompt, request.brand_name)
-            ):
-                full_text += chunk_data["html"]
+            async for chunk_data in stream:
                 # Yield each chunk as JSON line
                 yield json.dumps(chunk_data) + "\n"
 
@@ -69,45 +410,112 @@ async def generate_landing_page(request: GenerateRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate landing page: {str(e)}")
 
-async def asyncio_aiter(sync_iter):
-    """Wrap a sync iterator to run in thread pool"""
-    loop = asyncio.get_event_loop()
-    iterator = iter(sync_iter)
-
-    while True:
-        try:
-            # Run next() in a thread pool to avoid blocking
-            value = await loop.run_in_executor(None, next, iterator)
-            yield value
-        except StopIteration:
-            break
-    
 @app.post("/generate-instagram-ad")
 async def generate_instagram_ad(request: GenerateRequest):
-    """Generate Instagram image ad - runs in thread pool for true parallelism"""
+    """Generate Instagram image ad - streamed from the async provider client (cached + coalesced)"""
+    stream = instagram_ad_stream(request.prompt, request.brand_name, request.use_cache)
     try:
         async def generate_stream():
-            async for chunk_data in asyncio_aiter(
-                ai_assistant.generate_instagram_ad(request.prompt, request.brand_name)
-            ):
+            async for chunk_data in stream:
                 yield json.dumps(chunk_data) + "\n"
 
         return StreamingResponse(generate_stream(), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate Instagram ad: {str(e)}")
 
+@app.post("/generate-instagram-ad/binary")
+async def generate_instagram_ad_binary(request: GenerateRequest):
+    """Generate Instagram image ad as length-prefixed binary frames (raw image bytes, no base64).
+
+    Image frames carry {"type": "image", "mime_type", "sha256", "size", "url"} in the header and
+    the image bytes as payload; the same image is also served from `url` with long-lived caching.
+    While the request waits for the provider, {"type": "queued", "queue_position"} frames are sent.
+    """
+    stream = instagram_ad_image_stream(request.prompt, request.brand_name, request.use_cache)
+
+    async def generate_stream():
+        try:
+            async for chunk in stream:
+                if is_queue_event(chunk):
+                    yield encode_frame({"type": "queued", "queue_position": chunk["queue_position"]})
+                elif chunk["type"] == "image":
+                    header = {key: value for key, value in chunk.items() if key != "data"}
+                    yield encode_frame(header, chunk["data"])
+                else:
+                    yield encode_frame({"type": "text"}, chunk["text"].encode("utf-8"))
+            yield encode_frame({"type": "end"})
+        except Exception as e:
+            yield encode_frame({"type": "error", "error": str(e)})
+
+    return StreamingResponse(generate_stream(), media_type=FRAMES_MEDIA_TYPE)
+
+@app.get("/assets/images/{name}")
+async def serve_image(name: str, request: Request):
+    """Serve a generated image from the content-addressed store (immutable)"""
+    digest, _, ext = name.partition(".")
+    path = image_store.path(digest, ext)
+    if path is None or ext not in IMAGE_MEDIA_TYPES or not await run_storage(path.exists):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=IMAGE_MEDIA_TYPES[ext], headers=headers)
+
 @app.post("/generate-copy-variants")
 async def generate_copy_variants(request: GenerateRequest):
-    """Generate copy variants - runs in thread pool for true parallelism"""
+    """Generate copy variants - awaited on the event loop (cached + coalesced)"""
+    pending = copy_variants_result(request.prompt, request.brand_name, request.use_cache)
     try:
-        # Run blocking AI call in thread pool
-        result = await asyncio.to_thread(
-            ai_assistant.generate_copy_variants, request.prompt, request.brand_name
-        )
+        result = await pending
         return {"copy": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate copy variants: {str(e)}")
 
+@app.post("/generate-campaign")
+async def generate_campaign(request: GenerateCampaignRequest):
+    """Generate every campaign asset concurrently over one NDJSON stream tagged by asset"""
+    unknown = set(request.assets) - {"landing_page", "instagram_ad", "copy_variants"}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown assets: {', '.join(sorted(unknown))}")
+
+    timeouts = {**DEFAULT_TIMEOUTS, **request.timeouts}
+    prompt, brand_name, use_cache = request.prompt, request.brand_name, request.use_cache
+
+    def chain_ab_variant(html: str):
+        if not html:
+            return None
+        # Follow-up work runs at background priority behind interactive requests
+        return CampaignAsset(
+            "ab_variant", lambda: ab_test_stream(html, brand_name, use_cache, BACKGROUND), timeouts["ab_variant"]
+        )
+
+    # Every requested asset is admitted up front, so an overloaded provider yields a 429 before streaming.
+    # All lanes are checked first: a later rejection would leave the earlier generations running with no reader.
+    names = list(dict.fromkeys(request.assets))
+    scheduler.ensure_capacity(asset_lanes(names, prompt, brand_name, use_cache), INTERACTIVE)
+    factories = {
+        "landing_page": lambda: CampaignAsset(
+            "landing_page", _started(processed_html_stream(landing_page_stream(prompt, brand_name, use_cache))),
+            timeouts["landing_page"],
+            then=chain_ab_variant if request.include_ab_variant else None
+        ),
+        "instagram_ad": lambda: CampaignAsset(
+            "instagram_ad", _started(instagram_ad_stream(prompt, brand_name, use_cache)), timeouts["instagram_ad"]
+        ),
+        "copy_variants": lambda: CampaignAsset(
+            "copy_variants", _started(copy_variants_result(prompt, brand_name, use_cache)), timeouts["copy_variants"],
+            streaming=False, result_key="copy"
+        ),
+    }
+    assets = [factories[name]() for name in names]
+
+    async def generate_stream():
+        async for event in stream_campaign(assets):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(generate_stream(), media_type="application/json")
+
 @app.post("/generate-video")
 async def generate_video(request: GenerateRequest):
     """Generate video (placeholder)"""
@@ -115,17 +523,32 @@ async def generate_video(request: GenerateRequest):
 
 @app.post("/generate-landing-page-ab-test")
 async def generate_landing_page_ab_test(request: dict):
-    """Generate A/B test variant of landing page HTML - runs in thread pool"""
+    """Generate A/B test variant of landing page HTML - streamed from the async provider client (cached + coalesced).
+    Chunks are fence-stripped and end on tag boundaries. With "autosave" the generated HTML is
+    stored on completion as the B variant of the stored page ("page_id"), or of a new page
+    saved from the posted "html"."""
+    html_content = request.get("html", "")
+    brand_name = request.get("brand_name", "Default Brand")
+    if not html_content and request.get("page_id"):
+        # Stored pages are referenced by id instead of posting their HTML back
+        page = await run_storage(storage.get_by_id, request["page_id"])
+        if not page:
+            raise HTTPException(status_code=404, detail="Landing page not found")
+        html_content = page["html_content"]
+        brand_name = request.get("brand_name") or page["brand_kit"].get("name", brand_name)
     try:
-        html_content = request.get("html", "")
-        brand_name = request.get("brand_name", "Default Brand")
+        save = None
+        if request.get("autosave") and request.get("page_id"):
+            save = partial(storage.set_ab_variant, request["page_id"], ab_weights=request.get("ab_weights"))
+        elif request.get("autosave"):
+            save = lambda variant: storage.save_landing_page(
+                html_content, {"name": brand_name}, ab_variant_html=variant,
+                custom_slug=request.get("custom_slug"), ab_weights=request.get("ab_weights")
+            )
+        stream = processed_html_stream(ab_test_stream(html_content, brand_name, request.get("use_cache", True)), save)
 
         async def generate_stream():
-            full_text = ""
-            async for chunk_data in asyncio_aiter(
-                ai_assistant.generate_landing_page_ab_test(html_content, brand_name)
-            ):
-                full_text += chunk_data["html"]
+            async for chunk_data in stream:
                 # Yield each chunk as JSON line
                 yield json.dumps(chunk_data) + "\n"
 
@@ -137,16 +560,17 @@ async def generate_landing_page_ab_test(request: dict):
 
 @app.post("/api/save-landing-page")
 async def save_landing_page(request: SaveLandingPageRequest):
-    """Save a landing page and get a public URL - file I/O in thread pool"""
+    """Save a landing page and get a public URL - file I/O on the storage executor"""
     try:
-        # Run file I/O in thread pool to avoid blocking
-        result = await asyncio.to_thread(
+        # Run file I/O on the storage executor to avoid blocking
+        result = await run_storage(
             storage.save_landing_page,
             html_content=request.html_content,
             brand_kit=request.brand_kit,
             ab_variant_html=request.ab_variant_html,
             seo_metadata=request.seo_metadata,
-            custom_slug=request.custom_slug
+            custom_slug=request.custom_slug,
+            ab_weights=request.ab_weights
         )
         return {
             "success": True,
@@ -160,51 +584,246 @@ async def save_landing_page(request: SaveLandingPageRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save landing page: {str(e)}")
 
+def load_cached_page(slug: str) -> Optional[CachedPage]:
+    """Read a page into an uncompressed cache entry; encodings are built when first negotiated"""
+    page = storage.get_by_slug(slug)
+    return CachedPage(page) if page else None
+
 @app.get("/p/{slug}", response_class=HTMLResponse)
-async def serve_landing_page(slug: str):
-    """Serve a public landing page by slug - file I/O in thread pool"""
-    # Run file I/O in thread pool
-    page = await asyncio.to_thread(storage.get_by_slug, slug)
-    if not page:
-        raise HTTPException(status_code=404, detail="Landing page not found")
+async def serve_landing_page(slug: str, request: Request):
+    """Serve a public landing page by slug - hot pages come pre-encoded from the page cache"""
+    entry = page_cache.get(slug)
+    if entry is None:
+        generation = page_cache.generation
+        # File I/O on the storage executor; no compression happens here
+        entry = await run_storage(load_cached_page, slug)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Landing page not found")
+        page_cache.put(entry, generation)
+    else:
+        storage.record_view(entry.page_id)
+
+    # Sticky A/B assignment: the same visitor always gets the same variant
+    visitor_id = request.cookies.get(VISITOR_COOKIE)
+    new_visitor = not visitor_id
+    if new_visitor:
+        visitor_id = uuid.uuid4().hex
+    variant = ab_variant_for(entry.page_id, visitor_id, entry.weights, "b" in entry.variants)
+    ab_events.record(entry.page_id, variant, EXPOSURE, visitor_id)
+    body = entry.variants[variant]
+
+    headers = {"ETag": body.etag, "Vary": "Accept-Encoding, Cookie", "Cache-Control": "no-cache"}
+    if body.matches(request.headers.get("if-none-match")):
+        response = Response(status_code=304, headers=headers)
+    else:
+        encoding = body.choose(request.headers.get("accept-encoding"))
+        content = body.encoded(encoding)
+        if content is None:
+            # First client asking for this coding: compress once on the default executor
+            content = await asyncio.get_running_loop().run_in_executor(None, body.encode, encoding)
+            page_cache.grow(entry)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        response = Response(content=content, media_type="text/html; charset=utf-8", headers=headers)
+    if new_visitor:
+        response.set_cookie(VISITOR_COOKIE, visitor_id, max_age=365 * 24 * 3600, httponly=True, samesite="lax")
+    return response
+
+@app.post("/p/{slug}/convert")
+async def record_conversion(slug: str, request: Request):
+    """Record a conversion for the visitor's assigned variant (call from the landing page)"""
+    visitor_id = request.cookies.get(VISITOR_COOKIE)
+    if not visitor_id:
+        raise HTTPException(status_code=400, detail="Missing visitor cookie")
 
-    # Serve A/B variant randomly if it exists
-    if page.get("ab_variant_html"):
-        import random
-        if random.random() < 0.5:
-            return HTMLResponse(content=page["ab_variant_html"])
+    entry = page_cache.get(slug)
+    if entry is not None:
+        page_id, has_variant, weights = entry.page_id, "b" in entry.variants, entry.weights
+    else:
+        page_id = await run_storage(storage.resolve_slug, slug)
+        page = await run_storage(storage.get_by_id, page_id, include_html=False) if page_id else None
+        if not page:
+            raise HTTPException(status_code=404, detail="Landing page not found")
+        has_variant, weights = has_ab_variant(page), page.get("ab_weights")
 
-    return HTMLResponse(content=page["html_content"])
+    variant = ab_variant_for(page_id, visitor_id, weights, has_variant)
+    ab_events.record(page_id, variant, CONVERSION, visitor_id)
+    return {"success": True, "variant": variant}
+
+@app.get("/api/landing-pages/{page_id}/ab-stats")
+async def get_ab_stats(page_id: str):
+    """Exposures, conversions and conversion rate per variant"""
+    return ab_events.stats(page_id)
 
 @app.get("/api/landing-pages")
-async def list_landing_pages(limit: int = Query(100, ge=1, le=1000)):
-    """List all saved landing pages (metadata only) - file I/O in thread pool"""
+async def list_landing_pages(
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor")
+):
+    """List saved landing pages newest first (metadata only) - served from the page manifest"""
     try:
-        pages = await asyncio.to_thread(storage.list_all, limit=limit)
-        return {"pages": pages, "count": len(pages)}
+        pages = await run_storage(storage.list_all, limit=limit, after=after)
+        next_cursor = encode_cursor(pages[-1]) if len(pages) == limit else None
+        return {"pages": pages, "count": len(pages), "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list landing pages: {str(e)}")
 
 @app.get("/api/landing-pages/{page_id}")
 async def get_landing_page(page_id: str):
-    """Get a specific landing page by ID (includes full HTML) - file I/O in thread pool"""
-    page = await asyncio.to_thread(storage.get_by_id, page_id)
+    """Get a specific landing page by ID (includes full HTML) - file I/O on the storage executor"""
+    page = await run_storage(storage.get_by_id, page_id)
     if not page:
         raise HTTPException(status_code=404, detail="Landing page not found")
     return page
 
+@app.post("/api/landing-pages/{page_id}/variants")
+async def generate_landing_page_variants(page_id: str, request: GenerateVariantsRequest):
+    """Generate `count` A/B variants of a stored page concurrently over one NDJSON stream.
+    Events are tagged {"variant": "b"|"c"|...}; the page is uploaded to the provider's context cache once."""
+    page = await run_storage(storage.get_by_id, page_id)
+    if not page:
+        raise HTTPException(status_code=404, detail="Landing page not found")
+    html_content = page["html_content"]
+    brand_name = request.brand_name or page["brand_kit"].get("name", "Default Brand")
+
+    # Every variant is admitted up front, so an overloaded provider yields a 429 before streaming.
+    # The lane is checked for all of them first, so no variant starts unless every one is admitted.
+    scheduler.ensure_capacity([
+        GEMINI for index in range(request.count)
+        if needs_admission("landing-page-variant", ai_assistant.model, variant_key_prompt(html_content, index, request.count),
+                           brand_name, request.use_cache)
+    ], INTERACTIVE)
+    variants = [
+        CampaignAsset(
+            VARIANT_NAMES[index],
+            _started(processed_html_stream(variant_stream(html_content, brand_name, index, request.count, request.use_cache))),
+            DEFAULT_TIMEOUTS["ab_variant"]
+        )
+        for index in range(request.count)
+    ]
+
+    async def generate_stream():
+        async for event in stream_campaign(variants, tag="variant"):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(generate_stream(), media_type="application/json")
+
 @app.delete("/api/landing-pages/{page_id}")
 async def delete_landing_page(page_id: str):
-    """Delete a landing page by ID - file I/O in thread pool"""
-    success = await asyncio.to_thread(storage.delete, page_id)
+    """Delete a landing page by ID - file I/O on the storage executor"""
+    success = await run_storage(storage.delete, page_id)
     if not success:
         raise HTTPException(status_code=404, detail="Landing page not found")
     return {"success": True, "message": "Landing page deleted"}
 
 @app.patch("/api/landing-pages/{page_id}/slug")
 async def update_landing_page_slug(page_id: str, new_slug: str = Body(..., embed=True)):
-    """Update the slug of a landing page - file I/O in thread pool"""
-    success = await asyncio.to_thread(storage.update_slug, page_id, new_slug)
+    """Update the slug of a landing page - file I/O on the storage executor"""
+    success = await run_storage(storage.update_slug, page_id, new_slug)
     if not success:
         raise HTTPException(status_code=400, detail="Failed to update slug (may already exist or page not found)")
     return {"success": True, "new_slug": new_slug}
+
+@app.get("/api/cache-stats")
+async def cache_stats():
+    """Hit/miss/eviction counters for the in-process caches"""
+    return {
+        "page_cache": page_cache.stats(),
+        "generation_cache": generation_cache.stats(),
+        "variant_engine": variant_engine.stats()
+    }
+
+@app.post("/api/batch-jobs", status_code=202)
+async def create_batch_job(request: BatchJobRequest):
+    """Start generating and saving landing pages for many prompt/brand pairs in the background"""
+    unknown = set(request.assets) - {"landing_page", "copy_variants"}
+    if unknown or not request.assets:
+        raise HTTPException(status_code=400, detail=f"Unknown or missing assets: {', '.join(sorted(unknown))}")
+    assets = list(dict.fromkeys(request.assets))
+    items = [
+        {"prompt": item.prompt, "brand_name": item.brand_name, "assets": assets, "use_cache": request.use_cache}
+        for item in request.items
+    ]
+    job = batch_jobs.submit(items, {"assets": assets, "parallelism": request.parallelism, "use_cache": request.use_cache})
+    return job.summary(include_items=False)
+
+@app.get("/api/batch-jobs")
+async def list_batch_jobs():
+    """Recent batch jobs, newest first (without per-item results)"""
+    return {"jobs": [job.summary(include_items=False) for job in batch_jobs.list()]}
+
+@app.get("/api/batch-jobs/{job_id}")
+async def get_batch_job(job_id: str):
+    """Status, counts and per-item results of a batch job"""
+    job = batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job.summary()
+
+@app.get("/api/batch-jobs/{job_id}/events")
+async def stream_batch_job(job_id: str):
+    """NDJSON progress stream: every event so far, then live events until the job finishes"""
+    job = batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+
+    async def generate_stream():
+        async for event in job.follow():
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(generate_stream(), media_type="application/json")
+
+@app.delete("/api/batch-jobs/{job_id}")
+async def cancel_batch_job(job_id: str):
+    """Cancel a running batch job; pages saved so far are kept"""
+    if batch_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    if not batch_jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Batch job already finished")
+    return {"success": True}
+
+@app.get("/api/scheduler-stats")
+async def scheduler_stats():
+    """Active, queued and rejected generations per provider"""
+    return scheduler.stats()
+
+@app.get("/api/upstream-stats")
+async def upstream_stats():
+    """Connection reuse and connect/TTFB/total timings per upstream host"""
+    return {"http2": upstream.upstream_settings.http2, "hosts": upstream.upstream_stats.snapshot()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# The profiler endpoints expose stacks and file paths and add sampling load: off unless enabled,
+# and behind X-Profiler-Token when PROFILER_TOKEN is set
+profiler_token_header = APIKeyHeader(name="X-Profiler-Token", auto_error=False)
+
+async def require_profiler_token(token: Optional[str] = Security(profiler_token_header)):
+    expected = os.getenv("PROFILER_TOKEN")
+    if expected and not (token and hmac.compare_digest(token, expected)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profiler token")
+
+if os.getenv("ENABLE_PROFILER_ENDPOINTS", "0") == "1":
+    @app.get("/debug/profiler", dependencies=[Security(require_profiler_token)])
+    async def profiler_status():
+        """Whether the sampling profiler runs, and how much it has sampled"""
+        return profiler.status()
+
+    @app.post("/debug/profiler", dependencies=[Security(require_profiler_token)])
+    async def toggle_profiler(enabled: bool = Body(..., embed=True), interval: Optional[float] = Body(None, embed=True, ge=0.001)):
+        """Start (clearing earlier samples) or stop the sampling profiler"""
+        if enabled:
+            profiler.start(interval)
+        else:
+            profiler.stop()
+        return profiler.status()
+
+    @app.get("/debug/profiler/stacks", response_class=PlainTextResponse, dependencies=[Security(require_profiler_token)])
+    async def profiler_stacks(limit: int = Query(0, ge=0)):
+        """Sampled stacks in collapsed format (feed to flamegraph.pl or speedscope)"""
+        return PlainTextResponse(profiler.collapsed(limit))
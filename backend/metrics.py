@@ -0,0 +1,369 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+A small, dependency-free registry of counters, gauges and histograms with
+labels, cheap enough to leave on in the request path: an observation is a
+dict lookup, a bisect over the bucket bounds and a few additions under one
+lock. Values that already live elsewhere (executor queues, scheduler and
+cache counters) are read by collector callbacks only when /metrics is
+scraped.
+"""
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond storage reads up to multi-minute generations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. requests or bytes streamed"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, *labels: str):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. in-flight requests"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, amount: float = 1.0, *labels: str):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, *labels: str):
+        self.inc(-amount, *labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets (latencies in seconds)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.bounds = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.bounds) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels: str) -> "_Timer":
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        lines = self.header()
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket in zip(self.bounds + (float("inf"),), counts):
+                cumulative += bucket
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Registry:
+    """Holds metrics and scrape-time collectors; renders the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} is already registered as a {existing.kind}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]):
+        """Register a scrape-time callback yielding (name, type, help, labels, value) samples"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        collected: Dict[str, List[str]] = {}
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+                continue
+            for name, kind, documentation, labels, value in samples:
+                if name not in collected:
+                    collected[name] = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+                collected[name].append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        for block in collected.values():
+            lines.extend(block)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Hot-path metrics shared across modules
+http_request_seconds = registry.histogram(
+    "rcg_http_request_duration_seconds",
+    "HTTP request latency until the response body is complete",
+    ("method", "route", "status")
+)
+generation_first_chunk_seconds = registry.histogram(
+    "rcg_generation_first_chunk_seconds", "Time from starting a provider generation to its first chunk", ("generator",)
+)
+generation_seconds = registry.histogram(
+    "rcg_generation_duration_seconds", "Total duration of a provider generation", ("generator", "outcome")
+)
+generation_chunks = registry.counter("rcg_generation_chunks_total", "Chunks produced by provider generations", ("generator",))
+generation_bytes = registry.counter("rcg_generation_bytes_total", "Bytes of text and image data generated", ("generator",))
+generations_in_flight = registry.gauge("rcg_generations_in_flight", "Provider generations currently running", ("generator",))
+storage_seconds = registry.histogram("rcg_storage_operation_seconds", "Landing page storage operation latency", ("operation",))
+executor_in_flight = registry.gauge("rcg_executor_in_flight", "Calls submitted to an executor and not yet finished", ("executor",))
+
+
+def _payload_size(chunk: Any) -> int:
+    if isinstance(chunk, (bytes, bytearray)):
+        return len(chunk)
+    if isinstance(chunk, str):
+        return len(chunk.encode("utf-8"))
+    if isinstance(chunk, dict):
+        return sum(len(v) for v in chunk.values() if isinstance(v, (str, bytes, bytearray)))
+    return 0
+
+
+def instrument_stream(generator: str):
+    """Decorate an async generator: time to first chunk, duration, chunks and bytes"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            chunks = size = 0
+            outcome = "error"
+            generations_in_flight.inc(1.0, generator)
+            try:
+                async for chunk in fn(*args, **kwargs):
+                    if chunks == 0:
+                        generation_first_chunk_seconds.observe(time.perf_counter() - started, generator)
+                    chunks += 1
+                    size += _payload_size(chunk)
+                    yield chunk
+                outcome = "ok"
+            except (GeneratorExit, asyncio.CancelledError):
+                outcome = "cancelled"
+                raise
+            finally:
+                generations_in_flight.dec(1.0, generator)
+                generation_seconds.observe(time.perf_counter() - started, generator, outcome)
+                generation_chunks.inc(chunks, generator)
+                generation_bytes.inc(size, generator)
+        return wrapper
+    return decorator
+
+
+def instrument_call(generator: str):
+    """Decorate a coroutine returning a whole generation: duration and bytes"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "error"
+            generations_in_flight.inc(1.0, generator)
+            try:
+                result = await fn(*args, **kwargs)
+                outcome = "ok"
+                generation_bytes.inc(_payload_size(result), generator)
+                return result
+            finally:
+                generations_in_flight.dec(1.0, generator)
+                generation_seconds.observe(time.perf_counter() - started, generator, outcome)
+        return wrapper
+    return decorator
+
+
+def timed_storage(operation: str):
+    """Decorate a storage method with a latency histogram"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                storage_seconds.observe(time.perf_counter() - started, operation)
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency by route template.
+    Streaming responses are timed until their last body chunk is sent."""
+
+    def __init__(self, app, histogram: Histogram = http_request_seconds, skip: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.histogram = histogram
+        self.skip = set(skip)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = "500"
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            route = scope.get("route")
+            self.histogram.observe(
+                time.perf_counter() - started, scope["method"], getattr(route, "path", "unmatched"), status
+            )
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            record()
+
+
+def executor_collector(name: str, executor) -> Callable:
+    """Scrape-time queue depth and thread count of a ThreadPoolExecutor"""
+    def collect():
+        yield ("rcg_executor_queue_depth", "gauge", "Work items waiting for an executor thread",
+               {"executor": name}, executor._work_queue.qsize())
+        yield ("rcg_executor_threads", "gauge", "Threads started by an executor", {"executor": name}, len(executor._threads))
+    return collect
+
+
+def stats_collector(prefix: str, stats: Callable[[], Dict], documentation: str, label: Optional[str] = None,
+                    counters: Sequence[str] = ()) -> Callable:
+    """Expose the numeric fields of an existing stats() dict: `counters` as <field>_total counters, the rest as gauges.
+    With `label`, stats() maps label values (e.g. providers) to such dicts."""
+    def collect():
+        data = stats()
+        groups = data.items() if label else [(None, data)]
+        for group, fields in groups:
+            labels = {label: group} if label else {}
+            for field, value in fields.items():
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                if field in counters:
+                    yield (f"{prefix}_{field}_total", "counter", f"{documentation}: {field}", labels, value)
+                else:
+                    yield (f"{prefix}_{field}", "gauge", f"{documentation}: {field}", labels, value)
+    return collect
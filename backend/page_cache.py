@@ -0,0 +1,204 @@
+"""
+Hot-page cache for /p/{slug}.
+Keeps the rendered variant bodies of recently served landing pages in a
+bounded LRU (entry and byte limits), together with an ETag and their gzip
+and brotli encodings, so a cache hit does no disk I/O, parsing or
+compression. Each encoding is built the first time a client negotiates
+it, so a cache miss never pays for codings nobody asked for.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Fast levels: an encoding is built on the request that first needs it
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _compress(coding: str, data: bytes) -> bytes:
+    if coding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+class EncodedBody:
+    """One HTML body with its ETag and the encodings built for it so far"""
+
+    __slots__ = ("identity", "etag", "_encodings")
+
+    def __init__(self, html: str):
+        self.identity = html.encode("utf-8")
+        # Weak ETag: the same validator is valid for every content-coding of this body
+        self.etag = 'W/"' + hashlib.sha256(self.identity).hexdigest()[:32] + '"'
+        self._encodings: Dict[str, bytes] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.identity) + sum(len(body) for body in self._encodings.values())
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True if an If-None-Match header already covers this body"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        opaque = self.etag[2:]
+        return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+    def choose(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """The best content-coding the client accepts, or None for identity"""
+        accepted = _parse_accept_encoding(accept_encoding)
+        if brotli is not None and accepted.get("br", accepted.get("*", 0)) > 0:
+            return "br"
+        if accepted.get("gzip", accepted.get("*", 0)) > 0:
+            return "gzip"
+        return None
+
+    def encoded(self, coding: Optional[str]) -> Optional[bytes]:
+        """The body in `coding` if it is already built (identity always is)"""
+        return self._encodings.get(coding) if coding else self.identity
+
+    def encode(self, coding: Optional[str]) -> bytes:
+        """The body in `coding`, compressing it on first use"""
+        body = self.encoded(coding)
+        if body is None:
+            # Two threads may race to build the same coding; both produce the same bytes
+            body = self._encodings[coding] = _compress(coding, self.identity)
+        return body
+
+
+def _parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class CachedPage:
+    """Encoded variants of one landing page, keyed by variant name ("a", "b")"""
+
+    __slots__ = ("page_id", "slug", "variants", "weights", "charged")
+
+    def __init__(self, page: Dict):
+        self.page_id = page["id"]
+        self.slug = page["slug"]
+        # Per-page A/B split override, e.g. {"a": 70, "b": 30}
+        self.weights: Optional[Dict[str, float]] = page.get("ab_weights")
+        self.variants: Dict[str, EncodedBody] = {"a": EncodedBody(page.get("html_content") or "")}
+        if page.get("ab_variant_html"):
+            self.variants["b"] = EncodedBody(page["ab_variant_html"])
+        # Bytes the cache has accounted for; encodings built later are added by PageCache.grow()
+        self.charged = 0
+
+    @property
+    def size(self) -> int:
+        return sum(body.size for body in self.variants.values())
+
+
+class PageCache:
+    """Thread-safe LRU of CachedPage entries bounded by entry count and total bytes"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 512):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[str, CachedPage]" = OrderedDict()
+        self._bytes = 0
+        # Bumped on every invalidation; fills started before it are discarded
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, slug: str) -> Optional[CachedPage]:
+        with self._lock:
+            entry = self._entries.get(slug)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(slug)
+            self.hits += 1
+            return entry
+
+    def fits(self, size: int) -> bool:
+        """False for bodies too large to ever be cached"""
+        return size <= self.max_bytes
+
+    def put(self, entry: CachedPage, generation: Optional[int] = None):
+        """Insert an entry built from a read that started at `generation`"""
+        if not self.fits(entry.size):
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                # The page may have changed while it was being read
+                return
+            old = self._entries.pop(entry.slug, None)
+            if old is not None:
+                self._bytes -= old.charged
+            self._entries[entry.slug] = entry
+            entry.charged = entry.size
+            self._bytes += entry.charged
+            self._evict()
+
+    def grow(self, entry: CachedPage):
+        """Account for encodings built on an entry since it was inserted"""
+        with self._lock:
+            if self._entries.get(entry.slug) is not entry:
+                return
+            size = entry.size
+            self._bytes += size - entry.charged
+            entry.charged = size
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.charged
+            self.evictions += 1
+
+    def invalidate_page(self, page_id: str):
+        """Drop every entry serving a page (storage change listener)"""
+        with self._lock:
+            self._generation += 1
+            stale = [slug for slug, entry in self._entries.items() if entry.page_id == page_id]
+            for slug in stale:
+                self._bytes -= self._entries.pop(slug).charged
+                self.invalidations += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "brotli": brotli is not None
+            }
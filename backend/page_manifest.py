@@ -0,0 +1,403 @@
+"""
+Persistent page manifest for the file storage backend.
+Holds the compact metadata of every page (id, slug, brand name, created_at,
+views, A/B flag) separately from the HTML-heavy page files, so slug
+resolution and listing never open a page record.
+
+The manifest is a JSON snapshot plus an append-only journal of changes,
+so every mutation costs one small append instead of rewriting the manifest.
+
+The manifest can be loaded or rebuilt on a background thread while it is
+already in use: lookups of a slug or id that is already indexed return at
+once, and anything that needs the complete index (misses, listing,
+writes) waits until loading has finished.
+
+Several processes (uvicorn workers, replicas on shared storage) can use
+the same directory. The journal doubles as their change log: writers hold
+an exclusive flock on manifest.lock, first apply what other processes
+appended since they last looked, then check and append, so slug claims
+are atomic across processes. Readers catch up incrementally (from their
+journal offset) on a miss and whenever refresh() is polled. Compaction
+replaces the journal with one that starts with a new generation number,
+which tells the other processes to reload the snapshot instead.
+"""
+import bisect
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from atomic_io import ProcessLock, atomic_write_bytes, atomic_write_json
+
+class PageManifest:
+    """Thread-safe page metadata index (id -> meta, slug -> id, created_at order)"""
+
+    # Compact once the journal holds this many entries (or more than the manifest size)
+    MIN_COMPACT_ENTRIES = 1024
+
+    def __init__(self, index_dir: Path):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._snapshot_path = self.index_dir / "manifest.json"
+        self._journal_path = self.index_dir / "manifest.journal"
+        self._process_lock = ProcessLock(self.index_dir / "manifest.lock")
+
+        self._pages: Dict[str, Dict] = {}
+        self._slugs: Dict[str, str] = {}
+        # Sort keys (created_at, id), ascending; listed newest first
+        self._order: List[Tuple[str, str]] = []
+        self._journal_entries = 0
+        # Snapshot generation, and how far into the current journal this process has applied
+        self.generation = 0
+        self._journal_offset = 0
+        self._journal_inode: Optional[int] = None
+        # Pages changed by other processes, not yet reported by refresh()
+        self._remote_changes: Set[str] = set()
+        # Set when the journal on disk belongs to an older generation (crash during compaction)
+        self._journal_stale = False
+        self._lock = threading.RLock()
+        # Signalled as pages are indexed during loading and once loading is complete
+        self._changed = threading.Condition(self._lock)
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def wait_loaded(self, timeout: Optional[float] = None) -> bool:
+        """Block until the manifest is fully loaded. Returns False on timeout."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self._loaded, timeout)
+
+    def mark_loaded(self):
+        """Release waiters once loading has finished (or failed)"""
+        with self._changed:
+            self._loaded = True
+            self._changed.notify_all()
+
+    def _wait(self, indexed=lambda: False):
+        """Wait (holding the lock on return) until `indexed()` is true or loading has finished"""
+        if not self._loaded:
+            self._changed.wait_for(lambda: self._loaded or indexed())
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the inter-process lock while loading, so only one process rebuilds a missing manifest.
+        The manifest lock is not held, so pages stay resolvable while a rebuild publishes them;
+        other threads needing the inter-process lock meanwhile wait in ProcessLock.hold()."""
+        with self._process_lock.hold(exclusive=True):
+            yield
+
+    def load(self) -> bool:
+        """Load the persisted snapshot and replay the journal. Returns False if there is no snapshot."""
+        with self._lock:
+            with self._process_lock.hold(exclusive=False):
+                if not self._load_snapshot():
+                    return False
+        self.mark_loaded()
+        return True
+
+    def _load_snapshot(self) -> bool:
+        if not self._snapshot_path.exists():
+            return False
+        try:
+            with open(self._snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except Exception as e:
+            print(f"Error reading {self._snapshot_path}: {e}")
+            return False
+
+        self._reset(snapshot.get("pages", []))
+        self.generation = snapshot.get("generation", 0)
+        self._journal_offset, self._journal_inode, self._journal_entries = 0, None, 0
+        self._journal_stale = False
+        self._read_journal()
+        return True
+
+    def _read_journal(self) -> Set[str]:
+        """Apply journal entries past this process's offset; returns the ids of pages put or deleted.
+        Called with the inter-process lock held."""
+        try:
+            with open(self._journal_path, 'rb') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if inode != self._journal_inode:
+                    # A different journal file: start from its generation header
+                    self._journal_inode, self._journal_offset = inode, 0
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return set()
+
+        changed = set()
+        # Only complete lines; a torn tail (crash mid-append) is never read past
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            op = entry.get("op")
+            if op == "generation":
+                # A journal from an older generation is already folded into the snapshot
+                if entry["generation"] != self.generation:
+                    self._journal_stale = True
+                    break
+                continue
+            if op == "put":
+                self._apply_put(entry["meta"])
+                changed.add(entry["meta"]["id"])
+            elif op == "del":
+                self._apply_delete(entry["id"])
+                changed.add(entry["id"])
+            elif op == "views":
+                self._apply_views(entry["counts"])
+            self._journal_entries += 1
+        self._journal_offset += end
+        return changed
+
+    def _journal_changed(self) -> bool:
+        try:
+            stat = os.stat(self._journal_path)
+        except FileNotFoundError:
+            return self._journal_inode is not None
+        return stat.st_ino != self._journal_inode or stat.st_size != self._journal_offset
+
+    def _catch_up(self):
+        """Apply changes other processes made since this one last looked (inter-process lock held)"""
+        if not self._journal_changed():
+            return
+        if self._journal_header() != self.generation:
+            # Another process compacted: reload, and report every page whose metadata differs
+            before = {page_id: (meta["slug"], meta.get("has_ab_variant")) for page_id, meta in self._pages.items()}
+            if self._load_snapshot():
+                after = {page_id: (meta["slug"], meta.get("has_ab_variant")) for page_id, meta in self._pages.items()}
+                self._remote_changes.update(page_id for page_id in before.keys() | after.keys()
+                                            if before.get(page_id) != after.get(page_id))
+            return
+        self._remote_changes.update(self._read_journal())
+
+    def _journal_header(self) -> int:
+        """Generation of the journal on disk (0 for journals written before generations existed)"""
+        try:
+            with open(self._journal_path, 'rb') as f:
+                entry = json.loads(f.readline() or b"{}")
+        except (FileNotFoundError, ValueError):
+            return self.generation
+        return entry["generation"] if entry.get("op") == "generation" else 0
+
+    def refresh(self) -> List[str]:
+        """Catch up with other processes; returns the ids of pages they put or deleted since the last call"""
+        with self._lock:
+            self._refresh_if_changed()
+            changed, self._remote_changes = list(self._remote_changes), set()
+            return changed
+
+    def _refresh_if_changed(self):
+        if self._loaded and self._journal_changed():
+            with self._process_lock.hold(exclusive=False):
+                self._catch_up()
+
+    def rebuild(self, metas: Iterable[Dict], batch_size: int = 256):
+        """Replace the manifest with the given page metadata and persist a fresh snapshot.
+        Pages become resolvable batch by batch while the rest are still being read."""
+        with self._lock:
+            self._loaded = False
+            self._reset([])
+        try:
+            batch = []
+            for meta in metas:
+                batch.append(meta)
+                if len(batch) >= batch_size:
+                    self._publish(batch)
+                    batch = []
+            self._publish(batch)
+            with self._lock:
+                self._order = sorted((meta["created_at"] or "", page_id) for page_id, meta in self._pages.items())
+                with self._process_lock.hold(exclusive=True):
+                    self._write_snapshot()
+        finally:
+            self.mark_loaded()
+
+    def _publish(self, metas: List[Dict]):
+        # Listing order is sorted once at the end; nothing reads it before loading finishes
+        with self._changed:
+            for meta in metas:
+                self._pages[meta["id"]] = meta
+                self._slugs[meta["slug"]] = meta["id"]
+            self._changed.notify_all()
+
+    def _reset(self, metas: Iterable[Dict]):
+        self._pages = {}
+        self._slugs = {}
+        for meta in metas:
+            self._pages[meta["id"]] = meta
+            self._slugs[meta["slug"]] = meta["id"]
+        self._order = sorted((meta["created_at"] or "", page_id) for page_id, meta in self._pages.items())
+
+    def get(self, page_id: str) -> Optional[Dict]:
+        """Return a copy of a page's metadata"""
+        with self._lock:
+            self._wait(lambda: page_id in self._pages)
+            if page_id not in self._pages:
+                # Possibly created by another process
+                self._refresh_if_changed()
+            meta = self._pages.get(page_id)
+            return dict(meta) if meta else None
+
+    def resolve(self, slug: str) -> Optional[str]:
+        """Return the page id for a slug, if indexed"""
+        with self._lock:
+            self._wait(lambda: slug in self._slugs)
+            if slug not in self._slugs:
+                self._refresh_if_changed()
+            return self._slugs.get(slug)
+
+    def __contains__(self, slug: str) -> bool:
+        # Not refreshed: a slug taken elsewhere is caught by the check under the inter-process lock
+        with self._lock:
+            self._wait(lambda: slug in self._slugs)
+            return slug in self._slugs
+
+    def page(self, limit: int, after: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        """Metadata newest first, starting strictly after the (created_at, id) cursor key"""
+        with self._lock:
+            self._wait()
+            self._refresh_if_changed()
+            end = bisect.bisect_left(self._order, after) if after else len(self._order)
+            keys = self._order[max(0, end - limit):end]
+            return [dict(self._pages[page_id]) for _, page_id in reversed(keys)]
+
+    def insert(self, meta: Dict) -> bool:
+        """Atomically add a page and claim its slug. Returns False if the slug is taken."""
+        with self._write():
+            if meta["slug"] in self._slugs:
+                return False
+            self._apply_put(meta)
+            self._append({"op": "put", "meta": meta})
+            return True
+
+    def insert_many(self, metas: List[Dict]) -> List[bool]:
+        """Add pages in one journal append (one fsync). Returns per page whether its slug was free."""
+        with self._write():
+            results, entries = [], []
+            for meta in metas:
+                if meta["slug"] in self._slugs:
+                    results.append(False)
+                    continue
+                self._apply_put(meta)
+                entries.append({"op": "put", "meta": meta})
+                results.append(True)
+            if entries:
+                self._append(*entries)
+            return results
+
+    def change_slug(self, page_id: str, new_slug: str) -> bool:
+        """Atomically move a page to a new slug. Returns False if missing or taken."""
+        with self._write():
+            meta = self._pages.get(page_id)
+            if meta is None or self._slugs.get(new_slug, page_id) != page_id:
+                return False
+            meta = dict(meta, slug=new_slug)
+            self._apply_put(meta)
+            self._append({"op": "put", "meta": meta})
+            return True
+
+    def update(self, page_id: str, **fields) -> bool:
+        """Change an existing page's metadata (not its slug). Returns False if it is missing."""
+        with self._write():
+            meta = self._pages.get(page_id)
+            if meta is None:
+                return False
+            # Journaled even when nothing changed, so other processes see the page as changed
+            meta = dict(meta, **fields, slug=meta["slug"])
+            self._apply_put(meta)
+            self._append({"op": "put", "meta": meta})
+            return True
+
+    def remove(self, page_id: str) -> Optional[Dict]:
+        """Drop a page. Returns its last metadata."""
+        with self._write():
+            meta = self._pages.get(page_id)
+            if meta is None:
+                return None
+            self._apply_delete(page_id)
+            self._append({"op": "del", "id": page_id})
+            return meta
+
+    def add_views(self, counts: Dict[str, int]):
+        """Add a batch of view increments (one journal append)"""
+        with self._write():
+            counts = {page_id: count for page_id, count in counts.items() if page_id in self._pages}
+            if not counts:
+                return
+            self._apply_views(counts)
+            self._append({"op": "views", "counts": counts})
+
+    @contextmanager
+    def _write(self):
+        """Exclusive access across threads and processes, caught up with every other process"""
+        with self._lock:
+            self._wait()
+            with self._process_lock.hold(exclusive=True):
+                self._catch_up()
+                if self._journal_stale:
+                    # Appending to an old-generation journal would be skipped on load
+                    self._write_snapshot()
+                yield
+
+    def _apply_put(self, meta: Dict):
+        page_id = meta["id"]
+        old = self._pages.get(page_id)
+        if old is not None:
+            if self._slugs.get(old["slug"]) == page_id:
+                del self._slugs[old["slug"]]
+            self._remove_order((old["created_at"] or "", page_id))
+        self._pages[page_id] = meta
+        self._slugs[meta["slug"]] = page_id
+        bisect.insort(self._order, (meta["created_at"] or "", page_id))
+
+    def _apply_delete(self, page_id: str):
+        meta = self._pages.pop(page_id, None)
+        if meta is None:
+            return
+        if self._slugs.get(meta["slug"]) == page_id:
+            del self._slugs[meta["slug"]]
+        self._remove_order((meta["created_at"] or "", page_id))
+
+    def _apply_views(self, counts: Dict[str, int]):
+        for page_id, count in counts.items():
+            meta = self._pages.get(page_id)
+            if meta is not None:
+                meta["views_count"] = meta.get("views_count", 0) + count
+
+    def _remove_order(self, key: Tuple[str, str]):
+        i = bisect.bisect_left(self._order, key)
+        if i < len(self._order) and self._order[i] == key:
+            del self._order[i]
+
+    def _append(self, *entries: Dict):
+        with open(self._journal_path, 'ab') as f:
+            f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            # Caught up before appending under the exclusive lock, so this process has applied everything up to here
+            self._journal_offset = f.tell()
+            self._journal_inode = os.fstat(f.fileno()).st_ino
+        self._journal_entries += len(entries)
+        if self._journal_entries > max(self.MIN_COMPACT_ENTRIES, len(self._pages)):
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        """Called with the exclusive inter-process lock held"""
+        self.generation = max(self.generation, self._journal_header()) + 1
+        atomic_write_json(self._snapshot_path, {"generation": self.generation, "pages": list(self._pages.values())})
+        # Snapshot now covers everything in the journal; a crash before this line leaves an
+        # old-generation journal that loading skips
+        header = json.dumps({"op": "generation", "generation": self.generation}) + "\n"
+        atomic_write_bytes(self._journal_path, header.encode("utf-8"))
+        self._journal_inode = os.stat(self._journal_path).st_ino
+        self._journal_offset = len(header)
+        self._journal_entries = 0
+        self._journal_stale = False
@@ -0,0 +1,91 @@
+"""
+Sampling profiler that can be switched on and off at runtime.
+
+A daemon thread wakes every `interval` seconds, reads the current stack
+of every other thread (sys._current_frames) and counts each stack in
+collapsed form ("module:function;module:function ..."), the input format
+of flame graph tools. While it is off nothing runs; while it is on the
+cost is one stack walk per thread per interval.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+
+class SamplingProfiler:
+    """Collapsed-stack sampler of all threads"""
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None, reset: bool = True):
+        """Start sampling (no-op if already running)"""
+        if self.running:
+            return
+        if interval:
+            self.interval = interval
+        if reset:
+            self.reset()
+        self._stop.clear()
+        self._started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._samples = 0
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            stacks = [self._collapse(frame) for ident, frame in frames.items() if ident != own]
+            with self._lock:
+                self._samples += 1
+                self._stacks.update(stacks)
+
+    def _collapse(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def collapsed(self, limit: int = 0) -> str:
+        """Sampled stacks as 'frame;frame;... count' lines, most frequent first"""
+        with self._lock:
+            stacks = self._stacks.most_common(limit or None)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def status(self) -> Dict:
+        with self._lock:
+            samples, stacks = self._samples, len(self._stacks)
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "started_at": self._started_at,
+            "samples": samples,
+            "distinct_stacks": stacks
+        }
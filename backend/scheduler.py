@@ -0,0 +1,247 @@
+"""
+Generation scheduler: admission control, priorities and rate limits in
+front of the AI providers.
+
+Each provider has a lane with a concurrency cap, a token-bucket request
+rate limit and a bounded wait queue. Interactive requests are served
+before background work (e.g. chained A/B regeneration). Requests are
+admitted synchronously, so a full queue is reported before a response
+starts (QueueFull -> HTTP 429); background work may only take half of the
+queue. While a streaming request waits, its stream carries
+{"status": "queued", "queue_position": n} events.
+"""
+import asyncio
+import bisect
+import itertools
+import math
+import time
+from collections import Counter
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+def queue_event(position: int) -> Dict:
+    return {"status": "queued", "queue_position": position}
+
+
+def is_queue_event(chunk: Any) -> bool:
+    """True for scheduler progress events (never cached or replayed as content)"""
+    return isinstance(chunk, dict) and chunk.get("status") == "queued"
+
+
+class QueueFull(Exception):
+    """A provider's wait queue is full; retry after `retry_after` seconds"""
+
+    def __init__(self, provider: str, retry_after: int):
+        super().__init__(f"Too many queued {provider} generations, retry in {retry_after}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Requests-per-second limiter with bursts up to `capacity` (rate 0 = unlimited)"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ProviderLimits:
+    """Concurrency, rate and queue limits of one provider"""
+
+    def __init__(self, max_concurrency: int = 8, requests_per_minute: float = 60, burst: int = 10, max_queue: int = 64):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.max_queue = max_queue
+
+
+class _Ticket:
+    __slots__ = ("lane", "key", "granted", "changed")
+
+    def __init__(self, lane: "_Lane", key: tuple):
+        self.lane = lane
+        self.key = key
+        self.granted = False
+        # Set when the ticket is granted or its queue position may have changed
+        self.changed = asyncio.Event()
+
+
+class _Lane:
+    """Slots, rate limiter and priority-ordered wait queue of one provider"""
+
+    def __init__(self, name: str, limits: ProviderLimits):
+        self.name = name
+        self.limits = limits
+        self.bucket = TokenBucket(limits.requests_per_minute / 60, limits.burst)
+        self.active = 0
+        # (priority, sequence) keys in service order, and the tickets behind them
+        self.keys: List[tuple] = []
+        self.tickets: Dict[tuple, _Ticket] = {}
+        self.admitted = 0
+        self.rejected = 0
+
+    def position(self, ticket: _Ticket) -> int:
+        return bisect.bisect_left(self.keys, ticket.key)
+
+    def notify(self):
+        for ticket in self.tickets.values():
+            ticket.changed.set()
+
+    def grant_waiting(self):
+        while self.keys and self.active < self.limits.max_concurrency:
+            ticket = self.tickets.pop(self.keys.pop(0))
+            ticket.granted = True
+            ticket.changed.set()
+            self.active += 1
+        self.notify()
+
+
+class GenerationScheduler:
+    """Per-provider admission control for generation requests"""
+
+    def __init__(self, providers: Dict[str, ProviderLimits]):
+        self._lanes = {name: _Lane(name, limits) for name, limits in providers.items()}
+        self._sequence = itertools.count()
+
+    def _lane(self, provider: str) -> _Lane:
+        lane = self._lanes.get(provider)
+        if lane is None:
+            raise ValueError(f"Unknown provider: {provider}")
+        return lane
+
+    @staticmethod
+    def _check(lane: _Lane, priority: int, count: int = 1):
+        """Raise QueueFull unless `count` more requests would get a slot or a place in the queue"""
+        free = max(0, lane.limits.max_concurrency - lane.active) if not lane.keys else 0
+        queued = count - free
+        # Background work may only fill half the queue, leaving room for interactive requests
+        limit = lane.limits.max_queue if priority == INTERACTIVE else lane.limits.max_queue // 2
+        if queued > 0 and len(lane.keys) + queued > limit:
+            lane.rejected += 1
+            rate = lane.limits.requests_per_minute / 60 or lane.limits.max_concurrency
+            raise QueueFull(lane.name, max(1, min(60, math.ceil(len(lane.keys) / rate))))
+
+    def ensure_capacity(self, providers: Iterable[str], priority: int = INTERACTIVE):
+        """Raise QueueFull unless one request per listed provider would be admitted now.
+        Admitting them right after, without awaiting in between, then cannot fail."""
+        for provider, count in Counter(providers).items():
+            self._check(self._lane(provider), priority, count)
+
+    def _admit(self, provider: str, priority: int) -> _Ticket:
+        """Take a slot or a place in the queue, or raise QueueFull"""
+        lane = self._lane(provider)
+        self._check(lane, priority)
+        ticket = _Ticket(lane, (priority, next(self._sequence)))
+        if lane.active < lane.limits.max_concurrency and not lane.keys:
+            ticket.granted = True
+            lane.active += 1
+        else:
+            bisect.insort(lane.keys, ticket.key)
+            lane.tickets[ticket.key] = ticket
+            lane.notify()
+        lane.admitted += 1
+        return ticket
+
+    def _release(self, ticket: _Ticket):
+        lane = ticket.lane
+        if ticket.granted:
+            lane.active -= 1
+        else:
+            lane.tickets.pop(ticket.key, None)
+            i = bisect.bisect_left(lane.keys, ticket.key)
+            if i < len(lane.keys) and lane.keys[i] == ticket.key:
+                del lane.keys[i]
+        lane.grant_waiting()
+
+    async def _acquire(self, ticket: _Ticket) -> AsyncIterator[int]:
+        """Wait for a slot and a rate token, yielding queue positions as they change"""
+        last = None
+        while not ticket.granted:
+            position = ticket.lane.position(ticket)
+            if position != last:
+                yield position
+                last = position
+            ticket.changed.clear()
+            await ticket.changed.wait()
+        await ticket.lane.bucket.acquire()
+
+    def stream(self, provider: str, factory: Callable[[], AsyncIterator[Any]], priority: int = INTERACTIVE) -> AsyncIterator[Any]:
+        """Admit a streaming generation now (raises QueueFull) and return its stream.
+        Queue position events precede the generated chunks while the request waits."""
+        ticket = self._admit(provider, priority)
+        out: asyncio.Queue = asyncio.Queue()
+        # Runs as a task so an admitted ticket is always used and released, even if the stream is never read
+        task = asyncio.get_running_loop().create_task(self._pump(ticket, factory, out))
+        return self._drain(out, task)
+
+    async def _pump(self, ticket: _Ticket, factory: Callable[[], AsyncIterator[Any]], out: asyncio.Queue):
+        try:
+            async for position in self._acquire(ticket):
+                out.put_nowait(("chunk", queue_event(position)))
+            async for chunk in factory():
+                out.put_nowait(("chunk", chunk))
+            out.put_nowait(("end", None))
+        except Exception as e:
+            out.put_nowait(("error", e))
+        finally:
+            self._release(ticket)
+
+    @staticmethod
+    async def _drain(out: asyncio.Queue, task: asyncio.Task) -> AsyncIterator[Any]:
+        try:
+            while True:
+                kind, value = await out.get()
+                if kind == "end":
+                    return
+                if kind == "error":
+                    raise value
+                yield value
+        finally:
+            task.cancel()
+
+    def call(self, provider: str, factory: Callable[[], Awaitable[Any]], priority: int = INTERACTIVE) -> "asyncio.Task":
+        """Admit a one-shot generation now (raises QueueFull) and return a task for its result"""
+        ticket = self._admit(provider, priority)
+        return asyncio.get_running_loop().create_task(self._run_call(ticket, factory))
+
+    async def _run_call(self, ticket: _Ticket, factory: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            async for _ in self._acquire(ticket):
+                pass
+            return await factory()
+        finally:
+            self._release(ticket)
+
+    def stats(self) -> Dict:
+        return {
+            name: {
+                "active": lane.active,
+                "queued": len(lane.keys),
+                "admitted": lane.admitted,
+                "rejected": lane.rejected,
+                "max_concurrency": lane.limits.max_concurrency,
+                "requests_per_minute": lane.limits.requests_per_minute,
+                "max_queue": lane.limits.max_queue
+            }
+            for name, lane in self._lanes.items()
+        }
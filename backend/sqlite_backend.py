@@ -0,0 +1,266 @@
+"""
+SQLite storage backend: all landing pages in one embedded database (WAL mode).
+Slug resolution, listing and updates are indexed queries.
+
+Processes sharing the database get atomic slug claims from the UNIQUE
+constraint and additive view counts from `views_count + ?` updates.
+Triggers record every slug change, record update and delete in a small
+`changes` table that refresh() polls from its last sequence number.
+
+Import an existing file store with:
+    python sqlite_backend.py migrate --source data/landing-pages --db data/landing-pages.db
+"""
+import argparse
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from storage_backend import StorageBackend, page_meta
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id TEXT PRIMARY KEY,
+    slug TEXT NOT NULL UNIQUE,
+    brand_name TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    views_count INTEGER NOT NULL DEFAULT 0,
+    has_ab_variant INTEGER NOT NULL DEFAULT 0,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pages_created_at ON pages (created_at, id);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    page_id TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS pages_changed AFTER UPDATE OF slug, record ON pages
+BEGIN
+    INSERT INTO changes (page_id) VALUES (old.id);
+END;
+CREATE TRIGGER IF NOT EXISTS pages_deleted AFTER DELETE ON pages
+BEGIN
+    INSERT INTO changes (page_id) VALUES (old.id);
+END;
+"""
+
+META_COLUMNS = "id, slug, brand_name, created_at, views_count, has_ab_variant"
+
+
+class SQLiteBackend(StorageBackend):
+    """Embedded SQLite store; id and slug are indexed by their PRIMARY KEY / UNIQUE constraints"""
+
+    name = "sqlite"
+
+    # Change log rows kept for processes that poll late
+    CHANGES_RETAINED = 10000
+
+    def __init__(self, db_path: str = "data/landing-pages.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # One connection per thread; all of them are closed together in close()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        # Only changes made after this process started are of interest
+        self._last_change = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+        self._refresh_lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _row(record: Dict) -> tuple:
+        meta = page_meta(record)
+        return (
+            meta["id"],
+            meta["slug"],
+            meta["brand_name"],
+            meta["created_at"],
+            record.get("updated_at") or meta["created_at"],
+            meta["views_count"],
+            int(meta["has_ab_variant"]),
+            json.dumps(record, ensure_ascii=False)
+        )
+
+    def read(self, page_id: str) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT record, slug, updated_at, views_count FROM pages WHERE id = ?", (page_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = json.loads(row[0])
+        # Columns updated in place take precedence over the stored JSON
+        record["slug"], record["updated_at"], record["views_count"] = row[1], row[2], row[3]
+        return record
+
+    def insert(self, record: Dict) -> bool:
+        try:
+            self._conn().execute("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._row(record))
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def insert_many(self, records: List[Dict]) -> List[bool]:
+        # One transaction (one WAL sync) for the whole batch
+        conn = self._conn()
+        results = []
+        with conn:
+            conn.execute("BEGIN")
+            for record in records:
+                try:
+                    conn.execute("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._row(record))
+                    results.append(True)
+                except sqlite3.IntegrityError:
+                    results.append(False)
+        return results
+
+    def import_records(self, records: Iterable[Dict], batch_size: int = 1000) -> int:
+        """Bulk upsert records in batched transactions. Returns the number imported."""
+        conn = self._conn()
+        count = 0
+        batch = []
+        for record in records:
+            if not record.get("id") or not record.get("slug"):
+                continue
+            batch.append(self._row(record))
+            if len(batch) >= batch_size:
+                count += self._import_batch(conn, batch)
+                batch = []
+        if batch:
+            count += self._import_batch(conn, batch)
+        return count
+
+    @staticmethod
+    def _import_batch(conn: sqlite3.Connection, rows: List[tuple]) -> int:
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def update(self, record: Dict) -> bool:
+        row = self._row(record)
+        # slug and views_count are columns updated in place; the stored JSON's copies are ignored on read
+        cursor = self._conn().execute(
+            "UPDATE pages SET brand_name = ?, updated_at = ?, has_ab_variant = ?, record = ? WHERE id = ?",
+            (row[2], row[4], row[6], row[7], row[0])
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, page_id: str) -> bool:
+        cursor = self._conn().execute("DELETE FROM pages WHERE id = ?", (page_id,))
+        return cursor.rowcount > 0
+
+    def refresh(self) -> List[str]:
+        with self._refresh_lock:
+            conn = self._conn()
+            rows = conn.execute(
+                "SELECT seq, page_id FROM changes WHERE seq > ? ORDER BY seq", (self._last_change,)
+            ).fetchall()
+            if not rows:
+                return []
+            self._last_change = rows[-1][0]
+            if self._last_change % 1000 < len(rows):
+                # Roughly every thousand changes, trim the log
+                conn.execute("DELETE FROM changes WHERE seq <= ?", (self._last_change - self.CHANGES_RETAINED,))
+            # Includes this process's own changes; invalidating those again is harmless
+            return list(dict.fromkeys(page_id for _, page_id in rows))
+
+    def resolve_slug(self, slug: str) -> Optional[str]:
+        row = self._conn().execute("SELECT id FROM pages WHERE slug = ?", (slug,)).fetchone()
+        return row[0] if row else None
+
+    def change_slug(self, page_id: str, new_slug: str, updated_at: str) -> bool:
+        try:
+            cursor = self._conn().execute(
+                "UPDATE pages SET slug = ?, updated_at = ? WHERE id = ?", (new_slug, updated_at, page_id)
+            )
+        except sqlite3.IntegrityError:
+            return False
+        return cursor.rowcount > 0
+
+    def add_views(self, counts: Dict[str, int]):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "UPDATE pages SET views_count = views_count + ? WHERE id = ?",
+                [(count, page_id) for page_id, count in counts.items()]
+            )
+
+    def list_meta(self, limit: int = 100, after: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        if after:
+            rows = self._conn().execute(
+                f"SELECT {META_COLUMNS} FROM pages WHERE (created_at, id) < (?, ?) "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (after[0], after[1], limit)
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                f"SELECT {META_COLUMNS} FROM pages ORDER BY created_at DESC, id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            {
+                "id": row[0],
+                "slug": row[1],
+                "brand_name": row[2],
+                "created_at": row[3],
+                "views_count": row[4],
+                "has_ab_variant": bool(row[5])
+            }
+            for row in rows
+        ]
+
+    def iter_records(self) -> Iterator[Dict]:
+        for (page_id,) in self._conn().execute("SELECT id FROM pages").fetchall():
+            record = self.read(page_id)
+            if record:
+                yield record
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def migrate(source: str, db_path: str) -> int:
+    """Import every page from a file store directory into a SQLite database"""
+    from file_backend import FileBackend
+
+    backend = SQLiteBackend(db_path)
+    try:
+        return backend.import_records(FileBackend(source).iter_records())
+    finally:
+        backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite landing page store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="Import a data/landing-pages directory")
+    migrate_parser.add_argument("--source", default="data/landing-pages")
+    migrate_parser.add_argument("--db", default="data/landing-pages.db")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        count = migrate(args.source, args.db)
+        print(f"Imported {count} landing pages from {args.source} into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
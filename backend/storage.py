@@ -1,39 +1,106 @@
 """
-Simple file-based storage for landing pages.
-Each landing page is stored as a JSON file in data/landing-pages/
-OPTIMIZED: In-memory slug cache + thread-safe operations
+Simple storage for landing pages.
+Records are persisted by a pluggable backend: one JSON file per page in
+data/landing-pages/ (default) or an embedded SQLite database. HTML bodies
+are stored as compressed, deduplicated blobs in <base_dir>/.blobs and the
+records only hold references to them.
+OPTIMIZED: Indexed slug resolution + buffered view counting + thread-safe operations
 """
-import os
-import json
+import threading
+import time
 import uuid
 from datetime import datetime
-from typing import Optional, List, Dict, Set
+from typing import Callable, Optional, List, Dict
 from pathlib import Path
 import re
-import threading
+
+from html_blobs import HTMLBlobStore
+from metrics import timed_storage
+from storage_backend import StorageBackend, create_backend, decode_cursor, has_ab_variant
+from view_counter import ViewCounter
 
 
 class LandingPageStorage:
-    def __init__(self, base_dir: str = "data/landing-pages"):
+    def __init__(
+        self,
+        base_dir: str = "data/landing-pages",
+        backend: Optional[StorageBackend] = None,
+        view_flush_interval: float = 5.0,
+        view_flush_threshold: int = 1000,
+        html_store: Optional[HTMLBlobStore] = None,
+        sync_interval: float = 1.0,
+        gc_interval: float = 3600.0,
+        gc_grace: float = 3600.0
+    ):
         self.base_dir = Path(base_dir)
-        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.backend = backend or create_backend(base_dir)
+        self.html_store = html_store or HTMLBlobStore(str(self.base_dir / ".blobs"))
+
+        # Page views are buffered in memory and written back in batches
+        self.views = ViewCounter(
+            self.backend.add_views,
+            flush_interval=view_flush_interval,
+            flush_threshold=view_flush_threshold
+        )
+        self.views.start()
+
+        # Called with a page id whenever a page's content or slug changes
+        self._change_listeners: List[Callable[[str], None]] = []
+
+        # Changes made by other processes sharing the storage reach the listeners by polling
+        self.sync_interval = sync_interval
+        # HTML blobs of deleted pages and replaced variants are swept by the same thread
+        self.gc_interval = gc_interval
+        self.gc_grace = gc_grace
+        self._sync_stop = threading.Event()
+        self._sync_thread: Optional[threading.Thread] = None
+        if sync_interval > 0 or gc_interval > 0:
+            self._sync_thread = threading.Thread(target=self._sync_loop, name="storage-sync", daemon=True)
+            self._sync_thread.start()
 
-        # Thread-safe in-memory slug cache for O(1) lookups
-        self._slug_cache: Set[str] = set()
-        self._cache_lock = threading.Lock()
-        self._initialize_cache()
+    def add_change_listener(self, callback: Callable[[str], None]):
+        """Register a callback (e.g. a cache invalidation) for page changes"""
+        self._change_listeners.append(callback)
 
-    def _initialize_cache(self):
-        """Load all existing slugs into memory cache"""
-        with self._cache_lock:
-            for file_path in self.base_dir.glob("*.json"):
+    def _notify_change(self, page_id: str):
+        for callback in self._change_listeners:
+            try:
+                callback(page_id)
+            except Exception as e:
+                print(f"Error in change listener for {page_id}: {e}")
+
+    def sync(self) -> int:
+        """Apply changes made by other processes and notify listeners. Returns the number of pages changed."""
+        changed = self.backend.refresh()
+        for page_id in changed:
+            self._notify_change(page_id)
+        return len(changed)
+
+    def _sync_loop(self):
+        next_gc = time.monotonic() + self.gc_interval
+        while not self._sync_stop.wait(self.sync_interval if self.sync_interval > 0 else self.gc_interval):
+            if not self.backend.ready:
+                continue
+            if self.sync_interval > 0:
+                try:
+                    self.sync()
+                except Exception as e:
+                    print(f"Error syncing storage changes: {e}")
+            if self.gc_interval > 0 and time.monotonic() >= next_gc:
+                next_gc = time.monotonic() + self.gc_interval
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        if 'slug' in data:
-                            self._slug_cache.add(data['slug'])
-                except:
-                    continue
+                    self.collect_garbage(self.gc_grace)
+                except Exception as e:
+                    print(f"Error collecting unreferenced HTML blobs: {e}")
+
+    def close(self):
+        """Flush buffered view counts and release the backend (call on graceful shutdown)"""
+        self._sync_stop.set()
+        if self._sync_thread is not None:
+            self._sync_thread.join()
+            self._sync_thread = None
+        self.views.close()
+        self.backend.close()
 
     def _generate_slug(self, brand_name: str, custom_slug: Optional[str] = None) -> str:
         """Generate a URL-friendly slug"""
@@ -50,36 +117,22 @@ class LandingPageStorage:
         short_id = str(uuid.uuid4())[:8]
         return f"{slug}-{short_id}"
 
-    def _slug_exists(self, slug: str) -> bool:
-        """Check if slug already exists (O(1) cache lookup)"""
-        with self._cache_lock:
-            return slug in self._slug_cache
-
-    def save_landing_page(
+    def _new_record(
         self,
         html_content: str,
         brand_kit: Optional[Dict] = None,
         ab_variant_html: Optional[str] = None,
         seo_metadata: Optional[Dict] = None,
-        custom_slug: Optional[str] = None
+        custom_slug: Optional[str] = None,
+        ab_weights: Optional[Dict[str, float]] = None
     ) -> Dict:
-        """Save a landing page and return its metadata with URL"""
-
-        # Generate unique ID and slug
-        page_id = str(uuid.uuid4())
         brand_name = brand_kit.get('name', '') if brand_kit else ''
-        slug = self._generate_slug(brand_name, custom_slug)
-
-        # Ensure slug is unique (regenerate if collision)
-        while self._slug_exists(slug):
-            slug = self._generate_slug(brand_name, custom_slug)
-
-        # Create landing page object
         landing_page = {
-            "id": page_id,
-            "slug": slug,
+            "id": str(uuid.uuid4()),
+            "slug": self._generate_slug(brand_name, custom_slug),
             "html_content": html_content,
             "ab_variant_html": ab_variant_html,
+            "ab_weights": ab_weights,
             "brand_kit": brand_kit or {},
             "seo_metadata": seo_metadata or {},
             "created_at": datetime.utcnow().isoformat(),
@@ -87,107 +140,137 @@ class LandingPageStorage:
             "views_count": 0,
             "is_public": True
         }
+        # HTML goes to deduplicated blobs before the record references it
+        return self.html_store.externalize(landing_page)
 
-        # Save to file
-        file_path = self.base_dir / f"{page_id}.json"
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(landing_page, f, indent=2, ensure_ascii=False)
-
-        # Add slug to cache
-        with self._cache_lock:
-            self._slug_cache.add(slug)
-
-        # Return metadata (without full HTML content to save bandwidth)
+    @staticmethod
+    def _saved_meta(landing_page: Dict) -> Dict:
+        # Metadata returned by saves (without full HTML content to save bandwidth)
         return {
-            "id": page_id,
-            "slug": slug,
-            "brand_name": brand_name,
+            "id": landing_page["id"],
+            "slug": landing_page["slug"],
+            "brand_name": landing_page["brand_kit"].get('name', ''),
             "created_at": landing_page["created_at"],
-            "has_ab_variant": ab_variant_html is not None
+            "has_ab_variant": has_ab_variant(landing_page)
         }
 
+    @timed_storage("save_landing_page")
+    def save_landing_page(
+        self,
+        html_content: str,
+        brand_kit: Optional[Dict] = None,
+        ab_variant_html: Optional[str] = None,
+        seo_metadata: Optional[Dict] = None,
+        custom_slug: Optional[str] = None,
+        ab_weights: Optional[Dict[str, float]] = None
+    ) -> Dict:
+        """Save a landing page and return its metadata with URL.
+        `ab_weights` sets the A/B traffic split, e.g. {"a": 70, "b": 30}."""
+        landing_page = self._new_record(html_content, brand_kit, ab_variant_html, seo_metadata, custom_slug, ab_weights)
+
+        # Insert claims the slug atomically (regenerate if collision)
+        while not self.backend.insert(landing_page):
+            landing_page["slug"] = self._generate_slug(landing_page["brand_kit"].get('name', ''), custom_slug)
+        self._notify_change(landing_page["id"])
+        return self._saved_meta(landing_page)
+
+    @timed_storage("save_many")
+    def save_many(self, pages: List[Dict]) -> List[Dict]:
+        """Save several landing pages at once; each dict holds save_landing_page's arguments.
+        Index updates and fsyncs are batched by the backend. Returns metadata in input order."""
+        records = [self._new_record(**page) for page in pages]
+        pending = list(range(len(records)))
+        while pending:
+            results = self.backend.insert_many([records[i] for i in pending])
+            collided = [i for i, ok in zip(pending, results) if not ok]
+            for i in collided:
+                records[i]["slug"] = self._generate_slug(records[i]["brand_kit"].get('name', ''), pages[i].get("custom_slug"))
+            pending = collided
+        for record in records:
+            self._notify_change(record["id"])
+        return [self._saved_meta(record) for record in records]
+
+    @timed_storage("get_by_slug")
     def get_by_slug(self, slug: str) -> Optional[Dict]:
-        """Retrieve landing page by slug"""
-        for file_path in self.base_dir.glob("*.json"):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if data.get('slug') == slug:
-                        # Increment view count
-                        data['views_count'] = data.get('views_count', 0) + 1
-                        with open(file_path, 'w', encoding='utf-8') as fw:
-                            json.dump(data, fw, indent=2, ensure_ascii=False)
-                        return data
-            except Exception as e:
-                print(f"Error reading {file_path}: {e}")
-                continue
-        return None
+        """Retrieve landing page by slug (one indexed lookup + one record read)"""
+        page_id = self.backend.resolve_slug(slug)
+        if page_id is None:
+            return None
 
-    def get_by_id(self, page_id: str) -> Optional[Dict]:
-        """Retrieve landing page by ID"""
-        file_path = self.base_dir / f"{page_id}.json"
-        if file_path.exists():
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Error reading {file_path}: {e}")
-        return None
+        data = self.backend.read(page_id)
+        if not data or data.get('slug') != slug:
+            return None
 
-    def list_all(self, limit: int = 100) -> List[Dict]:
-        """List all landing pages (metadata only, no HTML content)"""
-        pages = []
-        for file_path in sorted(self.base_dir.glob("*.json"), key=os.path.getmtime, reverse=True):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Return metadata only
-                    pages.append({
-                        "id": data.get("id"),
-                        "slug": data.get("slug"),
-                        "brand_name": data.get("brand_kit", {}).get("name", "Untitled"),
-                        "created_at": data.get("created_at"),
-                        "views_count": data.get("views_count", 0),
-                        "has_ab_variant": bool(data.get("ab_variant_html"))
-                    })
-
-                    if len(pages) >= limit:
-                        break
-            except Exception as e:
-                print(f"Error reading {file_path}: {e}")
-                continue
+        # Count the view in memory; the counter flushes it to storage later
+        self.record_view(page_id)
+        data['views_count'] = data.get('views_count', 0) + self.views.pending(page_id)
+        return self.html_store.load(data)
 
+    def record_view(self, page_id: str):
+        """Count a public view without touching storage (e.g. a page served from cache)"""
+        self.views.increment(page_id)
+
+    def resolve_slug(self, slug: str) -> Optional[str]:
+        """Return the page id a slug points to (no view is counted)"""
+        return self.backend.resolve_slug(slug)
+
+    @timed_storage("get_by_id")
+    def get_by_id(self, page_id: str, include_html: bool = True) -> Optional[Dict]:
+        """Retrieve landing page by ID.
+        With include_html=False, HTML blobs are not read and the record keeps its "blobs" references."""
+        data = self.backend.read(page_id)
+        if data:
+            data['views_count'] = data.get('views_count', 0) + self.views.pending(page_id)
+            if include_html:
+                self.html_store.load(data)
+        return data
+
+    @timed_storage("list_all")
+    def list_all(self, limit: int = 100, after: Optional[str] = None) -> List[Dict]:
+        """List landing pages newest first (metadata only, no HTML content).
+        `after` is a cursor from storage_backend.encode_cursor; raises ValueError if malformed."""
+        pages = self.backend.list_meta(limit, decode_cursor(after) if after else None)
+        for page in pages:
+            page["views_count"] += self.views.pending(page["id"])
         return pages
 
+    @timed_storage("set_ab_variant")
+    def set_ab_variant(
+        self, page_id: str, ab_variant_html: str, ab_weights: Optional[Dict[str, float]] = None
+    ) -> Optional[Dict]:
+        """Attach (or replace) the B variant of a stored page. Returns its metadata, or None if it does not exist."""
+        record = self.backend.read(page_id)
+        if record is None:
+            return None
+        record["ab_variant_html"] = ab_variant_html
+        if ab_weights is not None:
+            record["ab_weights"] = ab_weights
+        record["updated_at"] = datetime.utcnow().isoformat()
+        if not self.backend.update(self.html_store.externalize(record)):
+            return None
+        self._notify_change(page_id)
+        return self._saved_meta(record)
+
     def delete(self, page_id: str) -> bool:
         """Delete a landing page by ID"""
-        file_path = self.base_dir / f"{page_id}.json"
-        if file_path.exists():
-            try:
-                file_path.unlink()
-                return True
-            except Exception as e:
-                print(f"Error deleting {file_path}: {e}")
-        return False
-
-    def update_slug(self, page_id: str, new_slug: str) -> bool:
-        """Update the slug of a landing page"""
-        data = self.get_by_id(page_id)
-        if not data:
-            return False
-
-        # Check if new slug already exists
-        if self._slug_exists(new_slug):
+        if not self.backend.delete(page_id):
             return False
+        self.views.discard(page_id)
+        self._notify_change(page_id)
+        return True
 
-        data['slug'] = new_slug
-        data['updated_at'] = datetime.utcnow().isoformat()
+    def collect_garbage(self, grace_seconds: float = 3600.0) -> int:
+        """Delete HTML blobs no longer referenced by any page. Returns the number deleted.
+        Blobs younger than the grace period are kept so in-progress saves are never affected.
+        Runs every `gc_interval` seconds on the storage-sync thread."""
+        referenced = set()
+        for record in self.backend.iter_records():
+            referenced.update((record.get("blobs") or {}).values())
+        return self.html_store.sweep(referenced, grace_seconds)
 
-        file_path = self.base_dir / f"{page_id}.json"
-        try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            return True
-        except Exception as e:
-            print(f"Error updating {file_path}: {e}")
+    def update_slug(self, page_id: str, new_slug: str) -> bool:
+        """Update the slug of a landing page"""
+        if not self.backend.change_slug(page_id, new_slug, datetime.utcnow().isoformat()):
             return False
+        self._notify_change(page_id)
+        return True
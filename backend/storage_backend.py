@@ -0,0 +1,129 @@
+"""
+Storage backend interface for LandingPageStorage.
+A backend persists full page records and answers the indexed queries the
+API needs (slug resolution, listing, slug changes, view count updates).
+Backends are safe to share between processes (uvicorn workers, replicas
+on shared storage): slug claims are atomic across them and refresh()
+reports changes made by the others.
+"""
+import base64
+import json
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class StorageBackend(ABC):
+    """Persistence engine behind LandingPageStorage"""
+
+    name = "base"
+
+    @abstractmethod
+    def read(self, page_id: str) -> Optional[Dict]:
+        """Return the stored record for a page id"""
+
+    @abstractmethod
+    def insert(self, record: Dict) -> bool:
+        """Store a new record. Returns False if its slug is already taken."""
+
+    def insert_many(self, records: List[Dict]) -> List[bool]:
+        """Store new records, amortizing durability work where the backend can.
+        Returns per record whether it was stored (False if its slug is taken)."""
+        return [self.insert(record) for record in records]
+
+    @abstractmethod
+    def update(self, record: Dict) -> bool:
+        """Replace an existing page's record; its slug and view count are kept. Returns False if it does not exist."""
+
+    @abstractmethod
+    def delete(self, page_id: str) -> bool:
+        """Delete a record. Returns False if it does not exist."""
+
+    @abstractmethod
+    def resolve_slug(self, slug: str) -> Optional[str]:
+        """Return the page id a slug points to"""
+
+    @abstractmethod
+    def change_slug(self, page_id: str, new_slug: str, updated_at: str) -> bool:
+        """Point a page at a new slug. Returns False if the page is missing or the slug is taken."""
+
+    @abstractmethod
+    def add_views(self, counts: Dict[str, int]):
+        """Add a batch of view increments (page id -> count)"""
+
+    @abstractmethod
+    def list_meta(self, limit: int = 100, after: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        """Return page metadata (no HTML), newest first, strictly after a decoded cursor"""
+
+    @abstractmethod
+    def iter_records(self) -> Iterator[Dict]:
+        """Yield every stored record (used for migrations)"""
+
+    def refresh(self) -> List[str]:
+        """Pick up changes made by other processes; returns the ids of pages whose content,
+        slug or existence changed since the last call (polled to invalidate caches)"""
+        return []
+
+    def slug_exists(self, slug: str) -> bool:
+        """Check if a slug is taken"""
+        return self.resolve_slug(slug) is not None
+
+    @property
+    def ready(self) -> bool:
+        """Whether indexes are fully loaded (backends may warm up in the background)"""
+        return True
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until indexes are fully loaded. Returns False on timeout."""
+        return True
+
+    def close(self):
+        """Release any resources held by the backend"""
+
+
+def page_meta(record: Dict) -> Dict:
+    """Metadata view of a page record as returned by list endpoints"""
+    return {
+        "id": record.get("id"),
+        "slug": record.get("slug"),
+        "brand_name": (record.get("brand_kit") or {}).get("name", "Untitled"),
+        "created_at": record.get("created_at"),
+        "views_count": record.get("views_count", 0),
+        "has_ab_variant": has_ab_variant(record)
+    }
+
+
+def has_ab_variant(record: Dict) -> bool:
+    """Whether a record has a B variant, inline or as a blob reference"""
+    return bool(record.get("ab_variant_html") or (record.get("blobs") or {}).get("ab_variant_html"))
+
+
+def encode_cursor(meta: Dict) -> str:
+    """Opaque pagination cursor pointing at a listed page"""
+    raw = json.dumps([meta["created_at"], meta["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decode a cursor into its (created_at, id) sort key. Raises ValueError if malformed."""
+    try:
+        created_at, page_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(created_at), str(page_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def create_backend(base_dir: str, name: Optional[str] = None) -> StorageBackend:
+    """Build the backend selected by name or the STORAGE_BACKEND env var (file | sqlite).
+    STORAGE_WARMUP=background (default) loads the file backend's index on a background thread;
+    STORAGE_WARMUP=blocking loads it before returning."""
+    name = (name or os.getenv("STORAGE_BACKEND", "file")).lower()
+    if name == "file":
+        from file_backend import FileBackend
+        return FileBackend(base_dir, background_warmup=os.getenv("STORAGE_WARMUP", "background") == "background")
+    if name == "sqlite":
+        from sqlite_backend import SQLiteBackend
+        db_path = os.getenv("SQLITE_PATH") or str(Path(base_dir).with_suffix(".db"))
+        return SQLiteBackend(db_path)
+    raise ValueError(f"Unknown storage backend: {name}")
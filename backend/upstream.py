@@ -0,0 +1,315 @@
+"""
+Shared upstream HTTP transport for the AI providers.
+
+The OpenRouter and Gemini clients send every request through one pooled
+httpx transport instead of each SDK building its own: connections are kept
+alive and reused across requests (HTTP/2 multiplexing when the `h2`
+package is installed), pool limits and timeouts are configurable, and
+connections can be opened ahead of the first request.
+
+Every request is timed: connect (new connections only; httpcore resolves
+DNS inside the TCP connect, so DNS time is part of it), TTFB (until the
+response headers arrive) and total (until the body has been read).
+`upstream_stats.snapshot()` aggregates them per upstream host, and they
+are exported as the rcg_upstream_request_seconds histogram.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from metrics import registry
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class UpstreamSettings:
+    """Pool limits, timeouts and protocol options of the shared transport"""
+
+    def __init__(
+        self,
+        http2: bool = True,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 120.0,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 120.0,
+        prewarm_connections: int = 1
+    ):
+        # HTTP/2 needs the optional h2 package; without it connections stay HTTP/1.1 keep-alive
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.prewarm_connections = prewarm_connections
+
+    @classmethod
+    def from_env(cls) -> "UpstreamSettings":
+        return cls(
+            http2=os.getenv("UPSTREAM_HTTP2", "1") != "0",
+            max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 100)),
+            max_keepalive=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", 20)),
+            keepalive_expiry=float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", 120)),
+            connect_timeout=float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", 10)),
+            read_timeout=float(os.getenv("UPSTREAM_READ_TIMEOUT", 120)),
+            prewarm_connections=int(os.getenv("UPSTREAM_PREWARM_CONNECTIONS", 1))
+        )
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+
+class UpstreamStats:
+    """Per-host request counters and recent timing samples (seconds)"""
+
+    PHASES = ("connect", "ttfb", "total")
+
+    def __init__(self, samples: int = 1024):
+        self._histogram = registry.histogram(
+            "rcg_upstream_request_seconds", "Upstream request phase timings (connect includes DNS)", ("host", "phase")
+        )
+        self._lock = threading.Lock()
+        self._samples = samples
+        self._hosts: Dict[str, Dict] = {}
+
+    def _host(self, host: str) -> Dict:
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = {
+                "requests": 0, "errors": 0, "connections": 0, "reused": 0,
+                "timings": {phase: deque(maxlen=self._samples) for phase in self.PHASES}
+            }
+            self._hosts[host] = entry
+        return entry
+
+    def record(self, host: str, timings: Dict[str, float], new_connection: bool):
+        with self._lock:
+            entry = self._host(host)
+            entry["requests"] += 1
+            entry["connections" if new_connection else "reused"] += 1
+            for phase, value in timings.items():
+                entry["timings"][phase].append(value)
+        for phase, value in timings.items():
+            self._histogram.observe(value, host, phase)
+
+    def record_error(self, host: str):
+        with self._lock:
+            self._host(host)["errors"] += 1
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                host: {
+                    "requests": entry["requests"],
+                    "errors": entry["errors"],
+                    "connections_opened": entry["connections"],
+                    "connections_reused": entry["reused"]
+                }
+                for host, entry in self._hosts.items()
+            }
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            result = {}
+            for host, entry in self._hosts.items():
+                phases = {}
+                for phase in self.PHASES:
+                    samples = sorted(entry["timings"][phase])
+                    phases[phase] = {
+                        "count": len(samples),
+                        "p50": samples[len(samples) // 2] if samples else None,
+                        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))] if samples else None,
+                        "max": samples[-1] if samples else None
+                    }
+                result[host] = {
+                    "requests": entry["requests"],
+                    "errors": entry["errors"],
+                    "connections_opened": entry["connections"],
+                    "connections_reused": entry["reused"],
+                    "timings": phases
+                }
+            return result
+
+
+class _TimedStream(httpx.AsyncByteStream):
+    """Response body that reports the total request time once it is read or closed.
+
+    SDKs stop reading a stream at their end-of-stream event (OpenAI's
+    `data: [DONE]`) and close it before the final empty chunk is read,
+    which makes httpcore drop the connection. On close, a short unread tail
+    is drained so the connection goes back to the pool.
+    """
+
+    DRAIN_TIMEOUT = 0.1
+    DRAIN_MAX_BYTES = 64 * 1024
+
+    def __init__(self, stream: httpx.AsyncByteStream, done):
+        self._stream = stream
+        self._done = done
+        self._iterator = None
+        self._finished = False
+
+    async def __aiter__(self):
+        self._iterator = self._stream.__aiter__()
+        async for chunk in self._iterator:
+            yield chunk
+        self._finished = True
+
+    async def _drain(self):
+        drained = 0
+        async for chunk in self._iterator:
+            drained += len(chunk)
+            if drained > self.DRAIN_MAX_BYTES:
+                return
+        self._finished = True
+
+    async def aclose(self):
+        try:
+            if self._iterator is not None and not self._finished:
+                try:
+                    await asyncio.wait_for(self._drain(), self.DRAIN_TIMEOUT)
+                except Exception:
+                    pass
+            await self._stream.aclose()
+        finally:
+            self._done()
+
+
+class TimedTransport(httpx.AsyncBaseTransport):
+    """Pooled httpx transport that times each request's connect, TTFB and total"""
+
+    def __init__(self, settings: UpstreamSettings, stats: UpstreamStats):
+        self.settings = settings
+        self.stats = stats
+        self._transport = httpx.AsyncHTTPTransport(http2=settings.http2, limits=settings.limits)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        started = time.perf_counter()
+        marks: Dict[str, float] = {}
+        upstream_trace = request.extensions.get("trace")
+
+        async def trace(name: str, info: Dict):
+            if name in ("connection.connect_tcp.started", "connection.connect_tcp.complete",
+                        "connection.start_tls.complete"):
+                marks[name] = time.perf_counter()
+            if upstream_trace is not None:
+                await upstream_trace(name, info)
+
+        # SDKs may pass timeout=None per request; fall back to the pool's timeouts
+        timeout = dict(request.extensions.get("timeout") or {})
+        defaults = self.settings.timeout.as_dict()
+        request.extensions = {
+            **request.extensions,
+            "trace": trace,
+            "timeout": {key: timeout.get(key) or defaults[key] for key in defaults}
+        }
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            self.stats.record_error(host)
+            raise
+        headers_at = time.perf_counter()
+
+        new_connection = "connection.connect_tcp.started" in marks
+        connected = marks.get("connection.start_tls.complete") or marks.get("connection.connect_tcp.complete")
+        timings = {"ttfb": headers_at - started}
+        if new_connection and connected:
+            timings["connect"] = connected - marks["connection.connect_tcp.started"]
+
+        def done():
+            timings["total"] = time.perf_counter() - started
+            self.stats.record(host, timings, new_connection)
+
+        response.stream = _TimedStream(response.stream, done)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+upstream_settings = UpstreamSettings.from_env()
+upstream_stats = UpstreamStats()
+
+# One connection pool per kind of client, shared by every provider SDK
+_async_client: Optional[httpx.AsyncClient] = None
+_sync_client: Optional[httpx.Client] = None
+_clients_lock = threading.Lock()
+
+
+def async_client() -> httpx.AsyncClient:
+    """The shared async client (created on first use)"""
+    global _async_client
+    with _clients_lock:
+        if _async_client is None:
+            _async_client = httpx.AsyncClient(
+                transport=TimedTransport(upstream_settings, upstream_stats),
+                timeout=upstream_settings.timeout,
+                follow_redirects=True
+            )
+        return _async_client
+
+
+def sync_client() -> httpx.Client:
+    """The shared blocking client, for the few synchronous SDK calls"""
+    global _sync_client
+    with _clients_lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(
+                http2=upstream_settings.http2,
+                limits=upstream_settings.limits,
+                timeout=upstream_settings.timeout,
+                follow_redirects=True
+            )
+        return _sync_client
+
+
+async def prewarm_connections(base_urls: Iterable[str], connections: Optional[int] = None):
+    """Open `connections` pooled connections to each upstream host before the first generation.
+    Any response (even a 404 or 405) leaves a reusable connection behind; failures are only logged.
+    HEAD requests, so no response body (e.g. a provider's HTML homepage) is downloaded."""
+    connections = upstream_settings.prewarm_connections if connections is None else connections
+    client = async_client()
+
+    async def touch(url: str):
+        try:
+            await client.head(url)
+        except Exception as e:
+            print(f"Error prewarming connection to {url}: {e}")
+
+    origins = dict.fromkeys(f"{parts.scheme}://{parts.netloc}/" for parts in map(urlsplit, base_urls) if parts.netloc)
+    # With HTTP/2 one connection per host carries every stream
+    per_host = 1 if upstream_settings.http2 else connections
+    await asyncio.gather(*(touch(origin) for origin in origins for _ in range(per_host)))
+
+
+async def aclose():
+    """Close the shared clients (on shutdown)"""
+    global _async_client, _sync_client
+    with _clients_lock:
+        clients, _async_client, _sync_client = (_async_client, _sync_client), None, None
+    if clients[0] is not None:
+        await clients[0].aclose()
+    if clients[1] is not None:
+        clients[1].close()
@@ -0,0 +1,158 @@
+"""
+Variant engine: several A/B variants of one landing page against a cached prompt prefix.
+
+Every variant of a page shares the same long prefix (instructions plus the
+whole base page), so it is uploaded once as a provider context cache
+(Gemini cachedContents) and each variant request only sends a short
+"variant i of k" prompt that references it. Contexts are reused until
+shortly before their TTL runs out; concurrent requests for the same page
+share one upload.
+
+Pages below the provider's minimum cacheable size, a failed upload, or
+emulate=True (VARIANT_CONTEXT_CACHE=local) use a local emulation: the
+prefix is kept in memory and sent inline with each request. Prompts and
+output are the same, there are just no input-token savings.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Optional
+
+
+class PageContext:
+    """The cached prefix of one page: a provider cache name, or None when emulated locally"""
+
+    def __init__(self, key: str, name: Optional[str], size: int, expires_at: float):
+        self.key = key
+        self.name = name
+        self.size = size
+        self.expires_at = expires_at
+
+    @property
+    def emulated(self) -> bool:
+        return self.name is None
+
+
+class VariantEngine:
+    """Creates, reuses and expires page contexts and streams variants against them"""
+
+    def __init__(
+        self,
+        assistant,
+        ttl: float = 900.0,
+        refresh_margin: float = 300.0,
+        min_cache_chars: int = 8192,
+        max_contexts: int = 64,
+        emulate: bool = False
+    ):
+        self.assistant = assistant
+        self.ttl = ttl
+        # A context is only reused while a whole generation still fits in its remaining lifetime
+        self.refresh_margin = refresh_margin
+        # Providers reject caches below a minimum token count (about 1024 tokens for Gemini Flash)
+        self.min_cache_chars = min_cache_chars
+        self.max_contexts = max_contexts
+        self.emulate = emulate
+
+        self._contexts: "OrderedDict[str, PageContext]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._cleanup: set = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.provider_contexts = 0
+        self.emulated_contexts = 0
+        self.failures = 0
+        self.variants = 0
+        self.prefix_chars_saved = 0
+
+    def key(self, html_content: str, brand_name: str) -> str:
+        material = "\0".join((self.assistant.model, brand_name, html_content))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def context(self, html_content: str, brand_name: str) -> PageContext:
+        """The live context for a page, uploading it once if needed (single-flight)"""
+        key = self.key(html_content, brand_name)
+        context = self._contexts.get(key)
+        if context is not None and context.expires_at - time.monotonic() > self.refresh_margin:
+            self._contexts.move_to_end(key)
+            self.hits += 1
+            return context
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            pending = asyncio.ensure_future(self._create(key, html_content, brand_name))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        # A cancelled waiter must not cancel the upload other requests are waiting on
+        return await asyncio.shield(pending)
+
+    async def _create(self, key: str, html_content: str, brand_name: str) -> PageContext:
+        name = None
+        if not self.emulate and len(html_content) >= self.min_cache_chars:
+            try:
+                name = await self.assistant.create_variant_context(html_content, brand_name, self.ttl)
+            except Exception as e:
+                self.failures += 1
+                print(f"Error creating context cache, sending the page inline: {e}")
+        if name is None:
+            self.emulated_contexts += 1
+        else:
+            self.provider_contexts += 1
+
+        context = PageContext(key, name, len(html_content), time.monotonic() + self.ttl)
+        self._discard(self._contexts.pop(key, None))
+        self._contexts[key] = context
+        while len(self._contexts) > self.max_contexts:
+            self._discard(self._contexts.popitem(last=False)[1])
+        return context
+
+    def _discard(self, context: Optional[PageContext]):
+        """Delete a replaced or evicted provider context in the background (it would expire anyway)"""
+        if context is None or context.emulated:
+            return
+        task = asyncio.ensure_future(self._delete(context.name))
+        self._cleanup.add(task)
+        task.add_done_callback(self._cleanup.discard)
+
+    async def _delete(self, name: str):
+        try:
+            await self.assistant.delete_variant_context(name)
+        except Exception as e:
+            print(f"Error deleting context cache {name}: {e}")
+
+    async def stream_variant(self, html_content: str, brand_name: str, index: int, count: int) -> AsyncIterator[Dict]:
+        """Stream variant `index` (0-based) of `count` for a page"""
+        context = await self.context(html_content, brand_name)
+        self.variants += 1
+        if not context.emulated:
+            self.prefix_chars_saved += context.size
+        request = self.assistant.variant_request(index, count)
+        async for chunk in self.assistant.generate_landing_page_variant(html_content, brand_name, request, context.name):
+            yield chunk
+
+    def stats(self) -> Dict:
+        return {
+            "contexts": len(self._contexts),
+            "provider_contexts": self.provider_contexts,
+            "emulated_contexts": self.emulated_contexts,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "variants": self.variants,
+            "prefix_chars_saved": self.prefix_chars_saved,
+            "ttl_seconds": self.ttl,
+            "emulate": self.emulate
+        }
+
+    async def aclose(self):
+        """Delete every provider context (on shutdown)"""
+        contexts = list(self._contexts.values())
+        self._contexts.clear()
+        await asyncio.gather(*(self._delete(c.name) for c in contexts if not c.emulated), *self._cleanup,
+                             return_exceptions=True)
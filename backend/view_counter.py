@@ -0,0 +1,95 @@
+"""
+Buffered page view counter.
+Increments are aggregated per page in memory and flushed to storage in
+batches, either on a timer or once enough views have accumulated.
+"""
+import threading
+from typing import Callable, Dict, Optional
+
+
+class ViewCounter:
+    """Thread-safe in-memory view counter with batched flushing"""
+
+    def __init__(
+        self,
+        flush_fn: Callable[[Dict[str, int]], None],
+        flush_interval: float = 5.0,
+        flush_threshold: int = 1000
+    ):
+        self._flush_fn = flush_fn
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        self._pending: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._pending_total = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the background flush thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="view-counter-flush", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the background thread and flush whatever is still buffered"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def increment(self, page_id: str, count: int = 1):
+        """Record views for a page (no I/O)"""
+        with self._lock:
+            self._pending[page_id] = self._pending.get(page_id, 0) + count
+            self._pending_total += count
+            if self._pending_total >= self.flush_threshold:
+                self._wake.set()
+
+    def pending(self, page_id: str) -> int:
+        """Views recorded for a page that are not on disk yet"""
+        with self._lock:
+            return self._pending.get(page_id, 0) + self._in_flight.get(page_id, 0)
+
+    def discard(self, page_id: str):
+        """Forget buffered views for a deleted page"""
+        with self._lock:
+            self._pending_total -= self._pending.pop(page_id, 0)
+
+    def flush(self):
+        """Write buffered increments to storage in one batch"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, {}
+                self._in_flight = batch
+                self._pending_total = 0
+
+            try:
+                self._flush_fn(batch)
+            except Exception as e:
+                print(f"Error flushing view counts: {e}")
+                # Keep the increments so the next flush retries them
+                with self._lock:
+                    for page_id, count in batch.items():
+                        self._pending[page_id] = self._pending.get(page_id, 0) + count
+                        self._pending_total += count
+            finally:
+                with self._lock:
+                    self._in_flight = {}
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()